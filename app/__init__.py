@@ -12,8 +12,13 @@ from .managers.database import DatabaseManager
 from .managers.config import ConfigManager
 from .managers.data import DataManager
 from .managers.dispatch import DispatchManager
+from .managers.ingestion import IngestionManager
+from .managers.rate_limit import RateLimitManager
+from .managers.member import MemberManager
 from .managers.task import TaskManager
 from .managers.network import NetworkManager
+from .managers.outbound import OutboundManager
+from .managers.outbox import OutboxManager
 from .actuators import Actuator
 from .actuators.app import AppActuator
 from .actuators.qq import QQActuator
@@ -38,8 +43,13 @@ async def lifespan(app: FastAPI):
         app.state.context.config_manager = ConfigManager(app.state.context)
         app.state.context.data_manager = DataManager(app.state.context)
         app.state.context.dispatch_manager = DispatchManager(app.state.context)
+        app.state.context.ingestion_manager = IngestionManager(app.state.context)
+        app.state.context.rate_limit_manager = RateLimitManager(app.state.context)
+        app.state.context.member_manager = MemberManager(app.state.context)
         app.state.context.task_manager = TaskManager(app.state.context)
         app.state.context.network_manager = NetworkManager(app.state.context)
+        app.state.context.outbound_manager = OutboundManager(app.state.context)
+        app.state.context.outbox_manager = OutboxManager(app.state.context)
         app.state.context.app_actuator = AppActuator(app.state.context)
         app.state.context.qq_actuator = QQActuator(app.state.context)
         app.state.context.napcat_actuator = NapCatActuator(app.state.context)
@@ -49,7 +59,12 @@ async def lifespan(app: FastAPI):
             app.state.context.config_manager,
             app.state.context.data_manager,
             app.state.context.dispatch_manager,
+            app.state.context.rate_limit_manager,
+            app.state.context.member_manager,
+            app.state.context.ingestion_manager,
             app.state.context.network_manager,
+            app.state.context.outbound_manager,
+            app.state.context.outbox_manager,
             app.state.context.task_manager,
             app.state.context.app_actuator,
             app.state.context.qq_actuator,
@@ -65,6 +80,9 @@ async def lifespan(app: FastAPI):
         for component in reversed(components):
             await component.cleanup()
 
+        await app.state.context.http_pool.aclose()
+        await app.state.context.http_client.aclose()
+
         logger.warning("DiceRobot stopped")
 
 
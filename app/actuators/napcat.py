@@ -8,6 +8,7 @@ from loguru import logger
 import aiofiles
 from semver.version import Version
 
+from ..enum import TransportMode, ListenerMode
 from ..utils import run_command_wait
 from . import Actuator, LogStreamer
 
@@ -62,7 +63,20 @@ class NapCatActuator(Actuator, LogStreamer):
                         "debug": False
                     }
                 ],
-                "websocketServers": [],
+                "websocketServers": [
+                    {
+                        "name": "websocketServer",
+                        "enable": False,
+                        "host": str(context.settings.napcat.api.host),
+                        "port": context.settings.napcat.websocket.port,
+                        "messagePostFormat": "array",
+                        "reportSelfMessage": False,
+                        "token": context.settings.security.webhook.secret,
+                        "enableForcePushEvent": True,
+                        "heartInterval": 30000,
+                        "debug": False
+                    }
+                ],
                 "websocketClients": []
             },
             "musicSignUrl": "",
@@ -109,6 +123,18 @@ class NapCatActuator(Actuator, LogStreamer):
     async def _get_latest_version(self) -> Version:
         return Version.parse((await self.context.network_manager.cloud.get_versions()).data.napcat)
 
+    def get_report_url(self) -> str:
+        settings = self.context.settings.napcat.report
+
+        # noinspection HttpUrlsUsage
+        if settings.listener == ListenerMode.HTTP:
+            return f"http://127.0.0.1:{settings.port}/report"
+        elif settings.listener == ListenerMode.UNIX:
+            # HTTP client of NapCat cannot connect to a Unix domain socket, reports are relayed by the forwarder
+            return settings.forwarder
+
+        return "https://127.0.0.1:9500/report"
+
     def get_log_file(self) -> str | None:
         if not os.path.isdir(self.context.settings.napcat.dir.logs) or not (files := os.listdir(self.context.settings.napcat.dir.logs)):
             return None
@@ -194,7 +220,15 @@ class NapCatActuator(Actuator, LogStreamer):
         # Setup OneBot configuration
         self.onebot_config["network"]["httpServers"][0]["host"] = str(self.context.settings.napcat.api.host)
         self.onebot_config["network"]["httpServers"][0]["port"] = self.context.settings.napcat.api.port
+        self.onebot_config["network"]["httpClients"][0]["url"] = self.get_report_url()
         self.onebot_config["network"]["httpClients"][0]["token"] = self.context.settings.security.webhook.secret
+        # Reports are received by only one transport
+        websocket = self.context.settings.napcat.transport == TransportMode.WEBSOCKET
+        self.onebot_config["network"]["httpClients"][0]["enable"] = not websocket
+        self.onebot_config["network"]["websocketServers"][0]["enable"] = websocket
+        self.onebot_config["network"]["websocketServers"][0]["host"] = str(self.context.settings.napcat.api.host)
+        self.onebot_config["network"]["websocketServers"][0]["port"] = self.context.settings.napcat.websocket.port
+        self.onebot_config["network"]["websocketServers"][0]["token"] = self.context.settings.security.webhook.secret
 
         async with aiofiles.open(
             os.path.join(self.context.settings.napcat.dir.config, f"onebot11_{self.context.settings.napcat.account}.json"),
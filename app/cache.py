@@ -0,0 +1,126 @@
+from typing import Any, Generic, Hashable, TypeVar
+from collections import OrderedDict
+from collections.abc import Callable
+import time
+
+__all__ = [
+    "TTLCache"
+]
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded cache with time-to-live and least-recently-used eviction.
+
+    Items expire `ttl` seconds after they are set. When the cache is full, the least recently used item is evicted. Hit
+    and miss counts of `get` are recorded for monitoring.
+
+    Attributes:
+        max_size: Maximum number of items.
+        ttl: Time-to-live (in seconds) of items.
+        hits: Number of lookups that found a live item.
+        misses: Number of lookups that found nothing or an expired item.
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._items: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: K) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / total if (total := self.hits + self.misses) else 0.0
+
+    def _lookup(self, key: K) -> Any:
+        if (item := self._items.get(key)) is None:
+            return _MISSING
+
+        expires_at, value = item
+
+        if expires_at <= self._clock():
+            del self._items[key]
+            return _MISSING
+
+        self._items.move_to_end(key)
+        return value
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        """Get a live item and mark it as recently used.
+
+        Args:
+            key: Key of the item.
+            default: Value to return if the item does not exist or has expired.
+
+        Returns:
+            Value of the item, or `default`.
+        """
+
+        if (value := self._lookup(key)) is _MISSING:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Set an item, evicting expired items and then the least recently used ones if the cache is full.
+
+        Args:
+            key: Key of the item.
+            value: Value of the item.
+            ttl: Time-to-live (in seconds) of the item, instead of the default one.
+        """
+
+        now = self._clock()
+        self._items[key] = (now + (self.ttl if ttl is None else ttl), value)
+        self._items.move_to_end(key)
+
+        if len(self._items) > self.max_size:
+            self._evict(now)
+
+    def add(self, key: K, value: V = None) -> bool:
+        """Set an item only if there is no live item with the same key.
+
+        Args:
+            key: Key of the item.
+            value: Value of the item.
+
+        Returns:
+            Whether the item is added. `False` means a live item with the same key exists, which is counted as a hit.
+        """
+
+        if self.get(key, _MISSING) is not _MISSING:
+            return False
+
+        self.set(key, value)
+        return True
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        item = self._items.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def _evict(self, now: float) -> None:
+        # Drop expired items at the least recently used end first, then the least recently used live items
+        while self._items:
+            key, (expires_at, _) = next(iter(self._items.items()))
+
+            if expires_at > now and len(self._items) <= self.max_size:
+                break
+
+            del self._items[key]
@@ -0,0 +1,112 @@
+from typing import Any, TypeVar
+from functools import cache
+import json
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+__all__ = [
+    "BACKEND",
+    "DecodeError",
+    "loads",
+    "dumps",
+    "dumps_str",
+    "get_adapter",
+    "validate_json"
+]
+
+T = TypeVar("T")
+
+BACKEND = "orjson" if orjson else "json"
+# `orjson.JSONDecodeError` is a subclass of `json.JSONDecodeError`
+DecodeError = json.JSONDecodeError
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+if orjson:
+    def loads(data: bytes | str) -> Any:
+        """Decode JSON data.
+
+        Args:
+            data: JSON data.
+
+        Returns:
+            Decoded object.
+
+        Raises:
+            DecodeError: Invalid JSON data.
+        """
+
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """Encode object to JSON data. Pydantic models are dumped as dictionaries.
+
+        Args:
+            obj: Object to be encoded.
+
+        Returns:
+            UTF-8 encoded JSON data.
+        """
+
+        return orjson.dumps(obj, default=_default)
+else:
+    def loads(data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+def dumps_str(obj: Any) -> str:
+    """Encode object to JSON string.
+
+    Args:
+        obj: Object to be encoded.
+
+    Returns:
+        JSON string.
+    """
+
+    return dumps(obj).decode()
+
+
+@cache
+def get_adapter(type_: type[T]) -> TypeAdapter[T]:
+    """Get the cached type adapter of a type, so that its validator and serializer are only built once.
+
+    Args:
+        type_: Type to be adapted, such as a model class or an annotated union.
+
+    Returns:
+        Type adapter.
+    """
+
+    return TypeAdapter(type_)
+
+
+def validate_json(type_: type[T], data: bytes | str) -> T:
+    """Validate JSON data directly, without decoding it to Python objects first.
+
+    Args:
+        type_: Type to be validated as.
+        data: JSON data.
+
+    Returns:
+        Validated object.
+
+    Raises:
+        ValidationError: Invalid JSON data or validation failed.
+    """
+
+    return get_adapter(type_).validate_json(data)
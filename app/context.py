@@ -3,12 +3,19 @@ from apscheduler import AsyncScheduler
 from .globals import DEBUG
 from .models.config import Status, Settings, PluginSettings, ChatSettings, Replies
 from .network import HttpClient
+from .network.pool import HttpClientPool
+from .network.breaker import CircuitBreakerRegistry
 from .managers.database import DatabaseManager
 from .managers.config import ConfigManager
 from .managers.data import DataManager
 from .managers.dispatch import DispatchManager
+from .managers.ingestion import IngestionManager
+from .managers.rate_limit import RateLimitManager
+from .managers.member import MemberManager
 from .managers.task import TaskManager
 from .managers.network import NetworkManager
+from .managers.outbound import OutboundManager
+from .managers.outbox import OutboxManager
 from .actuators.app import AppActuator
 from .actuators.qq import QQActuator
 from .actuators.napcat import NapCatActuator
@@ -22,13 +29,20 @@ class AppContext:
         self.chat_settings = ChatSettings()
         self.replies = Replies()
         self.http_client = HttpClient()
+        self.circuit_breakers = CircuitBreakerRegistry(self)
+        self.http_pool = HttpClientPool(self)
         self.scheduler: AsyncScheduler | None = None
         self.database_manager: DatabaseManager | None = None
         self.config_manager: ConfigManager | None = None
         self.data_manager: DataManager | None = None
         self.dispatch_manager: DispatchManager | None = None
+        self.ingestion_manager: IngestionManager | None = None
+        self.rate_limit_manager: RateLimitManager | None = None
+        self.member_manager: MemberManager | None = None
         self.task_manager: TaskManager | None = None
         self.network_manager: NetworkManager | None = None
+        self.outbound_manager: OutboundManager | None = None
+        self.outbox_manager: OutboxManager | None = None
         self.app_actuator: AppActuator | None = None
         self.qq_actuator: QQActuator | None = None
         self.napcat_actuator: NapCatActuator | None = None
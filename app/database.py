@@ -8,7 +8,8 @@ __all__ = [
     "Settings",
     "PluginSettings",
     "Replies",
-    "ChatSettings"
+    "ChatSettings",
+    "Outbox"
 ]
 
 
@@ -45,3 +46,15 @@ class ChatSettings(Base):
     chat_id: Mapped[int] = mapped_column(primary_key=True, nullable=False)
     group: Mapped[str] = mapped_column(primary_key=True, nullable=False)
     json: Mapped[str] = mapped_column(nullable=False)
+
+
+class Outbox(Base):
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    chat_type: Mapped[ChatType] = mapped_column(Enum(ChatType, values_callable=lambda x: [e.value for e in x]), nullable=False)
+    chat_id: Mapped[int] = mapped_column(nullable=False)
+    message: Mapped[str] = mapped_column(nullable=False)
+    created_at: Mapped[float] = mapped_column(nullable=False)
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0)
+    next_attempt_at: Mapped[float] = mapped_column(nullable=False, index=True)
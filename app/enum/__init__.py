@@ -1,5 +1,6 @@
 from .app import (
-    ApplicationStatus, UpdateStatus, ChatType, DataType
+    ApplicationStatus, UpdateStatus, ReportPriority, MessagePriority, ChatType, TransportMode, ListenerMode,
+    CircuitState, DataType
 )
 from .napcat import (
     ReportType, MetaEventType, LifecycleMetaEventSubType, MessageType, PrivateMessageSubType, GroupMessageSubType,
@@ -12,7 +13,12 @@ __all__ = [
     # Application enums
     "ApplicationStatus",
     "UpdateStatus",
+    "ReportPriority",
+    "MessagePriority",
     "ChatType",
+    "TransportMode",
+    "ListenerMode",
+    "CircuitState",
     "DataType",
 
     # NapCat enums
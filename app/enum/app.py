@@ -16,12 +16,41 @@ class UpdateStatus(str, Enum):
     FAILED = "failed"
 
 
+class ReportPriority(int, Enum):
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
+class MessagePriority(int, Enum):
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
 class ChatType(str, Enum):
     FRIEND = "friend"
     GROUP = "group"
     TEMP = "temp"
 
 
+class TransportMode(str, Enum):
+    HTTP = "http"
+    WEBSOCKET = "websocket"
+
+
+class ListenerMode(str, Enum):
+    HTTPS = "https"
+    HTTP = "http"
+    UNIX = "unix"
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
 class DataType(str, Enum):
     RULE = "rule"
     DECK = "deck"
@@ -4,6 +4,7 @@ __all__ = [
     "NetworkServerError",
     "NetworkInvalidContentError",
     "NetworkError",
+    "CircuitOpenError",
     "OrderInvalidError",
     "OrderSuspiciousError",
     "OrderRepetitionExceededError",
@@ -46,6 +47,10 @@ class NetworkError(DiceRobotRuntimeException):
         super().__init__(key="network_error")
 
 
+class CircuitOpenError(NetworkError):
+    ...
+
+
 class OrderInvalidError(DiceRobotRuntimeException):
     def __init__(self) -> None:
         super().__init__(key="order_invalid")
@@ -1,12 +1,13 @@
 from typing import TYPE_CHECKING
-import json
+import time
 
 from loguru import logger
 from sqlalchemy import select
 from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import Settings, PluginSettings, Replies, ChatSettings
+from .. import codec
+from ..database import Base, Settings, PluginSettings, Replies, ChatSettings
 from . import Manager
 
 if TYPE_CHECKING:
@@ -21,7 +22,9 @@ class ConfigManager(Manager):
     def __init__(self, context: "AppContext") -> None:
         super().__init__(context)
 
-        self.dirty = False
+        # Rows to be saved, and values of rows in the database, keyed by table and primary key
+        self.pending: dict[type[Base], dict[tuple, dict]] = {}
+        self.saved: dict[tuple[type[Base], tuple], tuple] = {}
 
     async def initialize(self) -> None:
         await self.load_config()
@@ -47,9 +50,11 @@ class ConfigManager(Manager):
             settings_dict = {}
 
             for item in records:
+                self._mark_saved(Settings, {"group": item.group, "json": item.json})
+
                 try:
-                    settings_dict[item.group] = json.loads(item.json)
-                except json.JSONDecodeError:
+                    settings_dict[item.group] = codec.loads(item.json)
+                except codec.DecodeError:
                     logger.exception(f"Failed to parse settings, group: {item.group}")
                     continue
 
@@ -64,13 +69,15 @@ class ConfigManager(Manager):
             records = result.scalars().all()
 
             for item in records:
+                self._mark_saved(PluginSettings, {"plugin": item.plugin, "json": item.json})
+
                 try:
-                    settings = json.loads(item.json)
+                    settings = codec.loads(item.json)
                     self.context.plugin_settings.set(
                         plugin=item.plugin,
                         settings=settings
                     )
-                except json.JSONDecodeError:
+                except codec.DecodeError:
                     logger.exception(f"Failed to parse plugin settings of \"{item.plugin}\"")
                     continue
         except Exception:
@@ -83,15 +90,19 @@ class ConfigManager(Manager):
             records = result.scalars().all()
 
             for item in records:
+                self._mark_saved(ChatSettings, {
+                    "chat_type": item.chat_type.value, "chat_id": item.chat_id, "group": item.group, "json": item.json
+                })
+
                 try:
-                    settings = json.loads(item.json)
+                    settings = codec.loads(item.json)
                     self.context.chat_settings.set(
                         chat_type=item.chat_type,
                         chat_id=item.chat_id,
                         settings_group=item.group,
                         settings=settings
                     )
-                except json.JSONDecodeError:
+                except codec.DecodeError:
                     logger.exception(f"Failed to parse chat settings of \"{item.chat_type}/{item.chat_id}/{item.group}\"")
                     continue
         except Exception:
@@ -105,6 +116,7 @@ class ConfigManager(Manager):
             replies_dict: dict[str, dict[str, str]] = {}
 
             for item in records:
+                self._mark_saved(Replies, {"group": item.group, "key": item.key, "value": item.value})
                 replies_dict.setdefault(item.group, {})[item.key] = item.value
 
             for group, group_replies in replies_dict.items():
@@ -113,79 +125,88 @@ class ConfigManager(Manager):
             logger.exception("Failed to load replies")
             raise
 
-    async def save_config(self) -> None:
-        if not self.dirty:
+    async def save_config(self) -> int:
+        """Save configuration changed since the last save.
+
+        Changed rows are collected from settings, plugin settings, chat settings and replies. Rows identical to those
+        in the database are skipped, and the rest are upserted in one bulk statement per table. Rows failed to be saved
+        are kept and saved next time.
+
+        Returns:
+            Number of rows written.
+        """
+
+        start = time.perf_counter()
+        self._collect_changes()
+
+        if not any(self.pending.values()):
             logger.debug("No configuration changes to save")
-            return
+            return 0
 
         logger.info("Save configuration")
 
         async with self.context.database_manager.get_session() as session:
-            await self._save_settings(session)
-            await self._save_plugin_settings(session)
-            await self._save_chat_settings(session)
-            await self._save_replies(session)
-
-        self.dirty = False
-
-    async def _save_settings(self, session: AsyncSession) -> None:
-        data = self.context.settings.model_dump(safe_dump=False)
-
-        for key, value in data.items():
-            stmt = insert(Settings).values(
-                group=key,
-                json=json.dumps(value)
-            )
-            stmt = stmt.on_conflict_do_update(
-                index_elements=["group"],
-                set_={"json": stmt.excluded.json}
-            )
-            await session.execute(stmt)
-
-    async def _save_plugin_settings(self, session: AsyncSession) -> None:
-        data = self.context.plugin_settings.model_dump()
-
-        for key, value in data.items():
-            stmt = insert(PluginSettings).values(
-                plugin=key,
-                json=json.dumps(value)
-            )
-            stmt = stmt.on_conflict_do_update(
-                index_elements=["plugin"],
-                set_={"json": stmt.excluded.json}
-            )
-            await session.execute(stmt)
-
-    async def _save_chat_settings(self, session: AsyncSession) -> None:
-        data = self.context.chat_settings.model_dump()
-
-        for type_, settings in data.items():
-            for id_, chat_settings in settings.items():
-                for key, value in chat_settings.items():
-                    stmt = insert(ChatSettings).values(
-                        chat_type=type_.value,
-                        chat_id=id_,
-                        group=key,
-                        json=json.dumps(value)
-                    )
-                    stmt = stmt.on_conflict_do_update(
-                        index_elements=["chat_type", "chat_id", "group"],
-                        set_={"json": stmt.excluded.json}
-                    )
-                    await session.execute(stmt)
-
-    async def _save_replies(self, session: AsyncSession) -> None:
-        data = self.context.replies.model_dump()
-
-        for group, replies in data.items():
-            for key, value in replies.items():
-                stmt = insert(Replies).values(
-                    group=group,
-                    key=key,
-                    value=value
-                )
-                stmt = stmt.on_conflict_do_update(
-                    index_elements=["group", "key"],
-                    set_={"value": stmt.excluded.value}
-                )
-                await session.execute(stmt)
+            for table, rows in self.pending.items():
+                if rows:
+                    await self._upsert(session, table, list(rows.values()))
+
+        count = 0
+
+        for table, rows in self.pending.items():
+            for row in rows.values():
+                self._mark_saved(table, row)
+
+            count += len(rows)
+
+        self.pending = {}
+        logger.info(f"Configuration saved, {count} rows written in {time.perf_counter() - start:.3f}s")
+
+        return count
+
+    def _collect_changes(self) -> None:
+        for group, settings in self.context.settings.pop_changes().items():
+            self._add_row(Settings, {"group": group, "json": codec.dumps_str(settings)})
+
+        for plugin, settings in self.context.plugin_settings.pop_changes().items():
+            self._add_row(PluginSettings, {"plugin": plugin, "json": codec.dumps_str(settings)})
+
+        for (chat_type, chat_id, group), settings in self.context.chat_settings.pop_changes().items():
+            self._add_row(ChatSettings, {
+                "chat_type": chat_type.value, "chat_id": chat_id, "group": group, "json": codec.dumps_str(settings)
+            })
+
+        for (group, key), value in self.context.replies.pop_changes().items():
+            self._add_row(Replies, {"group": group, "key": key, "value": value})
+
+    def _add_row(self, table: type[Base], row: dict) -> None:
+        key, value = self._split_row(table, row)
+
+        if self.saved.get((table, key)) == value:
+            # Changed back, or not changed at all
+            self.pending.get(table, {}).pop(key, None)
+        else:
+            self.pending.setdefault(table, {})[key] = row
+
+    def _mark_saved(self, table: type[Base], row: dict) -> None:
+        key, value = self._split_row(table, row)
+        self.saved[(table, key)] = value
+
+    @staticmethod
+    def _split_row(table: type[Base], row: dict) -> tuple[tuple, tuple]:
+        # Primary key, and serialized values of the other columns
+        columns = table.__table__.columns
+
+        return (
+            tuple(row[column.name] for column in columns if column.primary_key),
+            tuple(row[column.name] for column in columns if not column.primary_key)
+        )
+
+    @staticmethod
+    async def _upsert(session: AsyncSession, table: type[Base], rows: list[dict]) -> None:
+        columns = table.__table__.columns
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[column.name for column in columns if column.primary_key],
+            set_={column.name: stmt.excluded[column.name] for column in columns if not column.primary_key}
+        )
+        await session.execute(stmt, rows)
@@ -21,15 +21,111 @@ __all__ = [
 ]
 
 
-class DispatchManager(Manager):
-    order_pattern = re.compile(r"^\s*[.\u3002]\s*([\S\s]+?)\s*(?:#([1-9][0-9]*))?$")
+class OrderIndex:
+    """Case-folded prefix index of orders.
+
+    Literal orders are stored in a trie. Orders with regular expression syntax (like `r\\s*b`) are attached to the
+    trie node of their literal prefix, and only matched by their patterns when the prefix matches. Candidates are ranked
+    by priority and then by loading sequence, which is the same as trying the patterns one by one.
+    """
+
+    class Node:
+        __slots__ = ("children", "order", "patterns")
+
+        def __init__(self) -> None:
+            self.children: dict[str, OrderIndex.Node] = {}
+            self.order: tuple[tuple[int, int], str] | None = None
+            self.patterns: list[tuple[tuple[int, int], re.Pattern, str]] = []
+
+    _special_characters = frozenset(".^$*+?{}[]\\|()")
+    _quantifiers = frozenset("*+?{")
+
+    def __init__(self) -> None:
+        self.root = self.Node()
+        self.size = 0
+
+    @classmethod
+    def is_literal(cls, order: str) -> bool:
+        return not any(char in cls._special_characters for char in order)
+
+    @classmethod
+    def get_literal_prefix(cls, order: str) -> str:
+        if "|" in order:
+            return ""
+
+        prefix = []
+
+        for char in order:
+            if char in cls._special_characters:
+                if char in cls._quantifiers and prefix:
+                    # The last character is optional or repeatable
+                    prefix.pop()
+
+                break
+
+            prefix.append(char)
+
+        return "".join(prefix)
+
+    def _get_node(self, prefix: str) -> Node:
+        node = self.root
+
+        for char in prefix:
+            node = node.children.setdefault(char.lower(), self.Node())
+
+        return node
+
+    def add(self, order: str, priority: int, plugin_name: str) -> None:
+        # The bigger the priority number, the higher the priority
+        rank = (-priority, self.size)
+        self.size += 1
+
+        if self.is_literal(order):
+            node = self._get_node(order)
+
+            if node.order is None or rank < node.order[0]:
+                node.order = (rank, plugin_name)
+        else:
+            self._get_node(self.get_literal_prefix(order)).patterns.append(
+                (rank, re.compile(fr"^({order})\s*([\S\s]*)$", re.I), plugin_name)
+            )
+
+    def match(self, order_and_content: str) -> tuple[str | None, str | None, str | None]:
+        node = self.root
+        best: tuple[tuple[int, int], str, int] | None = None
+        candidates = list(node.patterns)
+
+        for i, char in enumerate(order_and_content):
+            if (node := node.children.get(char.lower())) is None:
+                break
+
+            if node.order and (best is None or node.order[0] < best[0]):
+                best = (node.order[0], node.order[1], i + 1)
+
+            candidates += node.patterns
+
+        # Patterns are only tried when they rank higher than the best literal order
+        for rank, pattern, plugin_name in sorted(candidates, key=lambda candidate: candidate[0]):
+            if best is not None and rank > best[0]:
+                break
+            elif match := pattern.fullmatch(order_and_content):
+                return plugin_name, match.group(1), match.group(2)
+
+        if best is not None:
+            _, plugin_name, length = best
+            return plugin_name, order_and_content[:length], order_and_content[length:].lstrip()
+
+        return None, None, None
+
 
+class DispatchManager(Manager):
     def __init__(self, context: "AppContext") -> None:
         super().__init__(context)
 
         self.order_plugins: dict[str, Type[OrderPlugin]] = {}
         self.event_plugins: dict[str, Type[EventPlugin]] = {}
-        self.orders: dict[int, list[dict[str, re.Pattern | str]]] = {}
+        self.orders: dict[int, list[dict[str, str]]] = {}
+        self.order_index = OrderIndex()
         self.events: dict[str, list[str]] = {}
 
     async def initialize(self) -> None:
@@ -79,9 +175,8 @@ class DispatchManager(Manager):
 
                 for order in plugin_orders:
                     if isinstance(order, str) and order:
-                        # Orders should be case-insensitive
                         orders[plugin.priority].append({
-                            "pattern": re.compile(fr"^({order})\s*([\S\s]*)$", re.I),
+                            "order": order,
                             "name": plugin_name
                         })
 
@@ -100,22 +195,75 @@ class DispatchManager(Manager):
 
         # The bigger the priority number, the higher the priority
         self.orders = dict(sorted(orders.items(), reverse=True))
+        self.order_index = OrderIndex()
         self.events = events
 
+        for priority, orders in self.orders.items():
+            for order_and_name in orders:
+                # Orders should be case-insensitive
+                self.order_index.add(order_and_name["order"], priority, order_and_name["name"])
+
         logger.info(
             f"{sum(len(orders) for orders in self.orders.values())} orders and {len(self.events)} events loaded"
         )
 
+    @staticmethod
+    def tokenize_order(message_content: str) -> tuple[str, int] | None:
+        """Split message content into order (with order content) and repetition.
+
+        The result is the same as matching `^\\s*[.。]\\s*([\\S\\s]+?)\\s*(?:#([1-9][0-9]*))?$`, but the message
+        content is scanned in linear time instead of backtracking.
+
+        Args:
+            message_content: Message content.
+
+        Returns:
+            Order (with order content) and repetition, or `None` if the message content is not an order.
+        """
+
+        start, end = 0, len(message_content)
+
+        while start < end and message_content[start].isspace():
+            start += 1
+
+        if start == end or message_content[start] not in ".\u3002":
+            return None
+
+        start += 1
+
+        while start < end and message_content[start].isspace():
+            start += 1
+
+        # Repetition like "#3" at the very end
+        digits_start = end
+
+        while digits_start > start and "0" <= message_content[digits_start - 1] <= "9":
+            digits_start -= 1
+
+        if start < digits_start < end and message_content[digits_start - 1] == "#" and \
+                message_content[digits_start] != "0":
+            order_end = digits_start - 1
+
+            while order_end > start and message_content[order_end - 1].isspace():
+                order_end -= 1
+
+            # Order cannot be empty
+            if order_end > start:
+                return message_content[start:order_end], int(message_content[digits_start:end])
+
+        while end > start and message_content[end - 1].isspace():
+            end -= 1
+
+        if end == start:
+            return None
+
+        return message_content[start:end], 1
+
     def find_plugin(self, plugin_name: str) -> Type[DiceRobotPlugin] | None:
         return self.order_plugins.get(plugin_name) or self.event_plugins.get(plugin_name)
 
     def match_plugin(self, order_and_content: str) -> tuple[str | None, str | None, str | None]:
-        for priority, orders in self.orders.items():
-            for pattern_and_name in orders:
-                if match := pattern_and_name["pattern"].fullmatch(order_and_content):
-                    return pattern_and_name["name"], match.group(1), match.group(2)
-
-        return None, None, None
+        return self.order_index.match(order_and_content)
 
     async def execute_plugin(self, plugin_instance: DiceRobotPlugin) -> None:
         if not self.context.plugin_settings.get(plugin=plugin_instance.name)["enabled"]:
@@ -150,20 +298,27 @@ class DispatchManager(Manager):
                 raise
 
     async def dispatch_order(self, message: Message, message_content: str) -> None:
-        match = self.order_pattern.fullmatch(message_content)
+        # Check length before parsing
+        if len(message_content) > self.context.settings.app.order.max_length:
+            logger.debug("Dispatch missed, message content too long")
+            raise RuntimeError
 
-        if not match:
+        if not (order_and_repetition := self.tokenize_order(message_content)):
             logger.debug("Dispatch missed")
             raise RuntimeError
 
-        order_and_content = match.group(1)
-        repetition = int(match.group(2)) if match.group(2) else 1
+        order_and_content, repetition = order_and_repetition
         plugin_name, order, order_content = self.match_plugin(order_and_content)
 
         if not plugin_name:
             logger.debug("Plugin match missed")
             raise RuntimeError
 
+        # Reject the order before constructing the plugin
+        if not self.context.rate_limit_manager.acquire(message, plugin_name, repetition):
+            logger.info(f"Dispatch to plugin {plugin_name} rejected, rate limit exceeded")
+            raise RuntimeError
+
         logger.info(f"Dispatch to plugin {plugin_name}")
 
         plugin_class = self.order_plugins[plugin_name]
@@ -0,0 +1,526 @@
+from typing import TYPE_CHECKING, Annotated, Union, get_args
+import asyncio
+import time
+from collections import deque
+
+from loguru import logger
+from pydantic import Field, TypeAdapter
+
+from ..globals import DEBUG
+from ..cache import TTLCache
+from ..enum import ApplicationStatus, ReportType, ReportPriority, NoticeType, ChatType, SegmentType
+from ..models.report import Report
+from ..models.report.message import (
+    Message, PrivateMessage, GroupMessage
+)
+from ..models.report.request import (
+    Request, FriendRequest, GroupRequest
+)
+from ..models.report.notice import (
+    Notice, FriendAddNotice, FriendRecallNotice, GroupUploadNotice, GroupAdminNotice, GroupBanNotice, GroupCardNotice,
+    GroupDecreaseNotice, GroupIncreaseNotice, GroupRecallNotice, GroupMessageEmojiLikeNotice, EssenceNotice,
+    NotifyNotice
+)
+from ..models.report.segment import Segment
+from ..network.listener import ReportListener
+from . import Manager
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "REPORTS",
+    "REPORT_TYPES",
+    "REPORT_ADAPTER",
+    "QuickReply",
+    "IngestionManager"
+]
+
+SUB_TYPE_FIELDS = {
+    ReportType.MESSAGE: "message_type",
+    ReportType.REQUEST: "request_type",
+    ReportType.NOTICE: "notice_type"
+}
+REPORTS = Annotated[
+    Union[
+        Annotated[Union[PrivateMessage, GroupMessage], Field(discriminator="message_type")],
+        Annotated[Union[FriendRequest, GroupRequest], Field(discriminator="request_type")],
+        Annotated[Union[
+            FriendAddNotice, FriendRecallNotice, GroupAdminNotice, GroupBanNotice, GroupCardNotice,
+            GroupDecreaseNotice, GroupIncreaseNotice, GroupRecallNotice, GroupUploadNotice, GroupMessageEmojiLikeNotice,
+            EssenceNotice, NotifyNotice
+        ], Field(discriminator="notice_type")]
+    ],
+    Field(discriminator="post_type")
+]
+# Report classes indexed by post type and sub type, derived from the union
+REPORT_TYPES: dict[tuple[str, str], type[Report]] = {
+    (
+        (post_type := report_class.model_fields["post_type"].default).value,
+        report_class.model_fields[SUB_TYPE_FIELDS[post_type]].default.value
+    ): report_class
+    for group in get_args(get_args(REPORTS)[0])
+    for report_class in get_args(get_args(group)[0])
+}
+IGNORED_TYPES = {
+    (ReportType.META_EVENT, None),
+    (ReportType.NOTICE, NoticeType.OFFLINE_FILE),
+    (ReportType.NOTICE, NoticeType.CLIENT_STATUS),
+}
+REPORT_ADAPTER: TypeAdapter[REPORTS] = TypeAdapter(REPORTS)
+
+
+class QuickReply:
+    """Slot of the reply that can be returned in the webhook response of a message.
+
+    The first reply is held in the slot, until the message is handled or the webhook stops waiting. Whoever closes the
+    slot first takes the held reply, so that the reply is delivered exactly once, either in the webhook response or by
+    an API request.
+    """
+
+    def __init__(self) -> None:
+        self.reply: list[Segment] | None = None
+        self.closed = False
+        self.done = asyncio.Event()
+
+    def hold(self, reply: list[Segment]) -> bool:
+        """Hold the reply in the slot.
+
+        Args:
+            reply: Reply segments.
+
+        Returns:
+            Whether the reply is held. `False` means the reply should be sent by an API request.
+        """
+
+        if self.closed or self.reply is not None:
+            return False
+
+        self.reply = reply
+        return True
+
+    def close(self) -> list[Segment] | None:
+        """Close the slot.
+
+        Returns:
+            The held reply if it has not been taken.
+        """
+
+        if self.closed:
+            return None
+
+        self.closed = True
+        reply, self.reply = self.reply, None
+        return reply
+
+
+class IngestionManager(Manager):
+    def __init__(self, context: "AppContext") -> None:
+        super().__init__(context)
+
+        # Reports of the same chat are put into the same lane and handled in order, while lanes are handled
+        # concurrently by workers. A lane is removed once it becomes empty.
+        self.lanes: dict[tuple[ChatType, int], deque[tuple[Message | Notice | Request, float]]] = {}
+        self.ready: asyncio.Queue[tuple[ChatType, int]] = asyncio.Queue()
+        self.workers: list[asyncio.Task] = []
+        self.pending = 0
+        self._unfinished = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._total_wait = 0.0
+        self._lag_monitor: asyncio.Task | None = None
+        self.loop_lag = 0.0
+        self._shed_counts: dict[str, int] = {}
+        self.quick_replies: dict[int, QuickReply] = {}
+        self.dedup_cache: TTLCache[tuple, None] = self._create_dedup_cache()
+        self.listener = ReportListener(context)
+
+    async def initialize(self) -> None:
+        self.dedup_cache = self._create_dedup_cache()
+        settings = self.context.settings.app.ingestion
+        self.workers = [asyncio.create_task(self._work()) for _ in range(settings.workers)]
+        self._lag_monitor = asyncio.create_task(self._monitor_loop_lag())
+        self.context.status.ingestion.queue_size = settings.queue_size
+        self.context.status.ingestion.workers = settings.workers
+        await self.listener.start()
+
+        logger.debug("Ingestion manager initialized")
+
+    async def cleanup(self) -> None:
+        logger.debug("Clean ingestion manager")
+
+        await self.listener.stop()
+
+        tasks = self.workers + ([self._lag_monitor] if self._lag_monitor else [])
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self._lag_monitor = None
+
+    def parse_report(self, content: dict) -> Message | Notice | Request | None:
+        """Parse a raw report received by any transport.
+
+        Reports that are ignored, irrelevant or duplicated are dropped before validation.
+
+        Args:
+            content: Raw report content.
+
+        Returns:
+            Validated report, or `None` if the report is dropped.
+
+        Raises:
+            ValueError: Report content is invalid.
+        """
+
+        logger.debug("Report content: {}", content)
+
+        post_type = content.get("post_type")
+        sub_type = content.get("message_type") or content.get("request_type") or content.get("notice_type")
+
+        if any([
+            (post_type, sub_type) in IGNORED_TYPES,
+            (post_type, None) in IGNORED_TYPES,
+            (post_type, sub_type) not in REPORT_TYPES,
+        ]):
+            logger.debug(f"Report \"{post_type} ({sub_type})\" ignored")
+            return None
+
+        # Cached information and member directory are updated by notices even if the notice is not handled
+        if post_type == ReportType.NOTICE:
+            self.context.network_manager.napcat.invalidate_cache(content)
+            self.context.member_manager.apply_notice(content)
+
+        # Drop irrelevant reports before constructing models
+        if reason := self.filter_report(content, REPORT_TYPES[(post_type, sub_type)]):
+            self.context.status.ingestion.filtered += 1
+            logger.debug(f"Report \"{post_type} ({sub_type})\" filtered, {reason}")
+            return None
+
+        # Reject the report posted again (usually after a timeout), so that it will not be handled twice
+        if self.check_duplicate(content):
+            logger.info(f"Report \"{post_type} ({sub_type})\" rejected, duplicated")
+            return None
+
+        logger.info(f"Report \"{post_type} ({sub_type})\" started")
+        report = REPORT_ADAPTER.validate_python(content)
+        self.context.status.ingestion.validated += 1
+
+        return report
+
+    def filter_report(self, content: dict, report_class: type[Report]) -> str | None:
+        """Check whether a raw report can be dropped without validation.
+
+        Only the reports that can never be dispatched are dropped, the others are left to be validated and handled.
+
+        Args:
+            content: Raw report content.
+            report_class: Report class of the content.
+
+        Returns:
+            Reason for dropping the report, or `None` if the report should be handled.
+        """
+
+        if content.get("post_type") == ReportType.MESSAGE:
+            if self.context.status.app != ApplicationStatus.RUNNING:
+                return "application not running"
+            elif not self.context.status.module.order:
+                return "order module disabled"
+
+            return self.filter_message_content(content, self.context.status.bot.id)
+        else:
+            if not self.context.status.module.event:
+                return "event module disabled"
+            elif report_class.__name__ not in self.context.dispatch_manager.events:
+                return "no plugin for the event"
+
+        return None
+
+    @staticmethod
+    def filter_message_content(content: dict, bot_id: int) -> str | None:
+        segments = content.get("message")
+
+        if not isinstance(segments, list):
+            # Message in string format, only the raw message can be checked
+            if isinstance(raw_message := content.get("raw_message"), str) and \
+                    raw_message.lstrip()[:1] not in (".", "\u3002", "["):
+                return "not an order"
+
+            return None
+
+        for segment in segments:
+            if not isinstance(segment, dict) or not isinstance(data := segment.get("data"), dict):
+                return None
+
+            match segment.get("type"):
+                case SegmentType.AT.value:
+                    if str(data.get("qq")) != str(bot_id):
+                        return "message targeted to others"
+                case SegmentType.TEXT.value:
+                    # The first non-empty text decides whether the message content starts with an order
+                    if isinstance(text := data.get("text"), str) and (text := text.strip()):
+                        return None if text[0] in (".", "\u3002") else "not an order"
+                case SegmentType.IMAGE.value:
+                    continue
+                case _:
+                    return "unsupported segment type"
+
+        return "not an order"
+
+    def _create_dedup_cache(self) -> TTLCache[tuple, None]:
+        settings = self.context.settings.app.deduplication
+        return TTLCache(max_size=settings.max_size, ttl=settings.window)
+
+    @staticmethod
+    def get_dedup_key(content: dict) -> tuple | None:
+        """Get the key identifying a raw report, so that the same report posted again can be recognized.
+
+        Args:
+            content: Raw report content.
+
+        Returns:
+            Key of the report, or `None` if the report cannot be identified.
+        """
+
+        match content.get("post_type"):
+            case ReportType.MESSAGE.value:
+                key = (ReportType.MESSAGE.value, content.get("self_id"), content.get("message_id"))
+            case ReportType.REQUEST.value:
+                key = (ReportType.REQUEST.value, content.get("flag"))
+            case _:
+                return None
+
+        return key if all(isinstance(item, (int, str)) for item in key) else None
+
+    def check_duplicate(self, content: dict) -> bool:
+        """Check whether a raw report has been received in the de-duplication window, and remember it if not.
+
+        Args:
+            content: Raw report content.
+
+        Returns:
+            Whether the report is a duplicate.
+        """
+
+        if not self.dedup_cache.ttl or (key := self.get_dedup_key(content)) is None:
+            return False
+
+        duplicated = not self.dedup_cache.add(key)
+        status = self.context.status.deduplication
+        status.checked += 1
+        status.duplicated += duplicated
+        status.size = len(self.dedup_cache)
+        status.hit_rate = round(status.duplicated / status.checked, 4)
+
+        return duplicated
+
+    @staticmethod
+    def get_lane_key(report: Message | Notice | Request) -> tuple[ChatType, int]:
+        if isinstance(report, Message):
+            return report.chat
+        elif group_id := getattr(report, "group_id", None):
+            return ChatType.GROUP, group_id
+        else:
+            return ChatType.FRIEND, report.user_id
+
+    @staticmethod
+    def get_priority(report: Message | Notice | Request) -> ReportPriority:
+        if isinstance(report, Notice):
+            return ReportPriority.LOW
+        elif isinstance(report, Message) and report.from_group:
+            return ReportPriority.NORMAL
+        else:
+            # Private messages and requests are rare and usually expect a response
+            return ReportPriority.HIGH
+
+    def is_stale(self, report: Message | Notice | Request) -> bool:
+        deadline = self.context.settings.app.ingestion.deadline
+        return deadline > 0 and time.time() - report.time > deadline
+
+    def is_overloaded(self) -> bool:
+        settings = self.context.settings.app.ingestion
+        return self.pending >= settings.queue_size * settings.shed_depth or self.loop_lag >= settings.max_loop_lag
+
+    def _log_shed(self, reason: str) -> None:
+        # Log sampled shed decisions, so that logging does not make overload worse
+        count = self._shed_counts[reason] = self._shed_counts.get(reason, 0) + 1
+
+        if (count - 1) % self.context.settings.app.ingestion.log_sample == 0:
+            logger.warning(f"Report dropped, {reason} ({count} in total)")
+
+    async def _monitor_loop_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = 0.1
+
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag = max(0.0, loop.time() - start - interval)
+            self.context.status.ingestion.loop_lag = round(self.loop_lag * 1000, 3)
+
+    async def submit(self, report: Message | Notice | Request) -> bool:
+        if DEBUG:
+            # Handle the report inline in debug mode, so that exceptions can be raised to the caller
+            await self.handle_report(report)
+            return True
+
+        status = self.context.status.ingestion
+
+        # Drop the report if the queue is full, instead of blocking the webhook
+        if self.pending >= self.context.settings.app.ingestion.queue_size:
+            status.dropped += 1
+            self._log_shed("ingestion queue full")
+            return False
+        elif self.is_stale(report):
+            status.stale += 1
+            self._log_shed("report older than deadline")
+            return False
+        elif self.get_priority(report) == ReportPriority.LOW and self.is_overloaded():
+            status.shed += 1
+            self._log_shed("low-priority report shed under load")
+            return False
+
+        key = self.get_lane_key(report)
+
+        if (lane := self.lanes.get(key)) is None:
+            lane = self.lanes[key] = deque()
+            self.ready.put_nowait(key)
+
+        lane.append((report, time.monotonic()))
+        self.pending += 1
+        self._unfinished += 1
+        self._idle.clear()
+        status.enqueued += 1
+        status.depth = self.pending
+        status.lanes = len(self.lanes)
+        logger.debug(f"Report enqueued to lane \"{key[0].value}/{key[1]}\"")
+
+        return True
+
+    async def submit_for_quick_reply(self, message: Message) -> list[Segment] | None:
+        """Submit a message, and wait for its reply to be returned in the webhook response.
+
+        Args:
+            message: Message.
+
+        Returns:
+            Reply segments, or `None` if there is no reply within the timeout.
+        """
+
+        slot = self.quick_replies[id(message)] = QuickReply()
+
+        try:
+            if await self.submit(message):
+                await asyncio.wait_for(slot.done.wait(), self.context.settings.app.quick_reply.timeout)
+        except asyncio.TimeoutError:
+            logger.debug("Quick reply timed out")
+        finally:
+            # Replies produced later are sent by API requests
+            self.quick_replies.pop(id(message), None)
+            reply = slot.close()
+
+        if reply is not None:
+            self.context.status.ingestion.quick_replied += 1
+
+        return reply
+
+    def get_quick_reply(self, message: Message) -> QuickReply | None:
+        return self.quick_replies.get(id(message))
+
+    async def join(self) -> None:
+        """Wait until all the submitted reports are handled."""
+
+        await self._idle.wait()
+
+    async def _work(self) -> None:
+        status = self.context.status.ingestion
+
+        while True:
+            key = await self.ready.get()
+            lane = self.lanes[key]
+            report, enqueued_at = lane.popleft()
+            wait = (time.monotonic() - enqueued_at) * 1000
+            self._total_wait += wait
+            self.pending -= 1
+            status.depth = self.pending
+
+            try:
+                # Drop the report that has waited too long, instead of replying late
+                if self.is_stale(report):
+                    status.stale += 1
+                    self._log_shed("report older than deadline")
+                else:
+                    await self.handle_report(report)
+            except Exception:
+                logger.exception("Unexpected exception occurred while handling report")
+            finally:
+                # Requeue the lane behind other lanes if it is not empty, so that a busy chat cannot starve others
+                if lane:
+                    self.ready.put_nowait(key)
+                else:
+                    del self.lanes[key]
+
+                self._unfinished -= 1
+
+                if self._unfinished == 0:
+                    self._idle.set()
+
+                status.handled += 1
+                status.lanes = len(self.lanes)
+                status.average_wait = round(self._total_wait / status.handled, 3)
+                status.max_wait = round(max(status.max_wait, wait), 3)
+
+    async def handle_report(self, report: Message | Notice | Request) -> None:
+        try:
+            if isinstance(report, Message):
+                await self.handle_message(report)
+            elif isinstance(report, (Notice, Request)):
+                await self.handle_event(report)
+
+            logger.info("Report completed")
+        except ValueError:
+            logger.warning("Report finished, message invalid")
+        except RuntimeError as e:
+            logger.info(e)
+        finally:
+            if slot := self.quick_replies.pop(id(report), None):
+                slot.done.set()
+
+    async def handle_message(self, message: Message) -> None:
+        # Check app status
+        if self.context.status.app != ApplicationStatus.RUNNING:
+            raise RuntimeError("Report skipped, application not running")
+
+        # Check module status
+        if not self.context.status.module.order:
+            raise RuntimeError("Report skipped, order module disabled")
+
+        if isinstance(message, GroupMessage):
+            self.context.member_manager.observe(message)
+
+        message_contents = []
+
+        for segment in message.message:
+            match segment.type:
+                case SegmentType.AT:
+                    if segment.data.qq == self.context.status.bot.id:
+                        continue
+                    else:
+                        raise RuntimeError("Report filtered, message targeted to others detected")
+                case SegmentType.TEXT:
+                    message_contents.append(segment.data.text.strip())
+                case SegmentType.IMAGE:
+                    continue
+                case _:
+                    raise RuntimeError(f"Report filtered, unsupported segment type \"{segment.type.value}\" detected")
+
+        await self.context.dispatch_manager.dispatch_order(message, "\n".join(message_contents).strip())
+
+    async def handle_event(self, event: Notice | Request) -> None:
+        # Check module status
+        if not self.context.status.module.event:
+            raise RuntimeError("Report skipped, event module disabled")
+
+        await self.context.dispatch_manager.dispatch_event(event)
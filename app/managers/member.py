@@ -0,0 +1,224 @@
+from typing import TYPE_CHECKING
+from collections import OrderedDict
+import asyncio
+import math
+import time
+
+from loguru import logger
+
+from ..enum import NoticeType, GroupAdminNoticeSubType, Role
+from ..exceptions import DiceRobotRuntimeException
+from ..models.report.message import GroupMessage
+from . import Manager
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "Member",
+    "MemberManager"
+]
+
+
+class Member:
+    """Compact entry of a group member."""
+
+    __slots__ = ("card", "nickname", "role")
+
+    def __init__(self, card: str, nickname: str, role: Role) -> None:
+        self.card = card
+        self.nickname = nickname
+        self.role = role
+
+    @property
+    def name(self) -> str:
+        """Name shown in the group, which is the group card if set, otherwise the nickname."""
+
+        return self.card or self.nickname
+
+
+class MemberManager(Manager):
+    def __init__(self, context: "AppContext") -> None:
+        super().__init__(context)
+
+        # Member lists of groups, ordered from the least recently active group
+        self.groups: OrderedDict[int, dict[int, Member]] = OrderedDict()
+        self.loaded_at: dict[int, float] = {}
+        self.attempted_at: dict[int, float] = {}
+        self.size = 0
+        self._loading: dict[int, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def initialize(self) -> None:
+        logger.debug("Member manager initialized")
+
+    async def cleanup(self) -> None:
+        logger.debug("Clean member manager")
+
+        tasks = list(self._loading.values()) + list(self._tasks)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get(self, group_id: int, user_id: int) -> Member | None:
+        """Get a member from the directory without calling any API.
+
+        Args:
+            group_id: Group ID.
+            user_id: User ID.
+
+        Returns:
+            Member, or `None` if the member list of the group is not loaded or the user is not a member.
+        """
+
+        if (members := self.groups.get(group_id)) is None:
+            return None
+
+        self.groups.move_to_end(group_id)
+        return members.get(user_id)
+
+    def get_members(self, group_id: int) -> dict[int, Member] | None:
+        if (members := self.groups.get(group_id)) is not None:
+            self.groups.move_to_end(group_id)
+
+        return members
+
+    def observe(self, message: GroupMessage) -> None:
+        """Update the directory with a group message.
+
+        The member list is loaded in the background if the group is active for the first time, or if it has expired.
+        Otherwise, the sender is updated.
+
+        Args:
+            message: Group message.
+        """
+
+        settings = self.context.settings.app.member_directory
+        now = time.monotonic()
+        loaded_at = self.loaded_at.get(message.group_id)
+
+        if loaded_at is None or now - loaded_at > settings.ttl:
+            # Loading is not attempted again too soon after a failure
+            if now - self.attempted_at.get(message.group_id, -math.inf) >= settings.retry_interval:
+                self.load(message.group_id)
+        elif message.sender.role is not None:
+            self._set_member(
+                message.group_id, message.sender.user_id, message.sender.card or "", message.sender.nickname,
+                message.sender.role
+            )
+
+    def load(self, group_id: int) -> None:
+        """Load the member list of a group in the background.
+
+        Args:
+            group_id: Group ID.
+        """
+
+        if group_id not in self._loading:
+            self.attempted_at[group_id] = time.monotonic()
+            task = self._loading[group_id] = asyncio.create_task(self._load(group_id))
+            task.add_done_callback(lambda _: self._loading.pop(group_id, None))
+            task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and (e := task.exception()):
+            logger.opt(exception=e).error("Unexpected exception occurred while updating member directory")
+
+    async def _load(self, group_id: int) -> None:
+        try:
+            result = await self.context.network_manager.napcat.get_group_member_list(group_id)
+        except DiceRobotRuntimeException:
+            logger.warning(f"Failed to load member list of group {group_id}")
+            return
+
+        self.attempted_at.pop(group_id, None)
+        self._put(group_id, {
+            member.user_id: Member(member.card, member.nickname, member.role) for member in result.data
+        })
+        self.context.status.member_directory.loads += 1
+        logger.debug(f"Member list of group {group_id} loaded, {len(result.data)} members")
+
+    async def _load_member(self, group_id: int, user_id: int) -> None:
+        try:
+            member = (await self.context.network_manager.napcat.get_group_member_info(group_id, user_id)).data
+        except DiceRobotRuntimeException:
+            logger.warning(f"Failed to load member {user_id} of group {group_id}")
+            return
+
+        self._set_member(group_id, user_id, member.card, member.nickname, member.role)
+
+    def _set_member(self, group_id: int, user_id: int, card: str, nickname: str, role: Role) -> None:
+        # Only the groups whose member lists are loaded are kept up to date
+        if (members := self.groups.get(group_id)) is None:
+            return
+
+        if (member := members.get(user_id)) is None:
+            members[user_id] = Member(card, nickname, role)
+            self.size += 1
+            self._evict()
+        else:
+            member.card, member.nickname, member.role = card, nickname, role
+
+    def _put(self, group_id: int, members: dict[int, Member]) -> None:
+        self.drop(group_id)
+        self.groups[group_id] = members
+        self.loaded_at[group_id] = time.monotonic()
+        self.size += len(members)
+        self._evict()
+
+    def drop(self, group_id: int) -> None:
+        if (members := self.groups.pop(group_id, None)) is not None:
+            self.size -= len(members)
+
+        self.loaded_at.pop(group_id, None)
+        self._update_status()
+
+    def _evict(self) -> None:
+        # Evict least recently active groups as a whole, but always keep the latest one
+        while self.size > self.context.settings.app.member_directory.max_members and len(self.groups) > 1:
+            group_id = next(iter(self.groups))
+            self.drop(group_id)
+            self.context.status.member_directory.evicted += 1
+            logger.debug(f"Member list of group {group_id} evicted")
+
+        self._update_status()
+
+    def _update_status(self) -> None:
+        status = self.context.status.member_directory
+        status.groups = len(self.groups)
+        status.members = self.size
+
+    def apply_notice(self, content: dict) -> None:
+        """Apply the change of a notice to the directory.
+
+        Args:
+            content: Raw notice content.
+        """
+
+        group_id, user_id = content.get("group_id"), content.get("user_id")
+
+        if (members := self.groups.get(group_id)) is None:
+            return
+
+        match content.get("notice_type"):
+            case NoticeType.GROUP_CARD:
+                if (member := members.get(user_id)) is not None:
+                    member.card = content.get("card_new") or ""
+            case NoticeType.GROUP_ADMIN:
+                if (member := members.get(user_id)) is not None:
+                    member.role = Role.ADMIN if content.get("sub_type") == GroupAdminNoticeSubType.SET else Role.MEMBER
+            case NoticeType.GROUP_DECREASE:
+                if user_id == self.context.status.bot.id:
+                    # The bot left the group
+                    self.drop(group_id)
+                elif members.pop(user_id, None) is not None:
+                    self.size -= 1
+                    self._update_status()
+            case NoticeType.GROUP_INCREASE:
+                # Notice does not contain the nickname of the new member
+                task = asyncio.create_task(self._load_member(group_id, user_id))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                task.add_done_callback(self._task_done)
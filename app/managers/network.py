@@ -1,5 +1,8 @@
 from typing import TYPE_CHECKING
 
+from loguru import logger
+
+from ..enum import TransportMode
 from ..network.cloud import CloudService
 from ..network.napcat import NapCatService
 from . import Manager
@@ -18,3 +21,14 @@ class NetworkManager(Manager):
 
         self.napcat = NapCatService(context)
         self.cloud = CloudService(context)
+
+    async def initialize(self) -> None:
+        if self.context.settings.napcat.transport == TransportMode.WEBSOCKET:
+            await self.napcat.websocket.start()
+
+        logger.debug("Network manager initialized")
+
+    async def cleanup(self) -> None:
+        logger.debug("Clean network manager")
+
+        await self.napcat.websocket.stop()
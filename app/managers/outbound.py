@@ -0,0 +1,280 @@
+from typing import TYPE_CHECKING, Any
+import asyncio
+import heapq
+import itertools
+import time
+
+from loguru import logger
+
+from ..cache import TTLCache
+from ..enum import ChatType, MessagePriority
+from ..exceptions import NetworkError, NetworkServerError
+from ..models.report.segment import Segment
+from .rate_limit import TokenBucket
+from . import Manager
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "OutboundMessage",
+    "OutboundManager"
+]
+
+
+class OutboundMessage:
+    """Message waiting to be sent.
+
+    Messages are ordered by priority first, and then by the order they are enqueued.
+    """
+
+    __slots__ = ("priority", "sequence", "message", "future", "durable", "enqueued_at")
+
+    def __init__(
+        self,
+        priority: MessagePriority,
+        sequence: int,
+        message: list[Segment],
+        future: asyncio.Future,
+        durable: bool = True
+    ) -> None:
+        self.priority = priority
+        self.sequence = sequence
+        self.message = message
+        self.future = future
+        self.durable = durable
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: "OutboundMessage") -> bool:
+        return (-self.priority, self.sequence) < (-other.priority, other.sequence)
+
+
+class OutboundManager(Manager):
+    def __init__(self, context: "AppContext") -> None:
+        super().__init__(context)
+
+        # Each chat has its own queue and sender, which exits once the queue becomes empty
+        self.queues: dict[tuple[ChatType, int], list[OutboundMessage]] = {}
+        self.senders: dict[tuple[ChatType, int], asyncio.Task] = {}
+        self.buckets: TTLCache[tuple[ChatType, int], TokenBucket] = TTLCache(
+            max_size=context.settings.app.outbound.max_chats, ttl=60
+        )
+        self.backoffs: dict[tuple[ChatType, int], tuple[float, float]] = {}
+        self.depth = 0
+        self._sequence = itertools.count()
+        self._total_delay = 0.0
+        self._delivered = 0
+
+    async def initialize(self) -> None:
+        logger.debug("Outbound manager initialized")
+
+    async def cleanup(self) -> None:
+        logger.debug("Clean outbound manager")
+
+        senders = list(self.senders.values())
+
+        for sender in senders:
+            sender.cancel()
+
+        await asyncio.gather(*senders, return_exceptions=True)
+
+    async def send_group_message(
+        self,
+        group_id: int,
+        message: list[Segment],
+        priority: MessagePriority = MessagePriority.NORMAL
+    ) -> Any:
+        """Send a message to a group once it is allowed by pacing.
+
+        Args:
+            group_id: Group ID.
+            message: Segments.
+            priority: Priority of the message.
+
+        Returns:
+            Response of NapCat API.
+
+        Raises:
+            NetworkError: Failed to send the message.
+        """
+
+        return await self.send((ChatType.GROUP, group_id), message, priority)
+
+    async def send_private_message(
+        self,
+        user_id: int,
+        message: list[Segment],
+        priority: MessagePriority = MessagePriority.NORMAL
+    ) -> Any:
+        """Send a message to a user once it is allowed by pacing.
+
+        Args:
+            user_id: User ID.
+            message: Segments.
+            priority: Priority of the message.
+
+        Returns:
+            Response of NapCat API.
+
+        Raises:
+            NetworkError: Failed to send the message.
+        """
+
+        return await self.send((ChatType.FRIEND, user_id), message, priority)
+
+    async def send(
+        self,
+        chat: tuple[ChatType, int],
+        message: list[Segment],
+        priority: MessagePriority,
+        durable: bool = True
+    ) -> Any:
+        """Send a message to a chat once it is allowed by pacing.
+
+        Args:
+            chat: Chat type and chat ID.
+            message: Segments.
+            priority: Priority of the message.
+            durable: Whether to save the message to the outbox if NapCat is unavailable. If saved, `None` is returned
+                instead of raising an error.
+
+        Returns:
+            Response of NapCat API.
+
+        Raises:
+            NetworkError: Failed to send the message.
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self.queues.setdefault(chat, []), OutboundMessage(priority, next(self._sequence), message, future, durable)
+        )
+        self.depth += 1
+        self._update_status()
+
+        if chat not in self.senders:
+            self.senders[chat] = asyncio.create_task(self._run(chat))
+
+        return await future
+
+    def get_delay(self, chat: tuple[ChatType, int], now: float) -> float:
+        """Get the time to wait before sending the next message to the chat.
+
+        Args:
+            chat: Chat type and chat ID.
+            now: Current time.
+
+        Returns:
+            Delay (in seconds), 0 means the message can be sent now.
+        """
+
+        settings = self.context.settings.app.outbound
+        delay = max(0.0, self.backoffs[chat][1] - now) if chat in self.backoffs else 0.0
+
+        if settings.interval > 0 and (bucket := self.buckets.get(chat)) is not None:
+            bucket.refill(60 / settings.interval, settings.burst, now)
+
+            if bucket.tokens < 1:
+                delay = max(delay, (1 - bucket.tokens) * settings.interval)
+
+        return delay
+
+    def _consume(self, chat: tuple[ChatType, int], now: float) -> None:
+        settings = self.context.settings.app.outbound
+
+        if settings.interval <= 0:
+            return
+
+        if (bucket := self.buckets.get(chat)) is None:
+            bucket = TokenBucket(settings.burst, now)
+
+        bucket.tokens -= 1
+        # The bucket expires once it would have been refilled
+        self.buckets.set(chat, bucket, ttl=(settings.burst - bucket.tokens) * settings.interval)
+
+    async def _run(self, chat: tuple[ChatType, int]) -> None:
+        queue = self.queues[chat]
+        item: OutboundMessage | None = None
+
+        try:
+            while queue:
+                if (delay := self.get_delay(chat, time.monotonic())) > 0:
+                    await asyncio.sleep(delay)
+                    continue
+
+                item = heapq.heappop(queue)
+                self.depth -= 1
+                self._update_status()
+
+                # The caller has given up
+                if item.future.done():
+                    continue
+
+                now = time.monotonic()
+                self._consume(chat, now)
+                self._record_delay(now - item.enqueued_at)
+
+                try:
+                    result = await self._deliver(chat, item.message)
+                except Exception as e:
+                    self.context.status.outbound.failed += 1
+
+                    if isinstance(e, NetworkServerError):
+                        self._back_off(chat)
+
+                    if item.future.done():
+                        continue
+                    elif (
+                        item.durable and isinstance(e, NetworkError) and
+                        self.context.outbox_manager.add(chat, item.message)
+                    ):
+                        # Message will be sent again by outbox manager
+                        item.future.set_result(None)
+                    else:
+                        item.future.set_exception(e)
+                else:
+                    self.context.status.outbound.sent += 1
+                    self.backoffs.pop(chat, None)
+
+                    if not item.future.done():
+                        item.future.set_result(result)
+        finally:
+            # Messages left by cancellation will never be sent
+            for item in [item] + queue if item else queue:
+                if not item.future.done():
+                    item.future.cancel()
+
+            self.depth -= len(queue)
+            del self.queues[chat]
+            del self.senders[chat]
+
+            if chat in self.backoffs and self.backoffs[chat][1] <= time.monotonic():
+                del self.backoffs[chat]
+
+            self._update_status()
+
+    async def _deliver(self, chat: tuple[ChatType, int], message: list[Segment]) -> Any:
+        chat_type, chat_id = chat
+
+        if chat_type == ChatType.GROUP:
+            return await self.context.network_manager.napcat.send_group_message(chat_id, message)
+        else:
+            return await self.context.network_manager.napcat.send_private_message(chat_id, message)
+
+    def _back_off(self, chat: tuple[ChatType, int]) -> None:
+        settings = self.context.settings.app.outbound
+        backoff = min(self.backoffs[chat][0] * 2, settings.max_backoff) if chat in self.backoffs else settings.backoff
+        self.backoffs[chat] = (backoff, time.monotonic() + backoff)
+        logger.warning(f"Failed to send message to {chat[0].value} {chat[1]}, back off for {backoff} seconds")
+
+    def _record_delay(self, delay: float) -> None:
+        status = self.context.status.outbound
+        delay *= 1000
+        self._total_delay += delay
+        self._delivered += 1
+        status.average_delay = round(self._total_delay / self._delivered, 3)
+        status.max_delay = round(max(status.max_delay, delay), 3)
+
+    def _update_status(self) -> None:
+        self.context.status.outbound.depth = self.depth
+        self.context.status.outbound.chats = len(self.queues)
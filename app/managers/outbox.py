@@ -0,0 +1,235 @@
+from typing import TYPE_CHECKING
+import asyncio
+import math
+import random
+import time
+
+from loguru import logger
+from sqlalchemy import select, insert, update, delete, func
+
+from .. import codec
+from ..database import Outbox
+from ..enum import ApplicationStatus, ChatType, MessagePriority
+from ..exceptions import DiceRobotRuntimeException, NetworkError
+from ..models.report.segment import Segment
+from . import Manager
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "OutboxManager"
+]
+
+
+class OutboxManager(Manager):
+    def __init__(self, context: "AppContext") -> None:
+        super().__init__(context)
+
+        # Messages waiting to be written to the database in one batch
+        self.pending: list[dict] = []
+        self.size = 0
+        self.next_attempt_at = math.inf
+        self._replay = False
+        self._wake = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self._retrier: asyncio.Task | None = None
+
+    async def initialize(self) -> None:
+        async with self.context.database_manager.get_session() as session:
+            self.size, next_attempt_at = (await session.execute(
+                select(func.count(), func.min(Outbox.next_attempt_at)).select_from(Outbox)
+            )).one()
+
+        self.next_attempt_at = next_attempt_at if next_attempt_at is not None else math.inf
+        self._update_status()
+        self._flusher = asyncio.create_task(self._flush_periodically())
+        self._retrier = asyncio.create_task(self._retry_when_due())
+
+        logger.debug("Outbox manager initialized")
+
+    async def cleanup(self) -> None:
+        logger.debug("Clean outbox manager")
+
+        tasks = [task for task in (self._flusher, self._retrier) if task]
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._flusher = self._retrier = None
+        await self.flush()
+
+    def get_delay(self, attempts: int) -> float:
+        settings = self.context.settings.app.outbox
+        delay = min(settings.backoff * 2 ** attempts, settings.max_backoff)
+        return delay * random.uniform(1 - settings.jitter, 1 + settings.jitter)
+
+    def add(self, chat: tuple[ChatType, int], message: list[Segment]) -> bool:
+        """Save an unsent message, which will be written to the database in the next batch.
+
+        Args:
+            chat: Chat type and chat ID.
+            message: Segments.
+
+        Returns:
+            Whether the message is saved.
+        """
+
+        if not self.context.settings.app.outbox.enabled:
+            return False
+
+        now = time.time()
+        self.pending.append({
+            "chat_type": chat[0],
+            "chat_id": chat[1],
+            "message": codec.dumps_str(message),
+            "created_at": now,
+            "attempts": 0,
+            "next_attempt_at": now + self.get_delay(0)
+        })
+        self.size += 1
+        self.context.status.outbox.saved += 1
+        self._update_status()
+
+        logger.info(f"Message to {chat[0].value} {chat[1]} saved to outbox")
+        return True
+
+    async def flush(self) -> None:
+        """Write saved messages to the database."""
+
+        if not self.pending:
+            return
+
+        rows, self.pending = self.pending, []
+
+        try:
+            async with self.context.database_manager.get_session() as session:
+                await session.execute(insert(Outbox), rows)
+        except Exception:
+            logger.exception("Failed to write outbox")
+            self.pending = rows + self.pending
+            return
+
+        if (next_attempt_at := min(row["next_attempt_at"] for row in rows)) < self.next_attempt_at:
+            self.next_attempt_at = next_attempt_at
+            self._wake.set()
+
+    def replay(self) -> None:
+        """Send all saved messages again as soon as possible, regardless of their schedules."""
+
+        if self.size > 0:
+            self._replay = True
+            self._wake.set()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.context.settings.app.outbox.flush_interval)
+            await self.flush()
+
+    async def _retry_when_due(self) -> None:
+        while True:
+            if math.isinf(self.next_attempt_at) or self.context.status.app != ApplicationStatus.RUNNING:
+                # Messages cannot be sent until woken up, e.g. by replay once the application is running again
+                timeout = None
+            else:
+                timeout = max(0.0, self.next_attempt_at - time.time())
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wake.clear()
+
+            try:
+                await self.retry()
+            except Exception:
+                logger.exception("Failed to send messages in outbox")
+
+    async def retry(self) -> None:
+        """Send saved messages that are due in order.
+
+        Messages of the same chat are always sent in the order they were saved, so a message is not sent before the
+        earlier ones of the same chat. A chat is skipped after its first failure, while other chats are still sent.
+        """
+
+        if self.size == 0 or self.context.status.app != ApplicationStatus.RUNNING:
+            return
+
+        await self.flush()
+        replay, self._replay = self._replay, False
+        settings = self.context.settings.app.outbox
+        last_id = 0
+
+        while True:
+            async with self.context.database_manager.get_session() as session:
+                rows = (await session.execute(
+                    select(Outbox).where(Outbox.id > last_id).order_by(Outbox.id).limit(settings.batch_size)
+                )).scalars().all()
+
+            if not rows:
+                break
+
+            now = time.time()
+            blocked: set[tuple[ChatType, int]] = set()
+            finished: list[int] = []
+            postponed: list[dict] = []
+
+            for row in rows:
+                chat = (row.chat_type, row.chat_id)
+
+                if row.created_at + settings.ttl <= now:
+                    finished.append(row.id)
+                    self.context.status.outbox.expired += 1
+                    logger.warning(f"Message to {chat[0].value} {chat[1]} in outbox expired")
+                    continue
+                elif chat in blocked:
+                    continue
+                elif not replay and row.next_attempt_at > now:
+                    blocked.add(chat)
+                    continue
+
+                try:
+                    await self.context.outbound_manager.send(
+                        chat,
+                        codec.get_adapter(list[Segment]).validate_json(row.message),
+                        MessagePriority.LOW,
+                        durable=False
+                    )
+                except NetworkError:
+                    postponed.append({
+                        "id": row.id,
+                        "attempts": row.attempts + 1,
+                        "next_attempt_at": now + self.get_delay(row.attempts + 1)
+                    })
+                    self.context.status.outbox.retried += 1
+                    blocked.add(chat)
+                except (DiceRobotRuntimeException, ValueError):
+                    # The message is rejected by NapCat or invalid, and will never be sent successfully
+                    finished.append(row.id)
+                    logger.error(f"Message to {chat[0].value} {chat[1]} in outbox discarded")
+                else:
+                    finished.append(row.id)
+                    self.context.status.outbox.delivered += 1
+
+            async with self.context.database_manager.get_session() as session:
+                if finished:
+                    await session.execute(delete(Outbox).where(Outbox.id.in_(finished)))
+                if postponed:
+                    await session.execute(update(Outbox), postponed)
+
+            self.size -= len(finished)
+            self._update_status()
+            last_id = rows[-1].id
+
+            if len(rows) < settings.batch_size:
+                break
+
+        async with self.context.database_manager.get_session() as session:
+            next_attempt_at = (await session.execute(select(func.min(Outbox.next_attempt_at)))).scalar()
+
+        self.next_attempt_at = next_attempt_at if next_attempt_at is not None else math.inf
+
+    def _update_status(self) -> None:
+        self.context.status.outbox.size = self.size
@@ -0,0 +1,136 @@
+from typing import TYPE_CHECKING, Any
+from collections.abc import Mapping
+import time
+
+from loguru import logger
+
+from ..cache import TTLCache
+from ..enum import ChatType
+from ..models.report.message import Message
+from . import Manager
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "TokenBucket",
+    "RateLimitManager"
+]
+
+
+class TokenBucket:
+    """Token bucket, refilled lazily when it is used."""
+
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float) -> None:
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+    def refill(self, rate: float, burst: int, now: float) -> None:
+        self.tokens = min(burst, self.tokens + (now - self.updated_at) * rate / 60)
+        self.updated_at = now
+
+
+class RateLimitManager(Manager):
+    def __init__(self, context: "AppContext") -> None:
+        super().__init__(context)
+
+        # A bucket expires once it would have been refilled, so an expired bucket is the same as a full one
+        max_buckets = self.context.settings.app.rate_limit.max_buckets
+        self.user_buckets: TTLCache[int, TokenBucket] = TTLCache(max_size=max_buckets, ttl=60)
+        self.group_buckets: TTLCache[int, TokenBucket] = TTLCache(max_size=max_buckets, ttl=60)
+        self.plugin_buckets: TTLCache[str, TokenBucket] = TTLCache(max_size=max_buckets, ttl=60)
+
+    async def initialize(self) -> None:
+        logger.debug("Rate limit manager initialized")
+
+    @staticmethod
+    def parse_limit(limit: Any) -> tuple[float, int] | None:
+        """Parse a limit from settings.
+
+        Args:
+            limit: Limit model, or dictionary with `rate` and `burst` items.
+
+        Returns:
+            Rate and burst, or `None` if there is no limit.
+        """
+
+        if isinstance(limit, Mapping):
+            try:
+                rate, burst = float(limit.get("rate", 0)), int(limit.get("burst", 1))
+            except (TypeError, ValueError):
+                logger.warning(f"Invalid rate limit {limit} ignored")
+                return None
+        elif limit is not None:
+            rate, burst = limit.rate, limit.burst
+        else:
+            return None
+
+        return (rate, burst) if rate > 0 and burst > 0 else None
+
+    def acquire(self, message: Message, plugin_name: str, cost: int = 1) -> bool:
+        """Consume tokens for an order from the buckets of the user, the group and the plugin.
+
+        Tokens are consumed only if all the buckets have enough tokens.
+
+        Args:
+            message: Message of the order.
+            plugin_name: Name of the plugin the order is dispatched to.
+            cost: Number of tokens needed, usually the repetitions of the order.
+
+        Returns:
+            Whether the order is allowed.
+        """
+
+        settings = self.context.settings.app.rate_limit
+        limits: list[tuple[TTLCache, int | str, tuple[float, int] | None]] = [
+            (self.user_buckets, message.user_id, self.parse_limit(settings.user))
+        ]
+
+        if message.from_group:
+            chat_limit = self.context.chat_settings.get_context(
+                chat_type=ChatType.GROUP, chat_id=message.group_id
+            ).dicerobot.get("rate_limit")
+            limits.append((
+                self.group_buckets,
+                message.group_id,
+                self.parse_limit(chat_limit) if chat_limit is not None else self.parse_limit(settings.group)
+            ))
+
+        limits.append((
+            self.plugin_buckets,
+            plugin_name,
+            self.parse_limit(self.context.plugin_settings.get(plugin=plugin_name).get("rate_limit"))
+        ))
+
+        now = time.monotonic()
+        buckets: list[tuple[TTLCache, int | str, TokenBucket, float, int]] = []
+
+        for cache, key, limit in limits:
+            if limit is None:
+                continue
+
+            rate, burst = limit
+
+            if (bucket := cache.get(key)) is None:
+                bucket = TokenBucket(burst, now)
+            else:
+                bucket.refill(rate, burst, now)
+
+            # An order costing more than the burst would never be allowed
+            if bucket.tokens < min(cost, burst):
+                self.context.status.rate_limit.limited += 1
+                return False
+
+            buckets.append((cache, key, bucket, rate, burst))
+
+        for cache, key, bucket, rate, burst in buckets:
+            bucket.tokens -= min(cost, burst)
+            cache.set(key, bucket, ttl=(burst - bucket.tokens) * 60 / rate)
+
+        status = self.context.status.rate_limit
+        status.allowed += 1
+        status.buckets = len(self.user_buckets) + len(self.group_buckets) + len(self.plugin_buckets)
+
+        return True
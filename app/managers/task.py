@@ -1,4 +1,5 @@
 from typing import TYPE_CHECKING
+import asyncio
 
 from loguru import logger
 from apscheduler.triggers.cron import CronTrigger
@@ -7,7 +8,11 @@ from apscheduler.triggers.date import DateTrigger
 import arrow
 
 from ..models.task import ScheduledTask
-from ..tasks import restart, save_config, start_napcat, check_bot_status, refresh_friend_list, refresh_group_list
+from ..enum import CircuitState
+from ..network.breaker import CircuitBreaker
+from ..tasks import (
+    restart, save_config, start_napcat, check_bot_status, handle_napcat_circuit, refresh_friend_list, refresh_group_list
+)
 from . import Manager
 
 if TYPE_CHECKING:
@@ -24,6 +29,9 @@ class TaskManager(Manager):
 
         self.scheduler = context.scheduler
         self._tasks: dict[str, ScheduledTask] = {}
+        self._handlers: set[asyncio.Task] = set()
+        # Held while bot status is being checked
+        self.bot_status_lock = asyncio.Lock()
 
     async def initialize(self) -> None:
         self._tasks = {
@@ -49,12 +57,30 @@ class TaskManager(Manager):
             await self.run_task_later("dicerobot.check_bot_status", 1)
 
         await self.scheduler.start_in_background()
+        self.context.circuit_breakers.listeners.append(self.on_circuit_changed)
         logger.debug("Schedule manager initialized")
 
     async def cleanup(self):
         logger.debug("Clean schedule manager")
+
+        if self.on_circuit_changed in self.context.circuit_breakers.listeners:
+            self.context.circuit_breakers.listeners.remove(self.on_circuit_changed)
+
+        for handler in self._handlers:
+            handler.cancel()
+
+        await asyncio.gather(*self._handlers, return_exceptions=True)
         await self.scheduler.stop()
 
+    def on_circuit_changed(self, breaker: CircuitBreaker, _: CircuitState) -> None:
+        # Application status follows the circuit of NapCat
+        if breaker.name != self.context.network_manager.napcat.breaker_name or breaker.state == CircuitState.HALF_OPEN:
+            return
+
+        handler = asyncio.create_task(handle_napcat_circuit(self.context, breaker.state))
+        self._handlers.add(handler)
+        handler.add_done_callback(self._handlers.discard)
+
     async def run_task_later(self, task_id: str, delay: int = 0):
         if task_id not in self._tasks:
             raise ValueError(f"Task ID \"{task_id}\" not registered")
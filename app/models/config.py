@@ -1,21 +1,26 @@
-from typing import Any
+from typing import Any, Self
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
 import os
 import secrets
 from ipaddress import IPv4Address
 from copy import deepcopy
 
-from pydantic import Field, field_serializer
+from pydantic import Field, field_serializer, model_validator
 from werkzeug.security import generate_password_hash
 
 from ..globals import VERSION, LOG_DIR
-from ..enum import ApplicationStatus, ChatType
-from ..utils import deep_update
+from ..enum import ApplicationStatus, ChatType, TransportMode, ListenerMode, CircuitState
+from ..utils import deep_update, freeze
+from ..template import ReplyTemplate
 from . import BaseModel
 
 __all__ = [
     "Status",
     "Settings",
     "PluginSettings",
+    "ChatContext",
     "ChatSettings",
     "Replies"
 ]
@@ -31,6 +36,17 @@ class Status(BaseModel):
         module: Module status.
         plugins: Loaded plugin list.
         bot: Bot information.
+        ingestion: Report ingestion status.
+        deduplication: Report de-duplication status.
+        rate_limit: Rate limiting status.
+        websocket: OneBot WebSocket connection status.
+        endpoints: NapCat API endpoint status, keyed by action name.
+        concurrency: NapCat API concurrency status.
+        info_cache: Group and member information cache status.
+        member_directory: Group member directory status.
+        outbound: Outbound message status.
+        outbox: Outbox status.
+        circuit_breakers: Circuit breaker status, keyed by upstream host.
     """
 
     class Module(BaseModel):
@@ -72,12 +88,220 @@ class Status(BaseModel):
         friends: list[int] = []
         groups: list[int] = []
 
+    class Ingestion(BaseModel):
+        """Report ingestion status.
+
+        Attributes:
+            queue_size: Maximum number of reports waiting in the queue.
+            workers: Number of workers handling reports.
+            depth: Number of reports waiting in the queue.
+            lanes: Number of chats that have reports waiting or being handled.
+            filtered: Number of reports dropped before validation.
+            validated: Number of reports validated.
+            enqueued: Number of reports enqueued.
+            handled: Number of reports handled.
+            dropped: Number of reports dropped because the queue is full.
+            shed: Number of low-priority reports shed because the application is overloaded.
+            quick_replied: Number of replies returned in webhook responses.
+            stale: Number of reports dropped because they are older than the deadline.
+            average_wait: Average time (in milliseconds) that reports waited in the queue.
+            max_wait: Maximum time (in milliseconds) that reports waited in the queue.
+            loop_lag: Latest event loop lag (in milliseconds).
+        """
+
+        queue_size: int = 0
+        workers: int = 0
+        depth: int = 0
+        lanes: int = 0
+        filtered: int = 0
+        validated: int = 0
+        enqueued: int = 0
+        handled: int = 0
+        dropped: int = 0
+        shed: int = 0
+        quick_replied: int = 0
+        stale: int = 0
+        average_wait: float = 0
+        max_wait: float = 0
+        loop_lag: float = 0
+
+    class Deduplication(BaseModel):
+        """Report de-duplication status.
+
+        Attributes:
+            size: Number of reports remembered.
+            checked: Number of reports checked.
+            duplicated: Number of duplicated reports rejected.
+            hit_rate: Ratio of duplicated reports to checked reports.
+        """
+
+        size: int = 0
+        checked: int = 0
+        duplicated: int = 0
+        hit_rate: float = 0
+
+    class RateLimit(BaseModel):
+        """Rate limiting status.
+
+        Attributes:
+            buckets: Number of token buckets in memory.
+            allowed: Number of orders allowed.
+            limited: Number of orders rejected because of rate limits.
+        """
+
+        buckets: int = 0
+        allowed: int = 0
+        limited: int = 0
+
+    class WebSocket(BaseModel):
+        """OneBot WebSocket connection status.
+
+        Attributes:
+            connected: Whether the connection is established.
+            connections: Number of connections established, including reconnections.
+            pending: Number of API calls waiting for responses.
+        """
+
+        connected: bool = False
+        connections: int = 0
+        pending: int = 0
+
+    class Endpoint(BaseModel):
+        """NapCat API endpoint status.
+
+        Attributes:
+            calls: Number of calls.
+            errors: Number of failed calls.
+            average_latency: Average latency (in milliseconds) of calls.
+            max_latency: Maximum latency (in milliseconds) of calls.
+        """
+
+        calls: int = 0
+        errors: int = 0
+        average_latency: float = 0
+        max_latency: float = 0
+
+    class Concurrency(BaseModel):
+        """NapCat API concurrency status.
+
+        Attributes:
+            limit: Current limit of concurrent calls.
+            in_flight: Number of calls in flight.
+            waiting: Number of calls waiting for the limit.
+            increased: Number of times the limit is increased.
+            decreased: Number of times the limit is decreased.
+        """
+
+        limit: float = 0
+        in_flight: int = 0
+        waiting: int = 0
+        increased: int = 0
+        decreased: int = 0
+
+    class InfoCache(BaseModel):
+        """Group and member information cache status.
+
+        Attributes:
+            size: Number of cached items.
+            hits: Number of lookups answered by the cache.
+            misses: Number of lookups not answered by the cache.
+            coalesced: Number of lookups that waited for the same call of another lookup.
+        """
+
+        size: int = 0
+        hits: int = 0
+        misses: int = 0
+        coalesced: int = 0
+
+    class MemberDirectory(BaseModel):
+        """Group member directory status.
+
+        Attributes:
+            groups: Number of groups whose member lists are loaded.
+            members: Number of members kept in memory.
+            loads: Number of member lists loaded.
+            evicted: Number of groups evicted.
+        """
+
+        groups: int = 0
+        members: int = 0
+        loads: int = 0
+        evicted: int = 0
+
+    class Outbound(BaseModel):
+        """Outbound message status.
+
+        Attributes:
+            depth: Number of messages waiting to be sent.
+            chats: Number of chats that have messages waiting.
+            sent: Number of messages sent.
+            failed: Number of messages failed to be sent.
+            average_delay: Average time (in milliseconds) that messages waited before being sent.
+            max_delay: Maximum time (in milliseconds) that messages waited before being sent.
+        """
+
+        depth: int = 0
+        chats: int = 0
+        sent: int = 0
+        failed: int = 0
+        average_delay: float = 0
+        max_delay: float = 0
+
+    class Outbox(BaseModel):
+        """Outbox status.
+
+        Attributes:
+            size: Number of unsent messages saved.
+            saved: Number of messages saved.
+            delivered: Number of saved messages sent successfully.
+            retried: Number of failed attempts to send saved messages.
+            expired: Number of saved messages discarded because they were too old.
+        """
+
+        size: int = 0
+        saved: int = 0
+        delivered: int = 0
+        retried: int = 0
+        expired: int = 0
+
+    class CircuitBreaker(BaseModel):
+        """Circuit breaker status.
+
+        Attributes:
+            state: Current state.
+            calls: Number of recent calls in the window.
+            failure_rate: Ratio of failed calls in the window.
+            slow_rate: Ratio of slow calls in the window.
+            opened: Number of times the circuit is opened.
+            rejected: Number of calls rejected while the circuit is open.
+            changed_at: Time when the state was last changed.
+        """
+
+        state: CircuitState = CircuitState.CLOSED
+        calls: int = 0
+        failure_rate: float = 0
+        slow_rate: float = 0
+        opened: int = 0
+        rejected: int = 0
+        changed_at: float = 0
+
     debug: bool = Field(default=False, exclude=True)
     version: str = VERSION
     app: ApplicationStatus = ApplicationStatus.STARTED
     module: Module = Module()
     plugins: dict[str, Plugin] = Field(default={}, exclude=True)
     bot: Bot = Bot()
+    ingestion: Ingestion = Ingestion()
+    deduplication: Deduplication = Deduplication()
+    rate_limit: RateLimit = RateLimit()
+    websocket: WebSocket = WebSocket()
+    endpoints: dict[str, Endpoint] = {}
+    concurrency: Concurrency = Concurrency()
+    info_cache: InfoCache = InfoCache()
+    member_directory: MemberDirectory = MemberDirectory()
+    outbound: Outbound = Outbound()
+    outbox: Outbox = Outbox()
+    circuit_breakers: dict[str, CircuitBreaker] = {}
 
 
 class Settings:
@@ -144,6 +368,16 @@ class Settings:
 
             Attributes:
                 dir: Application directory settings.
+                ingestion: Report ingestion settings.
+                deduplication: Report de-duplication settings.
+                rate_limit: Rate limiting settings.
+                quick_reply: Quick reply settings.
+                member_directory: Group member directory settings.
+                http_pool: Pooled HTTP client settings.
+                outbound: Outbound message settings.
+                outbox: Outbox settings.
+                circuit_breaker: Circuit breaker settings.
+                order: Order settings.
             """
 
             class Directory(BaseModel):
@@ -161,7 +395,221 @@ class Settings:
                 data: str = os.path.join(base, "data")
                 temp: str = os.path.join(base, "temp")
 
+            class Ingestion(BaseModel):
+                """Report ingestion settings.
+
+                When the queue depth or the event loop lag exceeds its threshold, low-priority reports (notices) are
+                shed, while messages and requests are still accepted until the queue is full.
+
+                Attributes:
+                    queue_size: Maximum number of reports waiting in the queue.
+                    workers: Number of workers handling reports concurrently. Reports of the same chat are always
+                        handled one by one in order.
+                    shed_depth: Ratio of queue depth to queue size above which low-priority reports are shed.
+                    max_loop_lag: Event loop lag (in seconds) above which low-priority reports are shed.
+                    deadline: Maximum age (in seconds) of a report to be handled. 0 means no deadline.
+                    log_sample: Only one in this number of shed decisions of the same reason is logged.
+                """
+
+                queue_size: int = Field(default=1000, gt=0)
+                workers: int = Field(default=8, gt=0)
+                shed_depth: float = Field(default=0.5, gt=0, le=1)
+                max_loop_lag: float = Field(default=0.5, gt=0)
+                deadline: int = Field(default=60, ge=0)
+                log_sample: int = Field(default=100, gt=0)
+
+            class Deduplication(BaseModel):
+                """Report de-duplication settings.
+
+                Messages are identified by bot ID and message ID, and requests by flag.
+
+                Attributes:
+                    window: Time window (in seconds) in which a report posted again is rejected. 0 means disabled.
+                    max_size: Maximum number of reports remembered.
+                """
+
+                window: int = Field(default=60, ge=0)
+                max_size: int = Field(default=10000, gt=0)
+
+            class RateLimit(BaseModel):
+                """Rate limiting settings.
+
+                Each order consumes as many tokens as its repetitions from the bucket of the user, the bucket of the
+                group (for group messages) and the bucket of the plugin. The group limit can be overridden by the
+                `rate_limit` item of DiceRobot chat settings, and the plugin limit is set by the `rate_limit` item of
+                plugin settings.
+
+                Attributes:
+                    user: Limit of each user.
+                    group: Limit of each group.
+                    max_buckets: Maximum number of token buckets kept in memory for each kind of limit.
+                """
+
+                class Limit(BaseModel):
+                    """Token bucket limit.
+
+                    Attributes:
+                        rate: Tokens refilled per minute. 0 means unlimited.
+                        burst: Maximum number of tokens.
+                    """
+
+                    rate: float = Field(ge=0)
+                    burst: int = Field(gt=0)
+
+                user: Limit = Limit(rate=20, burst=30)
+                group: Limit = Limit(rate=60, burst=60)
+                max_buckets: int = Field(default=50000, gt=0)
+
+            class QuickReply(BaseModel):
+                """Quick reply settings.
+
+                When enabled, the webhook waits for the order to be handled, and returns its reply in the response
+                (the "quick operation" of OneBot), instead of sending it by another API request. Only the first reply
+                produced within the timeout is returned this way, others are sent by API requests as usual.
+
+                Attributes:
+                    enabled: Whether quick reply is enabled.
+                    timeout: Maximum time (in seconds) that the webhook waits for the reply. It should be shorter than
+                        the webhook timeout of NapCat.
+                """
+
+                enabled: bool = False
+                timeout: float = Field(default=2, gt=0)
+
+            class MemberDirectory(BaseModel):
+                """Group member directory settings.
+
+                The member list of a group is loaded when the group is active for the first time, and then kept up to
+                date by messages and notices. When there are too many members, groups that were not active recently
+                are evicted as a whole.
+
+                Attributes:
+                    ttl: Time (in seconds) after which the member list of an active group is loaded again, in case
+                        some notices were missed.
+                    max_members: Maximum number of members kept in memory.
+                    retry_interval: Minimum time (in seconds) between attempts to load the member list of a group, so
+                        that a failed load is not retried for every message.
+                """
+
+                ttl: float = Field(default=3600, gt=0)
+                max_members: int = Field(default=200000, gt=0)
+                retry_interval: float = Field(default=60, ge=0)
+
+            class HttpPool(BaseModel):
+                """Pooled HTTP client settings.
+
+                Plugins share one long-lived client per host, so that connections to the same host are kept alive and
+                reused.
+
+                Attributes:
+                    max_connections: Maximum number of connections to each host.
+                    max_keepalive_connections: Maximum number of idle connections kept alive for each host.
+                    keepalive_expiry: Time (in seconds) after which an idle connection is closed.
+                    http2: Whether HTTP/2 is enabled. Package `h2` is required.
+                    timeout: Default timeout (in seconds) of requests, which can be overridden by the `timeout` item of
+                        plugin settings.
+                """
+
+                max_connections: int = Field(default=10, gt=0)
+                max_keepalive_connections: int = Field(default=5, ge=0)
+                keepalive_expiry: float = Field(default=60, ge=0)
+                http2: bool = False
+                timeout: float = Field(default=60, gt=0)
+
+            class Outbound(BaseModel):
+                """Outbound message settings.
+
+                Messages sent to the same chat are queued and paced, so that bursts of messages do not get the account
+                throttled. Waiting messages are sent in order of priority, so interactive replies go ahead of
+                broadcasts. When NapCat fails to send a message, later messages to the same chat are delayed.
+
+                Attributes:
+                    interval: Minimum average interval (in seconds) between messages sent to the same chat.
+                    burst: Maximum number of messages sent to the same chat without waiting.
+                    backoff: Initial delay (in seconds) after a failure, doubled after each consecutive failure.
+                    max_backoff: Maximum delay (in seconds) after failures.
+                    max_chats: Maximum number of chats whose pacing states are kept in memory.
+                """
+
+                interval: float = Field(default=1, ge=0)
+                burst: int = Field(default=3, gt=0)
+                backoff: float = Field(default=1, gt=0)
+                max_backoff: float = Field(default=60, gt=0)
+                max_chats: int = Field(default=10000, gt=0)
+
+            class Outbox(BaseModel):
+                """Outbox settings.
+
+                Messages that cannot be sent because NapCat is unavailable are saved to the database, and sent again
+                later in order. They are also replayed as soon as the bot is back online.
+
+                Attributes:
+                    enabled: Whether unsent messages are saved.
+                    ttl: Time (in seconds) after which an unsent message is discarded, since it is no longer useful.
+                    backoff: Initial delay (in seconds) before a message is sent again, doubled after each attempt.
+                    max_backoff: Maximum delay (in seconds) before a message is sent again.
+                    jitter: Ratio of random deviation applied to delays, so that retries are spread out.
+                    batch_size: Maximum number of messages written or sent again in one batch.
+                    flush_interval: Interval (in seconds) between writes of saved messages.
+                """
+
+                enabled: bool = True
+                ttl: float = Field(default=600, gt=0)
+                backoff: float = Field(default=2, gt=0)
+                max_backoff: float = Field(default=300, gt=0)
+                jitter: float = Field(default=0.2, ge=0, lt=1)
+                batch_size: int = Field(default=100, gt=0)
+                flush_interval: float = Field(default=0.5, gt=0)
+
+            class CircuitBreaker(BaseModel):
+                """Circuit breaker settings.
+
+                Calls to each upstream (NapCat and each host requested by plugins) are watched separately. Once too
+                many recent calls fail or are slow, the circuit is opened and calls fail fast. After a while, one call
+                is let through to probe the upstream, and the circuit is closed again if it succeeds.
+
+                Attributes:
+                    enabled: Whether circuit breakers are enabled.
+                    window: Number of recent calls considered.
+                    min_calls: Minimum number of calls in the window before the circuit can be opened.
+                    failure_threshold: Ratio of failed calls at which the circuit is opened.
+                    slow_threshold: Ratio of slow calls at which the circuit is opened.
+                    slow_duration: Time (in seconds) after which a call to NapCat is considered slow. Requests to
+                        hosts of plugins are considered slow only when they reach their own timeouts.
+                    slow_durations: Slow durations of specific upstreams, keyed by upstream (such as
+                        `https://api.openai.com:443`), which override the ones above.
+                    open_duration: Time (in seconds) that the circuit stays open before a probe is let through.
+                """
+
+                enabled: bool = True
+                window: int = Field(default=20, gt=0)
+                min_calls: int = Field(default=5, gt=0)
+                failure_threshold: float = Field(default=0.5, gt=0, le=1)
+                slow_threshold: float = Field(default=0.8, gt=0, le=1)
+                slow_duration: float = Field(default=10, gt=0)
+                slow_durations: dict[str, float] = {}
+                open_duration: float = Field(default=30, gt=0)
+
+            class Order(BaseModel):
+                """Order settings.
+
+                Attributes:
+                    max_length: Maximum length of message content that can be parsed as an order.
+                """
+
+                max_length: int = Field(default=5000, gt=0)
+
             dir: Directory = Directory()
+            ingestion: Ingestion = Ingestion()
+            deduplication: Deduplication = Deduplication()
+            rate_limit: RateLimit = RateLimit()
+            quick_reply: QuickReply = QuickReply()
+            member_directory: MemberDirectory = MemberDirectory()
+            http_pool: HttpPool = HttpPool()
+            outbound: Outbound = Outbound()
+            outbox: Outbox = Outbox()
+            circuit_breaker: CircuitBreaker = CircuitBreaker()
+            order: Order = Order()
 
         class Cloud(BaseModel):
             """DiceRobot cloud settings.
@@ -216,6 +664,12 @@ class Settings:
             Attributes:
                 dir: NapCat directory settings.
                 api: NapCat API settings.
+                websocket: NapCat WebSocket settings.
+                report: Report listener settings.
+                cache: Group and member information cache settings.
+                concurrency: API concurrency settings.
+                transport: How reports are received and APIs are called. In WebSocket mode, HTTP API is still used
+                    when the WebSocket connection is not established.
                 account: QQ account.
                 autostart: Whether to start NapCat at application startup.
             """
@@ -253,8 +707,99 @@ class Settings:
                 def base_url(self) -> str:
                     return f"http://{self.host}:{self.port}"
 
+            class WebSocket(BaseModel):
+                """NapCat WebSocket settings.
+
+                The host is the same as the one of NapCat API.
+
+                Attributes:
+                    port: OneBot WebSocket port.
+                    timeout: Maximum time (in seconds) to wait for the response of an API call.
+                    reconnect_interval: Initial interval (in seconds) between reconnections, doubled after each failure.
+                    max_reconnect_interval: Maximum interval (in seconds) between reconnections.
+                """
+
+                port: int = Field(default=13580, gt=0)
+                timeout: float = Field(default=30, gt=0)
+                reconnect_interval: float = Field(default=1, gt=0)
+                max_reconnect_interval: float = Field(default=30, gt=0)
+
+            class Report(BaseModel):
+                """Report listener settings.
+
+                By default, reports are posted to the HTTPS listener of the application. Since NapCat runs on the same
+                host, reports can be posted to a local listener without TLS instead. Reports received by a local
+                listener are still verified by signature.
+
+                NapCat cannot post reports to a Unix domain socket, so the Unix domain socket listener requires an
+                external forwarder, which receives reports from NapCat and relays them to the socket.
+
+                Attributes:
+                    listener: Listener that reports are posted to.
+                    port: Port of the plain HTTP listener, which is bound to loopback only.
+                    socket: Path of the Unix domain socket listener.
+                    forwarder: URL of the forwarder that NapCat posts reports to. Required by the Unix domain socket
+                        listener.
+                """
+
+                listener: ListenerMode = ListenerMode.HTTPS
+                port: int = Field(default=9501, gt=0)
+                socket: str = "/run/dicerobot/report.sock"
+                forwarder: str | None = None
+
+                @model_validator(mode="after")
+                def check_forwarder(self) -> Self:
+                    if self.listener == ListenerMode.UNIX and not self.forwarder:
+                        raise ValueError("Unix domain socket listener requires a forwarder")
+
+                    return self
+
+            class Cache(BaseModel):
+                """Group and member information cache settings.
+
+                Cached information is invalidated by group card, admin, increase and decrease notices. It can also be
+                bypassed by `no_cache`.
+
+                Attributes:
+                    group_ttl: Time-to-live (in seconds) of group information. 0 means not cached.
+                    member_ttl: Time-to-live (in seconds) of group member information. 0 means not cached.
+                    max_size: Maximum number of cached items.
+                """
+
+                group_ttl: float = Field(default=300, ge=0)
+                member_ttl: float = Field(default=60, ge=0)
+                max_size: int = Field(default=10000, gt=0)
+
+            class Concurrency(BaseModel):
+                """API concurrency settings.
+
+                NapCat slows down when too many API calls are in flight, so the number of concurrent calls is limited.
+                The limit is raised additively while calls are fast, and cut multiplicatively when a call is slow or
+                fails.
+
+                Attributes:
+                    enabled: Whether the number of concurrent calls is limited.
+                    initial_limit: Limit of concurrent calls at startup.
+                    min_limit: Minimum limit of concurrent calls.
+                    max_limit: Maximum limit of concurrent calls.
+                    latency_threshold: Latency (in seconds) above which a call is considered slow.
+                    decrease_ratio: Ratio that the limit is multiplied by when it is cut.
+                """
+
+                enabled: bool = True
+                initial_limit: int = Field(default=4, gt=0)
+                min_limit: int = Field(default=1, gt=0)
+                max_limit: int = Field(default=64, gt=0)
+                latency_threshold: float = Field(default=1, gt=0)
+                decrease_ratio: float = Field(default=0.5, gt=0, lt=1)
+
             dir: Directory = Directory()
             api: API = API()
+            websocket: WebSocket = WebSocket()
+            report: Report = Report()
+            cache: Cache = Cache()
+            concurrency: Concurrency = Concurrency()
+            transport: TransportMode = TransportMode.HTTP
             account: int = -1
             autostart: bool = False
 
@@ -266,6 +811,7 @@ class Settings:
 
     def __init__(self) -> None:
         self._settings = self._Settings()
+        self._changes: set[str] = set()
 
     def update(self, settings: dict) -> None:
         """Update all the settings.
@@ -275,6 +821,7 @@ class Settings:
         """
 
         self._settings = self._Settings.model_validate(settings)
+        self._changes.update(self._Settings.model_fields)
 
     def update_security(self, settings: dict) -> None:
         """Update security settings.
@@ -293,6 +840,7 @@ class Settings:
             security_settings["admin"]["password_hash"] = generate_password_hash(settings["admin"]["password"])
 
         self._settings.security = self._Settings.Security.model_validate(security_settings)
+        self._changes.add("security")
 
     def update_application(self, settings: dict) -> None:
         """Update application settings.
@@ -304,6 +852,7 @@ class Settings:
         self._settings.app = self._Settings.Application.model_validate(
             deep_update(self._settings.app.model_dump(), settings)
         )
+        self._changes.add("app")
 
     def update_qq(self, settings: dict) -> None:
         """Update QQ settings.
@@ -315,6 +864,7 @@ class Settings:
         self._settings.qq = self._Settings.QQ.model_validate(
             deep_update(self._settings.qq.model_dump(), settings)
         )
+        self._changes.add("qq")
 
     def update_napcat(self, settings: dict) -> None:
         """Update NapCat settings.
@@ -326,6 +876,7 @@ class Settings:
         self._settings.napcat = self._Settings.NapCat.model_validate(
             deep_update(self._settings.napcat.model_dump(), settings)
         )
+        self._changes.add("napcat")
 
     def model_dump(self, safe_dump: bool = True, **kwargs) -> dict:
         data = self._settings.model_dump(**kwargs)
@@ -335,6 +886,18 @@ class Settings:
 
         return data
 
+    def pop_changes(self) -> dict[str, dict]:
+        """Pop settings changed since the last call.
+
+        Returns:
+            Dumped settings of each changed group, including sensitive data.
+        """
+
+        changes = {group: getattr(self._settings, group).model_dump() for group in self._changes}
+        self._changes = set()
+
+        return changes
+
     def __getattr__(self, item) -> Any:
         """Get attribute from inner actual settings class."""
 
@@ -342,19 +905,40 @@ class Settings:
 
 
 class PluginSettings:
-    """DiceRobot plugin settings."""
+    """DiceRobot plugin settings.
+
+    Settings are handed out as read-only snapshots, which are rebuilt only when settings are set, so that getting
+    settings on every message does not copy them.
+    """
 
     def __init__(self) -> None:
         self._settings: dict[str, dict] = {}
+        self._changes: set[str] = set()
+        self._snapshots: dict[str, Mapping] = {}
 
-    def get(self, *, plugin: str) -> dict:
+    def get(self, *, plugin: str) -> Mapping:
         """Get settings of a plugin.
 
         Args:
             plugin: Plugin name.
 
         Returns:
-            A deep copy of the settings for preventing modification.
+            A read-only snapshot of the settings, shared by all callers.
+        """
+
+        if (snapshot := self._snapshots.get(plugin)) is None:
+            snapshot = self._snapshots[plugin] = freeze(self._settings.setdefault(plugin, {}))
+
+        return snapshot
+
+    def copy(self, *, plugin: str) -> dict:
+        """Get a mutable copy of settings of a plugin.
+
+        Args:
+            plugin: Plugin name.
+
+        Returns:
+            A deep copy of the settings, which can be modified and set.
         """
 
         return deepcopy(self._settings.setdefault(plugin, {}))
@@ -372,6 +956,9 @@ class PluginSettings:
         else:
             self._settings[plugin] = deepcopy(settings)
 
+        self._changes.add(plugin)
+        self._snapshots.pop(plugin, None)
+
     def model_dump(self) -> dict:
         """Dump all plugin settings.
 
@@ -381,18 +968,96 @@ class PluginSettings:
 
         return deepcopy(self._settings)
 
+    def pop_changes(self) -> dict[str, dict]:
+        """Pop plugin settings changed since the last call.
+
+        Returns:
+            Settings of each changed plugin. They are not copied, and should be serialized right away.
+        """
+
+        changes = {plugin: self._settings[plugin] for plugin in self._changes}
+        self._changes = set()
+
+        return changes
+
+
+class ChatContext:
+    """Read-only settings of a chat, resolved once and reused by the plugins handling orders from the chat.
+
+    Attributes:
+        chat_type: Chat type.
+        chat_id: Chat ID.
+        dicerobot: Settings used by DiceRobot in the chat (bot nickname etc.).
+    """
+
+    __slots__ = ("chat_type", "chat_id", "dicerobot", "_settings", "_snapshots")
+
+    def __init__(self, chat_type: ChatType, chat_id: int, settings: dict[str, dict]) -> None:
+        self.chat_type = chat_type
+        self.chat_id = chat_id
+        self._settings = settings
+        self._snapshots: dict[str, Mapping] = {}
+        self.dicerobot = self.get_settings("dicerobot")
+
+    def get_settings(self, settings_group: str, default: dict | None = None) -> Mapping:
+        """Get settings of a settings group in the chat.
+
+        Args:
+            settings_group: Settings group.
+            default: Default settings, which are used for items not set in the chat.
+
+        Returns:
+            A read-only snapshot of the settings.
+        """
+
+        if (snapshot := self._snapshots.get(settings_group)) is None:
+            settings = self._settings.get(settings_group, {})
+            snapshot = self._snapshots[settings_group] = freeze({**default, **settings} if default else settings)
+
+        return snapshot
+
 
 class ChatSettings:
-    """DiceRobot chat settings."""
+    """DiceRobot chat settings.
 
-    def __init__(self) -> None:
+    Settings are handed out as read-only snapshots like plugin settings. Contexts of recently active chats, which hold
+    the snapshots, are kept in a small LRU cache, and the context of a chat is invalidated when settings of the chat
+    are set.
+    """
+
+    def __init__(self, max_contexts: int = 1024) -> None:
         self._settings: dict[ChatType, dict[int, dict[str, dict]]] = {
             ChatType.FRIEND: {},
             ChatType.GROUP: {},
             ChatType.TEMP: {}
         }
+        self._contexts: OrderedDict[tuple[ChatType, int], ChatContext] = OrderedDict()
+        self._changes: set[tuple[ChatType, int, str]] = set()
+        self.max_contexts = max_contexts
+
+    def get_context(self, *, chat_type: ChatType, chat_id: int) -> ChatContext:
+        """Get context of a chat.
+
+        Args:
+            chat_type: Chat type.
+            chat_id: Chat ID.
+
+        Returns:
+            Context of the chat, shared until settings of the chat are set.
+        """
+
+        if (context := self._contexts.get(key := (chat_type, chat_id))) is not None:
+            self._contexts.move_to_end(key)
+            return context
+
+        context = self._contexts[key] = ChatContext(chat_type, chat_id, self._settings[chat_type].get(chat_id, {}))
+
+        if len(self._contexts) > self.max_contexts:
+            self._contexts.popitem(last=False)
+
+        return context
 
-    def get(self, *, chat_type: ChatType, chat_id: int, settings_group: str) -> dict:
+    def get(self, *, chat_type: ChatType, chat_id: int, settings_group: str) -> Mapping:
         """Get settings of a chat.
 
         Args:
@@ -401,10 +1066,24 @@ class ChatSettings:
             settings_group: Settings group.
 
         Returns:
-            Settings of the chat.
+            A read-only snapshot of the settings.
         """
 
-        return self._settings[chat_type].setdefault(chat_id, {}).setdefault(settings_group, {})
+        return self.get_context(chat_type=chat_type, chat_id=chat_id).get_settings(settings_group)
+
+    def copy(self, *, chat_type: ChatType, chat_id: int, settings_group: str) -> dict:
+        """Get a mutable copy of settings of a chat.
+
+        Args:
+            chat_type: Chat type.
+            chat_id: Chat ID.
+            settings_group: Settings group.
+
+        Returns:
+            A deep copy of the settings, which can be modified and set.
+        """
+
+        return deepcopy(self._settings[chat_type].get(chat_id, {}).get(settings_group, {}))
 
     def set(self, *, chat_type: ChatType, chat_id: int, settings_group: str, settings: dict) -> None:
         """Set settings of a chat.
@@ -421,6 +1100,9 @@ class ChatSettings:
         else:
             self._settings[chat_type][chat_id][settings_group] = deepcopy(settings)
 
+        self._changes.add((chat_type, chat_id, settings_group))
+        self._contexts.pop((chat_type, chat_id), None)
+
     def model_dump(self) -> dict:
         """Dump all chat settings.
 
@@ -430,9 +1112,29 @@ class ChatSettings:
 
         return deepcopy(self._settings)
 
+    def pop_changes(self) -> dict[tuple[ChatType, int, str], dict]:
+        """Pop settings of chats changed since the last call.
+
+        Returns:
+            Changed settings, keyed by chat type, chat ID and settings group. They are not copied, and should be
+            serialized right away.
+        """
+
+        changes = {
+            (chat_type, chat_id, settings_group): self._settings[chat_type][chat_id][settings_group]
+            for chat_type, chat_id, settings_group in self._changes
+        }
+        self._changes = set()
+
+        return changes
+
 
 class Replies:
-    """DiceRobot plugin replies."""
+    """DiceRobot plugin replies.
+
+    Replies are handed out as read-only snapshots like plugin settings. Replies of a group are also compiled into
+    templates, which are kept until the replies of the group are set.
+    """
 
     def __init__(self) -> None:
         self._replies: dict[str, dict[str, str]] = {
@@ -446,19 +1148,54 @@ class Replies:
                 "order_repetition_exceeded": "这条指令不可以执行这么多次哦~",
             }
         }
+        self._snapshots: dict[str, Mapping] = {}
+        self._templates: dict[str, Mapping[str, ReplyTemplate]] = {}
+        self._changes: set[tuple[str, str]] = set()
 
-    def get_replies(self, *, group: str) -> dict:
+    def get_replies(self, *, group: str) -> Mapping:
         """Get replies of a group.
 
         Args:
             group: Reply group, usually the name of the plugin.
 
         Returns:
-            A deep copy of the replies for preventing modification.
+            A read-only snapshot of the replies, shared by all callers.
+        """
+
+        if (snapshot := self._snapshots.get(group)) is None:
+            snapshot = self._snapshots[group] = freeze(self._replies.setdefault(group, {}))
+
+        return snapshot
+
+    def copy_replies(self, *, group: str) -> dict:
+        """Get a mutable copy of replies of a group.
+
+        Args:
+            group: Reply group, usually the name of the plugin.
+
+        Returns:
+            A deep copy of the replies, which can be modified and set.
         """
 
         return deepcopy(self._replies.setdefault(group, {}))
 
+    def get_templates(self, *, group: str) -> Mapping[str, ReplyTemplate]:
+        """Get compiled templates of replies of a group.
+
+        Args:
+            group: Reply group, usually the name of the plugin.
+
+        Returns:
+            A read-only mapping of compiled templates, keyed by reply.
+        """
+
+        if (templates := self._templates.get(group)) is None:
+            templates = self._templates[group] = MappingProxyType({
+                reply: ReplyTemplate(reply) for reply in self._replies.setdefault(group, {}).values()
+            })
+
+        return templates
+
     def get_reply(self, *, group: str, key: str) -> str:
         """Get a reply of a group.
 
@@ -485,6 +1222,10 @@ class Replies:
         else:
             self._replies[group] = deepcopy(replies)
 
+        self._changes.update((group, key) for key in replies)
+        self._snapshots.pop(group, None)
+        self._templates.pop(group, None)
+
     def model_dump(self) -> dict:
         """Dump all plugin replies.
 
@@ -493,3 +1234,15 @@ class Replies:
         """
 
         return deepcopy(self._replies)
+
+    def pop_changes(self) -> dict[tuple[str, str], str]:
+        """Pop replies changed since the last call.
+
+        Returns:
+            Changed replies, keyed by reply group and reply key.
+        """
+
+        changes = {(group, key): self._replies[group][key] for group, key in self._changes}
+        self._changes = set()
+
+        return changes
@@ -2,7 +2,9 @@ from typing import Any, Literal
 
 from pydantic import field_validator
 
-from ...enum import ReportType, MessageType, PrivateMessageSubType, GroupMessageSubType, SegmentType, Sex, Role
+from ...enum import (
+    ChatType, ReportType, MessageType, PrivateMessageSubType, GroupMessageSubType, SegmentType, Sex, Role
+)
 from .. import BaseModel
 from . import Report
 from .segment import Segment, Text, Image, At
@@ -57,6 +59,19 @@ class Message(Report):
     def from_group_temp(self) -> bool:
         return False
 
+    @property
+    def chat(self) -> tuple[ChatType, int]:
+        """Chat type and chat ID of the chat where the message is from."""
+
+        if self.from_group:
+            return ChatType.GROUP, self.group_id
+        elif self.from_friend:
+            return ChatType.FRIEND, self.user_id
+        elif self.from_group_temp:
+            return ChatType.TEMP, self.user_id
+        else:
+            raise ValueError
+
 
 class PrivateMessage(Message):
     class Sender(BaseModel):
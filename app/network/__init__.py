@@ -1,17 +1,44 @@
-import json
+from typing import TYPE_CHECKING, Any
+import math
 
 from loguru import logger
 from httpx import AsyncClient, Request, Response, HTTPError
 
 from ..globals import VERSION
+from .. import codec
 from ..exceptions import NetworkServerError, NetworkClientError, NetworkInvalidContentError, NetworkError
 
+if TYPE_CHECKING:
+    from .breaker import CircuitBreaker
+
 __all__ = [
     "HttpClient"
 ]
 
 
 class HttpClient(AsyncClient):
+    @staticmethod
+    def get_json(response: Response) -> Any:
+        """Get decoded JSON content of the response.
+
+        The content is decoded only once and cached in the response, so that the response hook and the caller do not
+        parse the same content twice.
+
+        Args:
+            response: Response with JSON content.
+
+        Returns:
+            Decoded content.
+
+        Raises:
+            DecodeError: Invalid JSON content.
+        """
+
+        if "json" not in response.extensions:
+            response.extensions["json"] = codec.loads(response.content)
+
+        return response.extensions["json"]
+
     @staticmethod
     async def log_request(request: Request) -> None:
         await request.aread()
@@ -19,21 +46,29 @@ class HttpClient(AsyncClient):
 
     @staticmethod
     async def log_response(response: Response) -> None:
-        # Check JSON content
-        if "application/json" in response.headers.get("content-type", ""):
+        # Check JSON content, unless the caller decodes and checks it by itself
+        if response.request.extensions.get("defer_json"):
+            await response.aread()
+            logger.opt(lazy=True).debug(
+                "Response: {} {}, content: {}",
+                lambda: response.request.method, lambda: response.request.url, lambda: response.text
+            )
+        elif "application/json" in response.headers.get("content-type", ""):
             await response.aread()
 
             try:
-                result = response.json()
-            except json.JSONDecodeError:
+                result = HttpClient.get_json(response)
+            except codec.DecodeError:
                 logger.error(f"Failed to request {response.request.url}, invalid content returned")
                 raise NetworkInvalidContentError
 
-            logger.debug(f"Response: {response.request.method} {response.request.url}, content: {result}")
+            logger.debug(
+                "Response: {} {}, content: {}", response.request.method, response.request.url, result
+            )
 
             if ("code" in result and result["code"] != 0 and result["code"] != 200) or \
                     ("retcode" in result and result["retcode"] != 0):
-                error_code = result["code"]
+                error_code = result["code"] if "code" in result else result["retcode"]
                 error_message = result["msg"] if "msg" in result else result["message"] if "message" in result else None
 
                 if error_message:
@@ -59,10 +94,24 @@ class HttpClient(AsyncClient):
         }
     }
 
-    def __init__(self, *args, **kwargs) -> None:
+    def __init__(self, *args, breaker: "CircuitBreaker | None" = None, **kwargs) -> None:
         kwargs = self._defaults | kwargs
         super().__init__(*args, **kwargs)
 
+        # Requests fail fast while the circuit of the upstream is open
+        self.breaker = breaker
+
+    async def send(self, request: Request, *args, **kwargs) -> Response:
+        if self.breaker is None:
+            return await super().send(request, *args, **kwargs)
+
+        # Requests to plugin upstreams (e.g. image generation) may be slow by nature, so a request is considered slow
+        # only when it gets close to its own timeout
+        timeout = request.extensions.get("timeout", {}).get("read")
+
+        async with self.breaker.guard(math.inf if timeout is None else timeout):
+            return await super().send(request, *args, **kwargs)
+
     async def request(self, *args, **kwargs) -> Response:
         try:
             return await super().request(*args, **kwargs)
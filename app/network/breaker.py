@@ -0,0 +1,219 @@
+from typing import TYPE_CHECKING
+from collections import deque
+from collections.abc import AsyncGenerator, Callable
+from contextlib import asynccontextmanager
+import time
+
+from loguru import logger
+from httpx import HTTPError
+
+from ..enum import CircuitState
+from ..exceptions import NetworkServerError, NetworkError, CircuitOpenError
+from ..models.config import Status
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "CircuitBreaker",
+    "CircuitBreakerRegistry"
+]
+
+
+class CircuitBreaker:
+    """Circuit breaker of an upstream.
+
+    Outcomes of recent calls are kept in a window. The circuit is opened once the ratio of failed or slow calls reaches
+    the threshold, and calls are rejected until the circuit is half-opened, when only one probe call is let through.
+    """
+
+    def __init__(self, context: "AppContext", name: str) -> None:
+        self.context = context
+        self.name = name
+        self.state = CircuitState.CLOSED
+        self.outcomes: deque[tuple[bool, bool]] = deque()
+        self.failures = 0
+        self.slow_calls = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.status = context.status.circuit_breakers[name] = Status.CircuitBreaker()
+
+    def allow(self, now: float) -> bool:
+        """Check whether a call is allowed.
+
+        A call allowed in half-open state is the probe, whose outcome must be recorded or released.
+
+        Args:
+            now: Current time.
+
+        Returns:
+            Whether the call is allowed.
+        """
+
+        if self.state == CircuitState.OPEN:
+            if now - self.opened_at < self.context.settings.app.circuit_breaker.open_duration:
+                return False
+
+            self._transition(CircuitState.HALF_OPEN)
+
+        if self.state == CircuitState.HALF_OPEN:
+            if self.probing:
+                return False
+
+            self.probing = True
+
+        return True
+
+    def get_slow_duration(self, slow_duration: float | None = None) -> float:
+        """Get the time after which a call to the upstream is considered slow.
+
+        Args:
+            slow_duration: Slow duration of the call, such as the timeout of the request. Defaults to the global slow
+                duration.
+
+        Returns:
+            Slow duration configured for the upstream, or the given or global one.
+        """
+
+        settings = self.context.settings.app.circuit_breaker
+
+        if (duration := settings.slow_durations.get(self.name)) is not None:
+            return duration
+
+        return settings.slow_duration if slow_duration is None else slow_duration
+
+    def record(self, failed: bool, latency: float, slow_duration: float | None = None) -> None:
+        """Record the outcome of a call.
+
+        Args:
+            failed: Whether the call failed.
+            latency: Latency (in seconds) of the call.
+            slow_duration: Slow duration of the call, see `get_slow_duration`.
+        """
+
+        settings = self.context.settings.app.circuit_breaker
+        slow = latency >= self.get_slow_duration(slow_duration)
+
+        if self.state == CircuitState.HALF_OPEN:
+            self.probing = False
+            self._transition(CircuitState.OPEN if failed or slow else CircuitState.CLOSED)
+            return
+        elif self.state == CircuitState.OPEN:
+            # Calls started before the circuit was opened
+            return
+
+        self.outcomes.append((failed, slow))
+        self.failures += failed
+        self.slow_calls += slow
+
+        while len(self.outcomes) > settings.window:
+            failed_, slow_ = self.outcomes.popleft()
+            self.failures -= failed_
+            self.slow_calls -= slow_
+
+        calls = len(self.outcomes)
+        self._update_status()
+
+        if calls >= settings.min_calls and (
+            self.failures >= calls * settings.failure_threshold or self.slow_calls >= calls * settings.slow_threshold
+        ):
+            self._transition(CircuitState.OPEN)
+
+    def release(self) -> None:
+        """Release the probe without an outcome, e.g. when the call is cancelled."""
+
+        self.probing = False
+
+    @asynccontextmanager
+    async def guard(self, slow_duration: float | None = None) -> AsyncGenerator[None]:
+        """Guard a call to the upstream.
+
+        Network errors, server errors and HTTP errors are considered failures, other errors are not the fault of the
+        upstream.
+
+        Args:
+            slow_duration: Slow duration of the call, see `get_slow_duration`.
+
+        Raises:
+            CircuitOpenError: The circuit is open, so the call fails fast.
+        """
+
+        if not self.context.settings.app.circuit_breaker.enabled:
+            yield
+            return
+
+        start = time.monotonic()
+
+        if not self.allow(start):
+            self.status.rejected += 1
+            logger.debug(f"Call to {self.name} rejected, circuit is {self.state.value}")
+            raise CircuitOpenError
+
+        try:
+            yield
+        except (NetworkError, NetworkServerError, HTTPError):
+            self.record(True, time.monotonic() - start, slow_duration)
+            raise
+        except Exception:
+            self.record(False, time.monotonic() - start, slow_duration)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.record(False, time.monotonic() - start, slow_duration)
+
+    def _transition(self, state: CircuitState) -> None:
+        previous, self.state = self.state, state
+
+        if state == CircuitState.OPEN:
+            self.opened_at = time.monotonic()
+            self.status.opened += 1
+            logger.warning(f"Circuit of {self.name} opened")
+        elif state == CircuitState.CLOSED:
+            logger.success(f"Circuit of {self.name} closed")
+
+        if state != CircuitState.HALF_OPEN:
+            # Outcomes before the transition no longer matter
+            self.outcomes.clear()
+            self.failures = self.slow_calls = 0
+
+        self.status.state = state
+        self.status.changed_at = time.time()
+        self._update_status()
+        self.context.circuit_breakers.notify(self, previous)
+
+    def _update_status(self) -> None:
+        calls = len(self.outcomes)
+        self.status.calls = calls
+        self.status.failure_rate = round(self.failures / calls, 3) if calls else 0
+        self.status.slow_rate = round(self.slow_calls / calls, 3) if calls else 0
+
+
+class CircuitBreakerRegistry:
+    """Circuit breakers of all upstreams, keyed by upstream host."""
+
+    def __init__(self, context: "AppContext") -> None:
+        self.context = context
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.listeners: list[Callable[[CircuitBreaker, CircuitState], None]] = []
+
+    def get(self, name: str) -> CircuitBreaker:
+        if (breaker := self.breakers.get(name)) is None:
+            breaker = self.breakers[name] = CircuitBreaker(self.context, name)
+
+        return breaker
+
+    def notify(self, breaker: CircuitBreaker, previous: CircuitState) -> None:
+        """Notify listeners of the state transition of a circuit breaker.
+
+        Args:
+            breaker: Circuit breaker whose state is changed.
+            previous: Previous state.
+        """
+
+        for listener in self.listeners:
+            try:
+                listener(breaker, previous)
+            except Exception:
+                logger.exception(f"Failed to notify circuit transition of {breaker.name}")
@@ -3,6 +3,8 @@ from typing import TYPE_CHECKING
 from ..models.network.cloud import (
     GetVersionsResponse
 )
+from .. import codec
+from . import HttpClient
 
 if TYPE_CHECKING:
     from ..context import AppContext
@@ -17,6 +19,6 @@ class CloudService:
         self.context = context
 
     async def get_versions(self) -> GetVersionsResponse:
-        return GetVersionsResponse.model_validate((await self.context.http_client.get(
-            self.context.settings.cloud.api.base_url + "/versions"
-        )).json())
+        return codec.get_adapter(GetVersionsResponse).validate_python(HttpClient.get_json(
+            await self.context.http_client.get(self.context.settings.cloud.api.base_url + "/versions")
+        ))
@@ -0,0 +1,141 @@
+from typing import TYPE_CHECKING
+from collections import deque
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+import asyncio
+import time
+
+from httpx import HTTPError
+
+from ..exceptions import NetworkServerError, NetworkError, CircuitOpenError
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "AdaptiveLimiter"
+]
+
+
+class AdaptiveLimiter:
+    """Limiter of concurrent NapCat API calls, whose limit is adjusted by AIMD (additive increase, multiplicative
+    decrease).
+
+    While calls are fast and the limit is reached, the limit is raised by about one for every limit calls. When a call
+    is slow or fails, the limit is cut by the decrease ratio. Calls waiting for the limit are let through in order.
+    """
+
+    def __init__(self, context: "AppContext") -> None:
+        self.context = context
+        self.limit = float(context.settings.napcat.concurrency.initial_limit)
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self._decreased_at = 0.0
+        self._update_status()
+
+    async def acquire(self) -> None:
+        """Wait until a call is allowed by the limit."""
+
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            self._update_status()
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        self._update_status()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over before cancellation, so it is passed to the next waiter
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self.waiters.remove(future)
+
+            raise
+        finally:
+            self._update_status()
+
+    def release(self, start: float, failed: bool) -> None:
+        """Release a slot, and adjust the limit with the outcome of the call.
+
+        Args:
+            start: Time when the call was started.
+            failed: Whether the call failed.
+        """
+
+        settings = self.context.settings.napcat.concurrency
+        now = time.monotonic()
+        saturated = self.in_flight >= int(self.limit) or self.waiters
+        self.in_flight -= 1
+
+        if failed or now - start > settings.latency_threshold:
+            # Calls started before the last decrease were made under the previous limit, so they do not cut it again
+            if start > self._decreased_at:
+                self.limit = max(settings.min_limit, self.limit * settings.decrease_ratio)
+                self._decreased_at = now
+                self.context.status.concurrency.decreased += 1
+        elif saturated and self.limit < settings.max_limit:
+            limit = min(settings.max_limit, self.limit + 1 / self.limit)
+
+            if int(limit) > int(self.limit):
+                self.context.status.concurrency.increased += 1
+
+            self.limit = limit
+
+        self.limit = min(max(self.limit, settings.min_limit), settings.max_limit)
+        self._wake()
+        self._update_status()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncGenerator[None]:
+        """Make a call within the limit.
+
+        Network errors, server errors and HTTP errors are considered failures. Cancelled calls and calls rejected by the
+        circuit breaker do not adjust the limit.
+        """
+
+        if not self.context.settings.napcat.concurrency.enabled:
+            yield
+            return
+
+        await self.acquire()
+        start = time.monotonic()
+
+        try:
+            yield
+        except CircuitOpenError:
+            self._abandon()
+            raise
+        except (NetworkError, NetworkServerError, HTTPError):
+            self.release(start, True)
+            raise
+        except Exception:
+            self.release(start, False)
+            raise
+        except BaseException:
+            self._abandon()
+            raise
+        else:
+            self.release(start, False)
+
+    def _abandon(self) -> None:
+        # Release a slot without an outcome
+        self.in_flight -= 1
+        self._wake()
+        self._update_status()
+
+    def _wake(self) -> None:
+        while self.waiters and self.in_flight < int(self.limit):
+            if not (future := self.waiters.popleft()).done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _update_status(self) -> None:
+        status = self.context.status.concurrency
+        status.limit = round(self.limit, 3)
+        status.in_flight = self.in_flight
+        status.waiting = len(self.waiters)
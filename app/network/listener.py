@@ -0,0 +1,116 @@
+from typing import TYPE_CHECKING
+from collections.abc import Generator
+from contextlib import contextmanager
+import asyncio
+import os
+import socket
+
+from loguru import logger
+from fastapi import FastAPI
+import uvicorn
+
+from ..enum import ListenerMode
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "ReportListener"
+]
+
+
+class _Server(uvicorn.Server):
+    @contextmanager
+    def capture_signals(self) -> Generator[None]:
+        # Signals are handled by the main server, which stops the listener when the application is shut down
+        yield
+
+
+class ReportListener:
+    """Local listener that receives reports without TLS.
+
+    The listener serves only the webhook router, so reports are still verified by signature. It is either bound to the
+    loopback interface or to a Unix domain socket, and shares the application context with the main server.
+    """
+
+    def __init__(self, context: "AppContext") -> None:
+        self.context = context
+        self.server: _Server | None = None
+        self.path: str | None = None
+        self._serving: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._serving is not None and not self._serving.done()
+
+    def create_app(self) -> FastAPI:
+        from ..exception_handlers import init_exception_handlers
+        from ..routers.webhook import router as webhook
+
+        app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+        app.state.context = self.context
+        init_exception_handlers(app)
+        app.include_router(webhook)
+        return app
+
+    def bind(self) -> socket.socket:
+        """Bind the listening socket according to settings.
+
+        Returns:
+            Bound socket.
+
+        Raises:
+            OSError: Failed to bind the socket.
+        """
+
+        settings = self.context.settings.napcat.report
+
+        if settings.listener == ListenerMode.UNIX:
+            os.makedirs(os.path.dirname(settings.socket) or ".", exist_ok=True)
+
+            # Socket file left by an unclean shutdown
+            if os.path.exists(settings.socket):
+                os.remove(settings.socket)
+
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(settings.socket)
+            os.chmod(settings.socket, 0o660)
+            self.path = settings.socket
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("127.0.0.1", settings.port))
+
+        sock.set_inheritable(True)
+        return sock
+
+    async def start(self) -> None:
+        if self.running or self.context.settings.napcat.report.listener == ListenerMode.HTTPS:
+            return
+
+        # The socket is bound here, so that failures are reported instead of exiting the process
+        try:
+            sock = self.bind()
+        except OSError as e:
+            logger.error(f"Failed to start report listener, \"{e.__class__.__name__}\" occurred")
+            return
+
+        self.server = _Server(uvicorn.Config(self.create_app(), lifespan="off", log_config=None, access_log=False))
+        self._serving = asyncio.create_task(self.server.serve(sockets=[sock]))
+
+        while not self.server.started and not self._serving.done():
+            await asyncio.sleep(0.01)
+
+        logger.info(f"Report listener started on {self.path or sock.getsockname()}")
+
+    async def stop(self) -> None:
+        if self.server is not None and self._serving is not None:
+            self.server.should_exit = True
+            await asyncio.gather(self._serving, return_exceptions=True)
+
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+        self.server = None
+        self.path = None
+        self._serving = None
@@ -1,74 +1,325 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+from collections.abc import Callable, Coroutine
+from functools import partial
+import asyncio
+import time
 
+from loguru import logger
+from httpx import Response
+
+from ..models.config import Status
 from ..models.network.napcat import (
     GetLoginInfoResponse, GetFriendListResponse, GetGroupInfoResponse, GetGroupListResponse, GetGroupMemberInfoResponse,
     GetGroupMemberListResponse, GetImageResponse, SendPrivateMessageResponse, SendGroupMessageResponse,
     SetGroupCardResponse, SetGroupLeaveResponse, SetFriendAddRequestResponse, SetGroupAddRequestResponse
 )
 from ..models.report.segment import Segment
-from ..enum import GroupRequestSubType
+from ..cache import TTLCache
+from ..enum import GroupRequestSubType, TransportMode, NoticeType
+from ..exceptions import NetworkServerError, NetworkInvalidContentError
+from .. import codec
+from .websocket import WebSocketClient
+from .pool import HttpClientPool
+from .breaker import CircuitBreaker
+from .limiter import AdaptiveLimiter
 
 if TYPE_CHECKING:
     from ..context import AppContext
 
 __all__ = [
+    "Endpoint",
+    "ENDPOINTS",
+    "register_endpoint",
     "NapCatService"
 ]
 
+T = TypeVar("T")
+
+
+class Endpoint(Generic[T]):
+    """OneBot API endpoint.
+
+    Attributes:
+        action: Action name, such as `send_group_msg`.
+        response_class: Response model.
+        post: Whether parameters are posted as JSON content instead of query parameters over HTTP.
+        adapter: Cached type adapter of the response model.
+    """
+
+    __slots__ = ("action", "response_class", "post", "adapter")
+
+    def __init__(self, action: str, response_class: type[T], post: bool = False) -> None:
+        self.action = action
+        self.response_class = response_class
+        self.post = post
+        self.adapter = codec.get_adapter(response_class)
+
+    def parse(self, content: Any) -> T:
+        """Check and validate decoded response content.
+
+        Args:
+            content: Decoded response content.
+
+        Returns:
+            Validated response.
+
+        Raises:
+            NetworkInvalidContentError: Content is not a response object.
+            NetworkServerError: API returned non-zero `retcode`.
+        """
+
+        if not isinstance(content, dict):
+            logger.error(f"Failed to call {self.action}, invalid content returned")
+            raise NetworkInvalidContentError
+
+        if (retcode := content.get("retcode")) != 0:
+            logger.error(f"Failed to call {self.action}, retcode {retcode} returned, error message: {content.get('message')}")
+            raise NetworkServerError
+
+        return self.adapter.validate_python(content)
+
+
+ENDPOINTS: dict[str, Endpoint] = {}
+
+
+def register_endpoint(action: str, response_class: type[T], post: bool = False) -> Endpoint[T]:
+    """Register an endpoint, so that its URL is prebuilt and its latency is recorded.
+
+    Args:
+        action: Action name.
+        response_class: Response model.
+        post: Whether parameters are posted as JSON content over HTTP.
+
+    Returns:
+        Registered endpoint.
+    """
+
+    endpoint = ENDPOINTS[action] = Endpoint(action, response_class, post)
+    return endpoint
+
+
+GET_LOGIN_INFO = register_endpoint("get_login_info", GetLoginInfoResponse)
+GET_FRIEND_LIST = register_endpoint("get_friend_list", GetFriendListResponse)
+GET_GROUP_INFO = register_endpoint("get_group_info", GetGroupInfoResponse)
+GET_GROUP_LIST = register_endpoint("get_group_list", GetGroupListResponse)
+GET_GROUP_MEMBER_INFO = register_endpoint("get_group_member_info", GetGroupMemberInfoResponse)
+GET_GROUP_MEMBER_LIST = register_endpoint("get_group_member_list", GetGroupMemberListResponse)
+GET_IMAGE = register_endpoint("get_image", GetImageResponse)
+SEND_PRIVATE_MSG = register_endpoint("send_private_msg", SendPrivateMessageResponse, post=True)
+SEND_GROUP_MSG = register_endpoint("send_group_msg", SendGroupMessageResponse, post=True)
+SET_GROUP_CARD = register_endpoint("set_group_card", SetGroupCardResponse, post=True)
+SET_GROUP_LEAVE = register_endpoint("set_group_leave", SetGroupLeaveResponse, post=True)
+SET_FRIEND_ADD_REQUEST = register_endpoint("set_friend_add_request", SetFriendAddRequestResponse, post=True)
+SET_GROUP_ADD_REQUEST = register_endpoint("set_group_add_request", SetGroupAddRequestResponse, post=True)
+
 
 class NapCatService:
     def __init__(self, context: "AppContext") -> None:
         self.context = context
+        self.websocket = WebSocketClient(context)
+        self.limiter = AdaptiveLimiter(context)
+        self.urls: dict[str, str] = {}
+        self.breaker_name = ""
+        self._api_settings: Any = None
+        self._total_latency: dict[str, float] = {}
+
+        # Group and member information is cached until it expires or is invalidated by notices, and concurrent misses
+        # of the same key are coalesced into one call
+        self.info_cache: TTLCache[tuple, Any] = TTLCache(max_size=context.settings.napcat.cache.max_size, ttl=60)
+        self._inflight: dict[tuple, asyncio.Task] = {}
+
+    @property
+    def _use_websocket(self) -> bool:
+        # Fall back to HTTP API when the connection is not established
+        return self.context.settings.napcat.transport == TransportMode.WEBSOCKET and self.websocket.connected
+
+    def _load_api_settings(self) -> Any:
+        # NapCat settings are replaced as a whole when updated, so URLs are rebuilt only if the settings are replaced
+        if (settings := self.context.settings.napcat.api) is not self._api_settings:
+            self.urls = {action: f"{settings.base_url}/{action}" for action in ENDPOINTS}
+            self.breaker_name = HttpClientPool.get_key(settings.base_url)
+            self._api_settings = settings
+
+        return settings
+
+    def get_url(self, endpoint: Endpoint) -> str:
+        settings = self._load_api_settings()
+
+        if (url := self.urls.get(endpoint.action)) is None:
+            url = self.urls[endpoint.action] = f"{settings.base_url}/{endpoint.action}"
+
+        return url
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Circuit breaker of NapCat, named after the host of NapCat API."""
+
+        self._load_api_settings()
+        return self.context.circuit_breakers.get(self.breaker_name)
+
+    @staticmethod
+    def _decode(response: Response) -> Any:
+        try:
+            return codec.loads(response.content)
+        except codec.DecodeError:
+            logger.error(f"Failed to request {response.request.url}, invalid content returned")
+            raise NetworkInvalidContentError
+
+    async def request(self, endpoint: Endpoint[T], params: dict[str, Any] | None = None) -> T:
+        """Call an API endpoint through WebSocket if connected, otherwise through HTTP.
+
+        The response content is decoded only once, and then checked and validated. Latency of the endpoint is recorded
+        in the application status. The number of concurrent calls is limited by the adaptive limiter.
+
+        Args:
+            endpoint: Registered endpoint.
+            params: API parameters.
+
+        Returns:
+            Validated response.
+
+        Raises:
+            NetworkError: Failed to call the API, or the circuit of NapCat is open.
+        """
+
+        start: float | None = None
+        failed = True
+
+        try:
+            # Only failures of transport count, since API errors do not mean that NapCat is unavailable
+            # Time waiting for a slot is not counted as latency of NapCat
+            async with self.limiter.slot(), self.breaker.guard():
+                start = time.perf_counter()
+
+                if self._use_websocket:
+                    content = await self.websocket.call(endpoint.action, params)
+                elif endpoint.post:
+                    # Segments are serialized by the codec directly
+                    content = self._decode(await self.context.http_client.post(
+                        self.get_url(endpoint),
+                        content=codec.dumps(params or {}),
+                        headers={"Content-Type": "application/json"},
+                        extensions={"defer_json": True}
+                    ))
+                else:
+                    content = self._decode(await self.context.http_client.get(
+                        self.get_url(endpoint),
+                        params=params,
+                        extensions={"defer_json": True}
+                    ))
+
+            result = endpoint.parse(content)
+            failed = False
+            return result
+        finally:
+            # Calls rejected before being made have no latency
+            self._record(endpoint, 0 if start is None else (time.perf_counter() - start) * 1000, failed)
+
+    async def _get_cached(self, key: tuple, ttl: float, fetch: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        if ttl > 0 and (result := self.info_cache.get(key)) is not None:
+            self._update_cache_status()
+            return result
+
+        if (task := self._inflight.get(key)) is None:
+            task = self._inflight[key] = asyncio.create_task(fetch())
+            task.add_done_callback(partial(self._store, key, ttl))
+        else:
+            self.context.status.info_cache.coalesced += 1
+
+        # A cancelled caller must not cancel the call shared by others
+        return await asyncio.shield(task)
+
+    def _store(self, key: tuple, ttl: float, task: asyncio.Task) -> None:
+        # The call is discarded if the key has been invalidated meanwhile
+        if self._inflight.get(key) is not task:
+            return
+
+        del self._inflight[key]
+
+        if ttl > 0 and not task.cancelled() and task.exception() is None:
+            self.info_cache.set(key, task.result(), ttl=ttl)
+
+        self._update_cache_status()
+
+    def _update_cache_status(self) -> None:
+        status = self.context.status.info_cache
+        status.size = len(self.info_cache)
+        status.hits = self.info_cache.hits
+        status.misses = self.info_cache.misses
+
+    def invalidate_cache(self, content: dict) -> None:
+        """Invalidate cached information changed by a notice.
+
+        Args:
+            content: Raw notice content.
+        """
+
+        notice_type, group_id, user_id = content.get("notice_type"), content.get("group_id"), content.get("user_id")
+        keys = []
+
+        if notice_type in (NoticeType.GROUP_CARD, NoticeType.GROUP_ADMIN):
+            keys.append(("member", group_id, user_id))
+        elif notice_type in (NoticeType.GROUP_INCREASE, NoticeType.GROUP_DECREASE):
+            # Member count of the group is changed as well
+            keys += [("member", group_id, user_id), ("group", group_id)]
+
+        for key in keys:
+            self.info_cache.pop(key)
+            self._inflight.pop(key, None)
+
+        if keys:
+            self._update_cache_status()
+
+    def _record(self, endpoint: Endpoint, latency: float, failed: bool) -> None:
+        if (status := self.context.status.endpoints.get(endpoint.action)) is None:
+            status = self.context.status.endpoints[endpoint.action] = Status.Endpoint()
+
+        status.calls += 1
+        status.errors += failed
+        total = self._total_latency[endpoint.action] = self._total_latency.get(endpoint.action, 0) + latency
+        status.average_latency = round(total / status.calls, 3)
+        status.max_latency = round(max(status.max_latency, latency), 3)
 
     async def get_login_info(self) -> GetLoginInfoResponse:
-        return GetLoginInfoResponse.model_validate((await self.context.http_client.get(
-            self.context.settings.napcat.api.base_url + "/get_login_info"
-        )).json())
+        return await self.request(GET_LOGIN_INFO)
 
     async def get_friend_list(self) -> GetFriendListResponse:
-        return GetFriendListResponse.model_validate((await self.context.http_client.get(
-            self.context.settings.napcat.api.base_url + "/get_friend_list"
-        )).json())
+        return await self.request(GET_FRIEND_LIST)
 
     async def get_group_info(self, group_id: int, no_cache: bool = False) -> GetGroupInfoResponse:
-        return GetGroupInfoResponse.model_validate((await self.context.http_client.get(
-            self.context.settings.napcat.api.base_url + "/get_group_info",
-            params={
-                "group_id": group_id,
-                "no_cache": no_cache
-            }
-        )).json())
+        key = ("group", group_id)
+
+        if no_cache:
+            self.info_cache.pop(key)
+            self._inflight.pop(key, None)
+
+        return await self._get_cached(key, self.context.settings.napcat.cache.group_ttl, partial(
+            self.request, GET_GROUP_INFO, {"group_id": group_id, "no_cache": no_cache}
+        ))
 
     async def get_group_list(self) -> GetGroupListResponse:
-        return GetGroupListResponse.model_validate((await self.context.http_client.get(
-            self.context.settings.napcat.api.base_url + "/get_group_list"
-        )).json())
+        return await self.request(GET_GROUP_LIST)
 
     async def get_group_member_info(self, group_id: int, user_id: int, no_cache: bool = False) -> GetGroupMemberInfoResponse:
-        return GetGroupMemberInfoResponse.model_validate((await self.context.http_client.get(
-            self.context.settings.napcat.api.base_url + "/get_group_member_info",
-            params={
-                "group_id": group_id,
-                "user_id": user_id,
-                "no_cache": no_cache
-            }
-        )).json())
+        key = ("member", group_id, user_id)
+
+        if no_cache:
+            self.info_cache.pop(key)
+            self._inflight.pop(key, None)
+
+        return await self._get_cached(key, self.context.settings.napcat.cache.member_ttl, partial(
+            self.request, GET_GROUP_MEMBER_INFO, {"group_id": group_id, "user_id": user_id, "no_cache": no_cache}
+        ))
 
     async def get_group_member_list(self, group_id: int) -> GetGroupMemberListResponse:
-        return GetGroupMemberListResponse.model_validate((await self.context.http_client.get(
-            self.context.settings.napcat.api.base_url + "/get_group_member_list",
-            params={
-                "group_id": group_id
-            }
-        )).json())
+        return await self.request(GET_GROUP_MEMBER_LIST, {
+            "group_id": group_id
+        })
 
     async def get_image(self, file: str) -> GetImageResponse:
-        return GetImageResponse.model_validate((await self.context.http_client.get(
-            self.context.settings.napcat.api.base_url + "/get_image",
-            params={
-                "file": file
-            }
-        )).json())
+        return await self.request(GET_IMAGE, {
+            "file": file
+        })
 
     async def send_private_message(
         self,
@@ -76,14 +327,11 @@ class NapCatService:
         message: list[Segment],
         auto_escape: bool = False
     ) -> SendPrivateMessageResponse:
-        return SendPrivateMessageResponse.model_validate((await self.context.http_client.post(
-            self.context.settings.napcat.api.base_url + "/send_private_msg",
-            json={
-                "user_id": user_id,
-                "message": [segment.model_dump() for segment in message],
-                "auto_escape": auto_escape
-            }
-        )).json())
+        return await self.request(SEND_PRIVATE_MSG, {
+            "user_id": user_id,
+            "message": message,
+            "auto_escape": auto_escape
+        })
 
     async def send_group_message(
         self,
@@ -91,14 +339,11 @@ class NapCatService:
         message: list[Segment],
         auto_escape: bool = False
     ) -> SendGroupMessageResponse:
-        return SendGroupMessageResponse.model_validate((await self.context.http_client.post(
-            self.context.settings.napcat.api.base_url + "/send_group_msg",
-            json={
-                "group_id": group_id,
-                "message": [segment.model_dump() for segment in message],
-                "auto_escape": auto_escape
-            }
-        )).json())
+        return await self.request(SEND_GROUP_MSG, {
+            "group_id": group_id,
+            "message": message,
+            "auto_escape": auto_escape
+        })
 
     async def set_group_card(
         self,
@@ -106,27 +351,21 @@ class NapCatService:
         user_id: int,
         card: str = ""
     ) -> SetGroupCardResponse:
-        return SetGroupCardResponse.model_validate((await self.context.http_client.post(
-            self.context.settings.napcat.api.base_url + "/set_group_card",
-            json={
-                "group_id": group_id,
-                "user_id": user_id,
-                "card": card
-            }
-        )).json())
+        return await self.request(SET_GROUP_CARD, {
+            "group_id": group_id,
+            "user_id": user_id,
+            "card": card
+        })
 
     async def set_group_leave(
         self,
         group_id: int,
         is_dismiss: bool = False
     ) -> SetGroupLeaveResponse:
-        return SetGroupLeaveResponse.model_validate((await self.context.http_client.post(
-            self.context.settings.napcat.api.base_url + "/set_group_leave",
-            json={
-                "group_id": group_id,
-                "is_dismiss": is_dismiss
-            }
-        )).json())
+        return await self.request(SET_GROUP_LEAVE, {
+            "group_id": group_id,
+            "is_dismiss": is_dismiss
+        })
 
     async def set_friend_add_request(
         self,
@@ -134,14 +373,11 @@ class NapCatService:
         approve: bool,
         remark: str = ""
     ) -> SetFriendAddRequestResponse:
-        return SetFriendAddRequestResponse.model_validate((await self.context.http_client.post(
-            self.context.settings.napcat.api.base_url + "/set_friend_add_request",
-            json={
-                "flag": flag,
-                "approve": approve,
-                "remark": remark
-            }
-        )).json())
+        return await self.request(SET_FRIEND_ADD_REQUEST, {
+            "flag": flag,
+            "approve": approve,
+            "remark": remark
+        })
 
     async def set_group_add_request(
         self,
@@ -150,12 +386,9 @@ class NapCatService:
         approve: bool,
         reason: str = ""
     ) -> SetGroupAddRequestResponse:
-        return SetGroupAddRequestResponse.model_validate((await self.context.http_client.post(
-            self.context.settings.napcat.api.base_url + "/set_group_add_request",
-            json={
-                "flag": flag,
-                "sub_type": sub_type.value,
-                "approve": approve,
-                "reason": reason
-            }
-        )).json())
+        return await self.request(SET_GROUP_ADD_REQUEST, {
+            "flag": flag,
+            "sub_type": sub_type.value,
+            "approve": approve,
+            "reason": reason
+        })
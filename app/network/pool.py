@@ -0,0 +1,71 @@
+from typing import TYPE_CHECKING
+import asyncio
+import importlib.util
+
+from loguru import logger
+from httpx import URL, Limits
+
+from . import HttpClient
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "HttpClientPool"
+]
+
+
+class HttpClientPool:
+    """Pool of long-lived HTTP clients, one for each host.
+
+    Clients are created on first use and kept until the pool is closed, so that DNS lookups, TCP connections and TLS
+    sessions to the same host are reused across requests.
+    """
+
+    def __init__(self, context: "AppContext") -> None:
+        self.context = context
+        self.clients: dict[str, HttpClient] = {}
+
+    @staticmethod
+    def get_key(url: str | URL) -> str:
+        url = URL(url)
+        return f"{url.scheme}://{url.host}:{url.port or (443 if url.scheme == 'https' else 80)}"
+
+    def get(self, url: str | URL) -> HttpClient:
+        """Get the client for the host of the URL.
+
+        Args:
+            url: URL to be requested.
+
+        Returns:
+            Client shared by all requests to the same host.
+        """
+
+        if (client := self.clients.get(key := self.get_key(url))) is None or client.is_closed:
+            client = self.clients[key] = self._create_client(key)
+            logger.debug(f"HTTP client for {key} created")
+
+        return client
+
+    def _create_client(self, key: str) -> HttpClient:
+        settings = self.context.settings.app.http_pool
+        http2 = settings.http2
+
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("Package h2 not installed, HTTP/2 disabled")
+            http2 = False
+
+        return HttpClient(
+            limits=Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry
+            ),
+            http2=http2,
+            timeout=settings.timeout,
+            breaker=self.context.circuit_breakers.get(key)
+        )
+
+    async def aclose(self) -> None:
+        clients, self.clients = list(self.clients.values()), {}
+        await asyncio.gather(*[client.aclose() for client in clients], return_exceptions=True)
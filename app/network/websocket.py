@@ -0,0 +1,171 @@
+from typing import TYPE_CHECKING, Any
+import asyncio
+import itertools
+
+from loguru import logger
+from websockets.asyncio.client import connect, ClientConnection
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+
+from ..exceptions import NetworkError
+from .. import codec
+
+if TYPE_CHECKING:
+    from ..context import AppContext
+
+__all__ = [
+    "WebSocketClient"
+]
+
+
+class WebSocketClient:
+    """Full-duplex OneBot WebSocket client.
+
+    A single persistent connection is used to receive reports and to call APIs. API calls are multiplexed by `echo`,
+    and the connection is re-established automatically with exponential backoff.
+    """
+
+    def __init__(self, context: "AppContext") -> None:
+        self.context = context
+        self.connection: ClientConnection | None = None
+        self.pending: dict[str, asyncio.Future] = {}
+        self._echo = itertools.count(1)
+        self._runner: asyncio.Task | None = None
+        self._report_tasks: set[asyncio.Task] = set()
+        self._connected = asyncio.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.context.settings.napcat.api.host}:{self.context.settings.napcat.websocket.port}"
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    async def start(self) -> None:
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+        await asyncio.gather(*self._report_tasks, return_exceptions=True)
+
+    async def wait_connected(self, timeout: float | None = None) -> None:
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def call(self, action: str, params: dict[str, Any] | None = None) -> Any:
+        """Call an API through the connection.
+
+        Args:
+            action: API name, such as `send_group_msg`.
+            params: API parameters.
+
+        Returns:
+            Decoded response of the API.
+
+        Raises:
+            NetworkError: Connection is not established, or the response is not received in time.
+        """
+
+        if (connection := self.connection) is None:
+            raise NetworkError
+
+        echo = str(next(self._echo))
+        future = self.pending[echo] = asyncio.get_running_loop().create_future()
+        self.context.status.websocket.pending = len(self.pending)
+
+        try:
+            await connection.send(codec.dumps_str({
+                "action": action,
+                "params": params or {},
+                "echo": echo
+            }))
+            logger.debug(f"WebSocket request: {action}, echo: {echo}")
+
+            return await asyncio.wait_for(future, self.context.settings.napcat.websocket.timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Failed to call {action}, response timed out")
+            raise NetworkError
+        except ConnectionClosed:
+            logger.error(f"Failed to call {action}, connection closed")
+            raise NetworkError
+        finally:
+            self.pending.pop(echo, None)
+            self.context.status.websocket.pending = len(self.pending)
+
+    async def _run(self) -> None:
+        settings = self.context.settings.napcat.websocket
+        interval = settings.reconnect_interval
+
+        while True:
+            try:
+                async with connect(
+                    self.url,
+                    additional_headers={"Authorization": f"Bearer {self.context.settings.security.webhook.secret}"},
+                    max_size=None
+                ) as connection:
+                    self.connection = connection
+                    self._connected.set()
+                    self.context.status.websocket.connected = True
+                    self.context.status.websocket.connections += 1
+                    interval = settings.reconnect_interval
+                    logger.info(f"WebSocket connected to {self.url}")
+
+                    await self._receive(connection)
+            except (OSError, InvalidHandshake, ConnectionClosed, asyncio.TimeoutError) as e:
+                logger.warning(f"WebSocket connection to {self.url} failed, \"{e.__class__.__name__}\" occurred")
+            finally:
+                self._disconnect()
+
+            logger.info(f"Reconnect WebSocket in {interval} seconds")
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, settings.max_reconnect_interval)
+
+    async def _receive(self, connection: ClientConnection) -> None:
+        async for data in connection:
+            try:
+                content = codec.loads(data)
+            except codec.DecodeError:
+                logger.warning("Invalid WebSocket content received")
+                continue
+
+            if not isinstance(content, dict):
+                continue
+            elif "post_type" in content:
+                self._handle_report(content)
+            elif (future := self.pending.get(str(content.get("echo")))) and not future.done():
+                future.set_result(content)
+
+    def _handle_report(self, content: dict) -> None:
+        try:
+            report = self.context.ingestion_manager.parse_report(content)
+        except ValueError:
+            logger.warning("Report finished, message invalid")
+            return
+
+        if report is None:
+            return
+
+        # Reports are handled outside the receiving loop, so that plugins can call APIs through the same connection
+        task = asyncio.create_task(self.context.ingestion_manager.submit(report))
+        self._report_tasks.add(task)
+        task.add_done_callback(self._report_done)
+
+    def _report_done(self, task: asyncio.Task) -> None:
+        self._report_tasks.discard(task)
+
+        if not task.cancelled() and (e := task.exception()):
+            logger.opt(exception=e).error("Unexpected exception occurred while handling report")
+
+    def _disconnect(self) -> None:
+        self.connection = None
+        self._connected.clear()
+        self.context.status.websocket.connected = False
+
+        # Calls waiting for responses will never be answered
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionClosed(None, None))
@@ -4,9 +4,11 @@ from fastapi.responses import Response as Response_, JSONResponse as JSONRespons
 from sse_starlette import EventSourceResponse as EventSourceResponse_
 
 from .globals import VERSION
+from . import codec
 
 __all__ = [
     "EmptyResponse",
+    "QuickOperationResponse",
     "JSONResponse",
     "EventSourceResponse"
 ]
@@ -21,6 +23,15 @@ class EmptyResponse(Response_):
         super().__init__(headers=DEFAULT_HEADERS, status_code=status_code)
 
 
+class QuickOperationResponse(Response_):
+    """Webhook response with a quick operation of OneBot."""
+
+    media_type = "application/json"
+
+    def __init__(self, operation: dict[str, Any]) -> None:
+        super().__init__(headers=DEFAULT_HEADERS, content=codec.dumps(operation))
+
+
 class JSONResponse(JSONResponse_):
     headers = DEFAULT_HEADERS | {
         "Content-Type": "application/json; charset=utf-8"
@@ -43,6 +54,9 @@ class JSONResponse(JSONResponse_):
 
         super().__init__(headers=self.headers, status_code=status_code, content=content)
 
+    def render(self, content: Any) -> bytes:
+        return codec.dumps(content)
+
 
 class EventSourceResponse(EventSourceResponse_):
     headers = DEFAULT_HEADERS | {
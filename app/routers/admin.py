@@ -53,7 +53,6 @@ async def update_security_settings(data: UpdateSecuritySettingsRequest, context:
     logger.info("API request received: Update security settings")
 
     context.settings.update_security(data.model_dump(exclude_none=True))
-    context.config_manager.dirty = True
 
     return JSONResponse()
 
@@ -70,7 +69,6 @@ async def update_application_settings(data: UpdateApplicationSettingsRequest, co
     logger.info("API request received: Update application settings")
 
     context.settings.update_application(data.model_dump(exclude_none=True))
-    context.config_manager.dirty = True
 
     return JSONResponse()
 
@@ -112,7 +110,7 @@ async def get_plugin_settings(plugin: str, context: AppContextDep) -> JSONRespon
     if plugin not in context.status.plugins:
         raise ResourceNotFoundError(message="Plugin not found")
 
-    return JSONResponse(data=context.plugin_settings.get(plugin=plugin))
+    return JSONResponse(data=context.plugin_settings.copy(plugin=plugin))
 
 
 @router.patch("/plugin/{plugin}/settings", dependencies=[Depends(verify_jwt_token, use_cache=False)])
@@ -129,7 +127,6 @@ async def update_plugin_settings(plugin: str, data: UpdatePluginSettingsRequest,
             raise ParametersInvalidError(message="Plugin settings invalid")
 
     context.plugin_settings.set(plugin=plugin, settings=data)
-    context.config_manager.dirty = True
     plugin_class.load(context)
 
     return JSONResponse()
@@ -143,7 +140,6 @@ async def reset_plugin_settings(plugin: str, context: AppContextDep) -> JSONResp
         raise ResourceNotFoundError(message="Plugin not found")
 
     context.plugin_settings.set(plugin=plugin, settings={})
-    context.config_manager.dirty = True
     context.dispatch_manager.find_plugin(plugin).load(context)
 
     return JSONResponse()
@@ -156,7 +152,7 @@ async def get_plugin_replies(plugin: str, context: AppContextDep) -> JSONRespons
     if plugin not in context.status.plugins:
         raise ResourceNotFoundError(message="Plugin not found")
 
-    return JSONResponse(data=context.replies.get_replies(group=plugin))
+    return JSONResponse(data=context.replies.copy_replies(group=plugin))
 
 
 @router.patch("/plugin/{plugin}/replies", dependencies=[Depends(verify_jwt_token, use_cache=False)])
@@ -173,7 +169,6 @@ async def update_plugin_replies(plugin: str, data: dict[str, str], context: AppC
             raise ParametersInvalidError(message="Plugin replies invalid")
 
     context.replies.set_replies(group=plugin, replies=data)
-    context.config_manager.dirty = True
     plugin_class.load(context)
 
     return JSONResponse()
@@ -196,7 +191,7 @@ async def reset_plugin_replies(plugin: str, context: AppContextDep) -> JSONRespo
 async def get_chat_settings(chat_type: ChatType, chat_id: int, group: str, context: AppContextDep) -> JSONResponse:
     logger.info(f"API request received: Get chat settings for \"{chat_id} ({chat_type.value})\" with settings group \"{group}\"")
 
-    return JSONResponse(data=context.chat_settings.get(chat_type=chat_type, chat_id=chat_id, settings_group=group))
+    return JSONResponse(data=context.chat_settings.copy(chat_type=chat_type, chat_id=chat_id, settings_group=group))
 
 
 @router.get("/logs", dependencies=[Depends(verify_jwt_token, use_cache=False)])
@@ -34,7 +34,6 @@ async def update_settings(data: UpdateNapCatSettingsRequest, context: AppContext
     logger.info("API request received: Update settings of NapCat")
 
     context.settings.update_napcat(data.model_dump(exclude_none=True))
-    context.config_manager.dirty = True
 
     return JSONResponse()
 
@@ -32,7 +32,6 @@ async def update_settings(context: AppContextDep, data: UpdateQQSettingsRequest)
     logger.info("API request received: Update settings of QQ")
 
     context.settings.update_qq(data.model_dump(exclude_none=True))
-    context.config_manager.dirty = True
 
     return JSONResponse()
 
@@ -1,117 +1,50 @@
 from loguru import logger
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Request, Response, Depends
 
 from ..dependencies import AppContextDep
-from ..context import AppContext
 from ..auth import verify_signature
-from ..responses import EmptyResponse
-from ..enum import ApplicationStatus, ReportType, MessageType, NoticeType, RequestType, SegmentType
+from ..responses import EmptyResponse, QuickOperationResponse
 from ..exceptions import MessageInvalidError
-from ..models.report import Report
-from ..models.report.message import (
-    Message, PrivateMessage, GroupMessage
-)
-from ..models.report.request import (
-    Request, FriendRequest, GroupRequest
-)
-from ..models.report.notice import (
-    Notice, FriendAddNotice, FriendRecallNotice, GroupUploadNotice, GroupAdminNotice, GroupBanNotice, GroupCardNotice,
-    GroupDecreaseNotice, GroupIncreaseNotice, GroupRecallNotice, GroupMessageEmojiLikeNotice, EssenceNotice,
-    NotifyNotice
-)
+from ..models.report.message import Message
+from .. import codec
 
-REPORTS: dict[tuple, type[Report]] = {
-    (ReportType.MESSAGE, MessageType.PRIVATE): PrivateMessage,
-    (ReportType.MESSAGE, MessageType.GROUP): GroupMessage,
-    (ReportType.REQUEST, RequestType.FRIEND): FriendRequest,
-    (ReportType.REQUEST, RequestType.GROUP): GroupRequest,
-    (ReportType.NOTICE, NoticeType.FRIEND_ADD): FriendAddNotice,
-    (ReportType.NOTICE, NoticeType.FRIEND_RECALL): FriendRecallNotice,
-    (ReportType.NOTICE, NoticeType.GROUP_ADMIN): GroupAdminNotice,
-    (ReportType.NOTICE, NoticeType.GROUP_BAN): GroupBanNotice,
-    (ReportType.NOTICE, NoticeType.GROUP_CARD): GroupCardNotice,
-    (ReportType.NOTICE, NoticeType.GROUP_DECREASE): GroupDecreaseNotice,
-    (ReportType.NOTICE, NoticeType.GROUP_INCREASE): GroupIncreaseNotice,
-    (ReportType.NOTICE, NoticeType.GROUP_RECALL): GroupRecallNotice,
-    (ReportType.NOTICE, NoticeType.GROUP_UPLOAD): GroupUploadNotice,
-    (ReportType.NOTICE, NoticeType.GROUP_MESSAGE_EMOJI_LIKE): GroupMessageEmojiLikeNotice,
-    (ReportType.NOTICE, NoticeType.ESSENCE): EssenceNotice,
-    (ReportType.NOTICE, NoticeType.NOTIFY): NotifyNotice
-}
-IGNORED_TYPES = {
-    (ReportType.META_EVENT, None),
-    (ReportType.NOTICE, NoticeType.OFFLINE_FILE),
-    (ReportType.NOTICE, NoticeType.CLIENT_STATUS),
-}
 router = APIRouter()
 
 
 @router.post("/report", dependencies=[Depends(verify_signature, use_cache=False)])
-async def message_report(content: dict, context: AppContextDep) -> EmptyResponse:
+async def message_report(request: Request, context: AppContextDep) -> Response:
     logger.info("API request received: Webhook report")
-    logger.debug(f"Report content: {content}")
-
-    post_type = content.get("post_type")
-    sub_type = content.get("message_type") or content.get("request_type") or content.get("notice_type")
-
-    if any([
-        (post_type, sub_type) in IGNORED_TYPES,
-        (post_type, None) in IGNORED_TYPES,
-        (post_type, sub_type) not in REPORTS,
-    ]):
-        logger.debug(f"Report \"{post_type} ({sub_type})\" ignored")
-        return EmptyResponse()
 
+    # The body has been read and cached by signature verification
     try:
-        logger.info(f"Report \"{post_type} ({sub_type})\" started")
-        report = REPORTS[(post_type, sub_type)].model_validate(content)
+        content = codec.loads(await request.body())
+    except codec.DecodeError:
+        logger.warning("Report finished, content invalid")
+        raise MessageInvalidError
 
-        if isinstance(report, Message):
-            await handle_message(report, context)
-        elif isinstance(report, (Notice, Request)):
-            await handle_event(report, context)
+    if not isinstance(content, dict):
+        logger.warning("Report finished, content invalid")
+        raise MessageInvalidError
 
-        logger.info("Report completed")
+    try:
+        report = context.ingestion_manager.parse_report(content)
     except ValueError:
         logger.warning("Report finished, message invalid")
         raise MessageInvalidError
-    except RuntimeError as e:
-        logger.info(e)
-
-    return EmptyResponse()
 
+    if report is None:
+        return EmptyResponse()
 
-async def handle_message(message: Message, context: AppContext):
-    # Check app status
-    if context.status.app != ApplicationStatus.RUNNING:
-        raise RuntimeError("Report skipped, application not running")
-
-    # Check module status
-    if not context.status.module.order:
-        raise RuntimeError("Report skipped, order module disabled")
-
-    message_contents = []
-
-    for segment in message.message:
-        match segment.type:
-            case SegmentType.AT:
-                if segment.data.qq == context.status.bot.id:
-                    continue
-                else:
-                    raise RuntimeError("Report filtered, message targeted to others detected")
-            case SegmentType.TEXT:
-                message_contents.append(segment.data.text.strip())
-            case SegmentType.IMAGE:
-                continue
-            case _:
-                raise RuntimeError(f"Report filtered, unsupported segment type \"{segment.type.value}\" detected")
-
-    await context.dispatch_manager.dispatch_order(message, "\n".join(message_contents).strip())
-
+    if context.settings.app.quick_reply.enabled and isinstance(report, Message):
+        if reply := await context.ingestion_manager.submit_for_quick_reply(report):
+            logger.debug("Reply returned by quick operation")
 
-async def handle_event(event: Notice | Request, context: AppContext) -> None:
-    # Check module status
-    if not context.status.module.event:
-        raise RuntimeError("Report skipped, event module disabled")
+            return QuickOperationResponse({
+                "reply": reply,
+                "auto_escape": False,
+                "at_sender": False
+            })
+    else:
+        await context.ingestion_manager.submit(report)
 
-    await context.dispatch_manager.dispatch_event(event)
+    return EmptyResponse()
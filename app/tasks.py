@@ -1,9 +1,10 @@
 from typing import TYPE_CHECKING
+import math
 
 from loguru import logger
 
 from .exceptions import DiceRobotRuntimeException
-from .enum import ApplicationStatus
+from .enum import ApplicationStatus, CircuitState
 from .utils import run_command
 
 if TYPE_CHECKING:
@@ -19,6 +20,8 @@ __all__ = [
     "save_config",
     "start_napcat",
     "check_bot_status",
+    "hold",
+    "handle_napcat_circuit",
     "refresh_friend_list",
     "refresh_group_list"
 ]
@@ -48,6 +51,16 @@ async def start_napcat(context: "AppContext") -> None:
 
 
 async def check_bot_status(context: "AppContext") -> None:
+    if context.task_manager.bot_status_lock.locked():
+        # The check in progress, whose probe may have closed the circuit of NapCat, is enough
+        logger.debug("Bot status is being checked")
+        return
+
+    async with context.task_manager.bot_status_lock:
+        await _check_bot_status(context)
+
+
+async def _check_bot_status(context: "AppContext") -> None:
     logger.info("Check bot status")
 
     try:
@@ -69,21 +82,39 @@ async def check_bot_status(context: "AppContext") -> None:
             for schedule in STATE_TASKS:
                 if (await context.task_manager.scheduler.get_schedule(schedule)).paused:
                     await context.task_manager.scheduler.unpause_schedule(schedule, resume_from="now")
+
+            # Send messages saved while NapCat was unavailable
+            context.outbox_manager.replay()
     except (DiceRobotRuntimeException, ValueError, RuntimeError):
-        # Clear status
-        context.status.bot.id = -1
-        context.status.bot.nickname = ""
-        context.status.bot.friends = []
-        context.status.bot.groups = []
+        await hold(context)
 
-        if context.status.app != ApplicationStatus.HOLDING:
-            context.status.app = ApplicationStatus.HOLDING
 
-            logger.warning("Application status changed: Holding")
+async def hold(context: "AppContext") -> None:
+    # Clear status
+    context.status.bot.id = -1
+    context.status.bot.nickname = ""
+    context.status.bot.friends = []
+    context.status.bot.groups = []
 
-            # Pause state jobs
-            for schedule in STATE_TASKS:
-                await context.task_manager.scheduler.pause_schedule(schedule)
+    if context.status.app != ApplicationStatus.HOLDING:
+        context.status.app = ApplicationStatus.HOLDING
+
+        logger.warning("Application status changed: Holding")
+
+        # Pause state jobs
+        for schedule in STATE_TASKS:
+            await context.task_manager.scheduler.pause_schedule(schedule)
+
+
+async def handle_napcat_circuit(context: "AppContext", state: CircuitState) -> None:
+    if state == CircuitState.OPEN:
+        # NapCat is unavailable, so hold until the circuit is closed, which is probed by the next check
+        await hold(context)
+        await context.task_manager.run_task_later(
+            "dicerobot.check_bot_status", math.ceil(context.settings.app.circuit_breaker.open_duration)
+        )
+    elif state == CircuitState.CLOSED and context.status.app != ApplicationStatus.RUNNING:
+        await check_bot_status(context)
 
 
 async def refresh_friend_list(context: "AppContext") -> None:
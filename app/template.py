@@ -0,0 +1,179 @@
+from typing import Any
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from functools import lru_cache
+import asyncio
+import inspect
+import re
+
+from loguru import logger
+
+__all__ = [
+    "ReplyTemplate",
+    "compile_template",
+    "ReplyVariableResolver",
+    "ReplyVariables",
+    "UNRESOLVED"
+]
+
+_MISSING = object()
+# Returned by resolvers when a variable does not apply to the request (e.g. group name in a private chat)
+UNRESOLVED = object()
+
+
+class ReplyTemplate:
+    """Reply compiled into literal and variable parts.
+
+    Placeholders like `{&name}` are replaced with the values of reply variables. Placeholders of missing variables are
+    kept as they are.
+
+    Attributes:
+        parts: Literal parts and placeholders, in order.
+        slots: Indexes of placeholders in parts, and the names of their variables.
+        variables: Names of variables referenced by the template.
+    """
+
+    PATTERN = re.compile(r"\{&(.+?)}")
+
+    __slots__ = ("parts", "slots", "variables")
+
+    def __init__(self, reply: str) -> None:
+        # Odd items of the split parts are variable names
+        parts = self.PATTERN.split(reply)
+        self.slots = tuple((i, parts[i]) for i in range(1, len(parts), 2))
+        self.parts = tuple(part if i % 2 == 0 else f"{{&{part}}}" for i, part in enumerate(parts))
+        self.variables = frozenset(name for _, name in self.slots)
+
+    def render(self, variables: Mapping[str, object]) -> str:
+        """Render the template with reply variables.
+
+        Args:
+            variables: Reply variables.
+
+        Returns:
+            Rendered reply.
+        """
+
+        if not self.slots:
+            return self.parts[0]
+
+        parts = list(self.parts)
+
+        for i, name in self.slots:
+            if (value := variables.get(name, _MISSING)) is not _MISSING:
+                parts[i] = str(value)
+
+        return "".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(reply: str) -> ReplyTemplate:
+    """Compile a reply which is not one of the replies of a plugin, such as a reply built by the plugin.
+
+    Args:
+        reply: Reply.
+
+    Returns:
+        Compiled template, cached by the reply.
+    """
+
+    return ReplyTemplate(reply)
+
+
+class ReplyVariableResolver:
+    """Lazy provider of a reply variable.
+
+    Attributes:
+        func: Function or coroutine function that resolves the variable with the plugin instance.
+        is_async: Whether the function is a coroutine function.
+    """
+
+    __slots__ = ("func", "is_async")
+
+    def __init__(self, func: Callable[[Any], Any]) -> None:
+        self.func = func
+        self.is_async = inspect.iscoroutinefunction(func)
+
+
+class ReplyVariables(Mapping[str, Any]):
+    """Reply variables of a request.
+
+    A variable is either set explicitly, or resolved by its resolver when it is referenced for the first time, and then
+    memoized for the request. Variables with async resolvers are resolved only by `resolve`. Variables failed to be
+    resolved, or resolved to `UNRESOLVED`, are left unresolved, so that their placeholders are kept.
+
+    Variables can also be set like items of a dict.
+    """
+
+    def __init__(self, resolvers: Mapping[str, ReplyVariableResolver], owner: Any) -> None:
+        self.resolvers = resolvers
+        self.owner = owner
+        self.values: dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self.values:
+            value = self.values[name]
+        elif (resolver := self.resolvers.get(name)) is None or resolver.is_async:
+            raise KeyError(name)
+        else:
+            try:
+                value = self.values[name] = resolver.func(self.owner)
+            except Exception:
+                logger.exception(f"Failed to resolve reply variable \"{name}\"")
+                raise KeyError(name)
+
+        if value is UNRESOLVED:
+            raise KeyError(name)
+
+        return value
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        self.values[name] = value
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name, value in self.values.items() if value is not UNRESOLVED)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def update(self, variables: Mapping[str, Any]) -> None:
+        self.values |= variables
+
+    def get_unresolved(self, names: Iterable[str]) -> list[str]:
+        """Get variables with async resolvers which are not resolved yet.
+
+        Args:
+            names: Names of variables referenced by a template.
+
+        Returns:
+            Names of the variables, which can be resolved only by `resolve`.
+        """
+
+        return [
+            name for name in names
+            if name not in self.values and (resolver := self.resolvers.get(name)) is not None and resolver.is_async
+        ]
+
+    async def resolve(self, names: Iterable[str]) -> None:
+        """Resolve variables with async resolvers concurrently.
+
+        Variables failed to be resolved are left unresolved, so that their placeholders are kept. Cancellation of a
+        resolver is propagated.
+
+        Args:
+            names: Names of variables referenced by a template.
+        """
+
+        if not (names := self.get_unresolved(names)):
+            return
+
+        results = await asyncio.gather(
+            *[self.resolvers[name].func(self.owner) for name in names], return_exceptions=True
+        )
+
+        for name, result in zip(names, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            elif isinstance(result, BaseException):
+                logger.warning(f"Failed to resolve reply variable \"{name}\"")
+            else:
+                self.values[name] = result
@@ -1,8 +1,10 @@
 from typing import Any
+from types import MappingProxyType
 import asyncio
 
 __all__ = [
     "deep_update",
+    "freeze",
     "run_command",
     "run_command_wait"
 ]
@@ -21,6 +23,26 @@ def deep_update(base: dict[str, Any], *updates: dict[str, Any]) -> dict[str, Any
     return result
 
 
+def freeze(value: Any) -> Any:
+    """Get a read-only deep copy of a value.
+
+    Dictionaries are converted to read-only mappings and lists to tuples, so that the result can be shared safely.
+
+    Args:
+        value: Value to be frozen.
+
+    Returns:
+        Read-only copy of the value.
+    """
+
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    elif isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+
+    return value
+
+
 async def run_command(command: str) -> asyncio.subprocess.Process:
     return await asyncio.create_subprocess_shell(
         command,
@@ -0,0 +1,69 @@
+"""Benchmark of JSON handling on the hot paths.
+
+Compares the standard library with the codec layer on the webhook (decode and validate a group message), on outbound
+messages (encode segments) and on configuration rows (encode and decode settings). Install orjson to compare it with the
+standard library fallback.
+
+Usage: python -m benchmarks.json_codec
+"""
+
+import json
+import timeit
+
+from app import codec
+from app.models.config import Settings
+from app.models.report.message import GroupMessage
+from app.models.report.segment import Text, At
+from app.managers.ingestion import REPORT_TYPES, REPORT_ADAPTER
+from tests import build_group_message
+
+
+def run(name: str, legacy, current, number: int = 20000) -> None:
+    legacy_time = timeit.timeit(legacy, number=number) / number * 1e6
+    current_time = timeit.timeit(current, number=number) / number * 1e6
+    print(f"{name:<28} {legacy_time:>12.2f} {current_time:>12.2f} {legacy_time / current_time:>8.2f}x")
+
+
+def main() -> None:
+    print(f"JSON backend: {codec.BACKEND}")
+    print(f"{'case':<28} {'legacy (us)':>12} {'codec (us)':>12} {'speedup':>9}")
+
+    body = json.dumps(build_group_message(".r10d100k2 Some reason " + "x" * 200).model_dump()).encode()
+
+    def legacy_webhook():
+        content = json.loads(body)
+        return GroupMessage.model_validate(content)
+
+    def current_webhook():
+        content = codec.loads(body)
+        REPORT_TYPES[(content["post_type"], content["message_type"])]
+        return REPORT_ADAPTER.validate_python(content)
+
+    run("webhook (decode + validate)", legacy_webhook, current_webhook)
+    run("webhook (validate_json)", legacy_webhook, lambda: REPORT_ADAPTER.validate_json(body))
+
+    segments = [At(data=At.Data(qq=88888)), Text(data=Text.Data(text="Result: " + "1d100=42 " * 20))]
+    run(
+        "send message (encode)",
+        lambda: json.dumps({"group_id": 12345, "message": [segment.model_dump() for segment in segments]}).encode(),
+        lambda: codec.dumps({"group_id": 12345, "message": segments})
+    )
+
+    settings = Settings().model_dump(safe_dump=False)
+    rows = {key: json.dumps(value) for key, value in settings.items()}
+    run(
+        "config rows (encode)",
+        lambda: [json.dumps(value) for value in settings.values()],
+        lambda: [codec.dumps_str(value) for value in settings.values()],
+        number=5000
+    )
+    run(
+        "config rows (decode)",
+        lambda: [json.loads(value) for value in rows.values()],
+        lambda: [codec.loads(value) for value in rows.values()],
+        number=5000
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Load test of NapCat API calls with and without the adaptive concurrency limiter.
+
+Runs a local stub of NapCat API on loopback, which injects latency growing with the square of the number of calls in
+flight beyond its capacity, like NapCat under load. Many callers keep calling `get_login_info` for a while, and the
+throughput, the latency seen by callers (including the time waiting for the limit), the maximum number of calls in
+flight at the stub and the final limit are reported.
+
+Usage: python -m benchmarks.napcat_concurrency
+"""
+
+import asyncio
+import socket
+import statistics
+import time
+
+from loguru import logger
+import uvicorn
+
+from app import codec
+from app.context import AppContext
+from app.network.napcat import NapCatService
+
+CAPACITY = 8
+BASE_LATENCY = 0.02
+CALLERS = 64
+DURATION = 5
+
+RESPONSE = codec.dumps({
+    "status": "ok",
+    "retcode": 0,
+    "data": {"user_id": 99999, "nickname": "Shinji"},
+    "message": "",
+    "wording": ""
+})
+
+
+class Stub:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(BASE_LATENCY * max(1.0, self.in_flight / CAPACITY) ** 2)
+        finally:
+            self.in_flight -= 1
+
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": RESPONSE})
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(name: str, port: int, stub: Stub, enabled: bool) -> None:
+    context = AppContext()
+    context.settings.update_napcat({
+        "api": {"port": port},
+        "concurrency": {"enabled": enabled, "latency_threshold": BASE_LATENCY * 2.5}
+    })
+    context.settings.update_application({"circuit_breaker": {"enabled": False}})
+    service = NapCatService(context)
+    stub.max_in_flight = 0
+    latencies = []
+    deadline = time.perf_counter() + DURATION
+
+    async def call() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await service.get_login_info()
+            latencies.append((time.perf_counter() - start) * 1e3)
+
+    await asyncio.gather(*[call() for _ in range(CALLERS)])
+    await context.http_client.aclose()
+
+    latencies.sort()
+    print(
+        f"{name:<10} {len(latencies) / DURATION:>10.1f} {statistics.median(latencies):>10.1f} "
+        f"{latencies[int(len(latencies) * 0.99)]:>10.1f} {stub.max_in_flight:>10} "
+        f"{(str(int(service.limiter.limit)) if enabled else '-'):>8}"
+    )
+
+
+async def main() -> None:
+    logger.remove()
+    stub = Stub()
+    port = get_free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        stub, host="127.0.0.1", port=port, lifespan="off", log_config=None, access_log=False, backlog=1024
+    ))
+    serving = asyncio.create_task(server.serve())
+
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    print(f"Stub capacity: {CAPACITY} calls, base latency: {BASE_LATENCY * 1e3:.0f} ms, callers: {CALLERS}")
+    print(f"{'limiter':<10} {'calls/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'in flight':>10} {'limit':>8}")
+    await run("off", port, stub, False)
+    await run("adaptive", port, stub, True)
+
+    server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
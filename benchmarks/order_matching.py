@@ -0,0 +1,84 @@
+"""Benchmark of order matching.
+
+Compares `DispatchManager.match_plugin` with matching the order patterns one by one, which is how orders were matched
+before the prefix index was introduced.
+
+Usage: python -m benchmarks.order_matching
+"""
+
+import re
+import timeit
+
+from app.context import AppContext
+from app.managers.dispatch import DispatchManager
+from plugin import OrderPlugin
+import plugin.dicerobot  # noqa: F401
+
+MESSAGES = [
+    "r",
+    "rd100 Reason",
+    "rh3d6",
+    "rb2",
+    "ra60 Reason",
+    "rule coc7",
+    "chat What is the meaning of life?",
+    "60s",
+    "unknown order",
+]
+
+
+def build_manager(extra_orders: int) -> DispatchManager:
+    manager = DispatchManager(AppContext())
+    manager.order_plugins = {plugin.name: plugin for plugin in OrderPlugin.__subclasses__() if hasattr(plugin, "name")}
+
+    for i in range(extra_orders):
+        manager.order_plugins[f"benchmark.{i}"] = type(f"Plugin{i}", (OrderPlugin,), {
+            "name": f"benchmark.{i}",
+            "orders": [f"order{i}", f"指令{i}"],
+            "priority": i % 3 * 50,
+            "__call__": lambda self: None
+        })
+
+    manager.load_orders_and_events()
+
+    return manager
+
+
+def build_linear_matcher(manager: DispatchManager):
+    patterns = [
+        (re.compile(fr"^({order_and_name['order']})\s*([\S\s]*)$", re.I), order_and_name["name"])
+        for orders in manager.orders.values()
+        for order_and_name in orders
+    ]
+
+    def match_plugin(order_and_content: str) -> tuple[str | None, str | None, str | None]:
+        for pattern, name in patterns:
+            if match := pattern.fullmatch(order_and_content):
+                return name, match.group(1), match.group(2)
+
+        return None, None, None
+
+    return match_plugin
+
+
+def main() -> None:
+    print(f"{'orders':>8} {'linear (us)':>12} {'index (us)':>12} {'speedup':>8}")
+
+    for extra_orders in [0, 50, 200, 1000]:
+        manager = build_manager(extra_orders)
+        linear_match_plugin = build_linear_matcher(manager)
+
+        for message in MESSAGES:
+            assert manager.match_plugin(message) == linear_match_plugin(message), message
+
+        number = 2000
+        linear = timeit.timeit(lambda: [linear_match_plugin(message) for message in MESSAGES], number=number)
+        index = timeit.timeit(lambda: [manager.match_plugin(message) for message in MESSAGES], number=number)
+        per_message = number * len(MESSAGES) / 1e6
+        orders = sum(len(orders) for orders in manager.orders.values())
+
+        print(f"{orders:>8} {linear / per_message:>12.2f} {index / per_message:>12.2f} {linear / index:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
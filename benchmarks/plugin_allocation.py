@@ -0,0 +1,80 @@
+"""Benchmark of allocations made for each message reaching a plugin.
+
+For each message, a plugin is instantiated with its settings and replies, and the `enabled` item of its settings is
+checked, which is what `DispatchManager` does before executing the plugin. Read-only snapshots are compared with deep
+copies of settings and replies, which is how they were handed out before. Deep copies are counted by wrapping
+`copy.deepcopy`, and the time is measured with `tracemalloc` tracing every allocation, so that it reflects the number
+of allocations.
+
+Usage: python -m benchmarks.plugin_allocation
+"""
+
+from collections.abc import Callable
+from copy import deepcopy
+import time
+import tracemalloc
+
+from loguru import logger
+
+from app.context import AppContext
+from app.models import config
+from plugin.dicerobot.dice import Dice
+from tests import build_group_message
+
+MESSAGES = 10000
+
+
+def handle_with_snapshots(context: AppContext, message) -> None:
+    plugin = Dice(context, message, "r", "d100", 1)
+    assert context.plugin_settings.get(plugin=plugin.name)["enabled"]
+
+
+def handle_with_copies(context: AppContext, message) -> None:
+    # Settings were deep-copied by the plugin and by the dispatcher, and replies by the plugin
+    plugin = Dice(context, message, "r", "d100", 1)
+    plugin.plugin_settings = context.plugin_settings.copy(plugin=plugin.name)
+    plugin.replies = context.replies.copy_replies(group=plugin.name)
+    assert context.plugin_settings.copy(plugin=plugin.name)["enabled"]
+
+
+def run(name: str, context: AppContext, handle: Callable) -> None:
+    message = build_group_message(".r d100")
+    copies = 0
+
+    def counting_deepcopy(*args, **kwargs):
+        nonlocal copies
+        copies += 1
+        return deepcopy(*args, **kwargs)
+
+    config.deepcopy = counting_deepcopy
+
+    for _ in range(100):
+        handle(context, message)
+
+    copies = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    for _ in range(MESSAGES):
+        handle(context, message)
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    config.deepcopy = deepcopy
+
+    print(f"{name:<12} {copies / MESSAGES:>14.1f} {elapsed / MESSAGES * 1e6:>12.2f} {peak / 1024:>12.1f}")
+
+
+def main() -> None:
+    logger.remove()
+    context = AppContext()
+    Dice.load(context)
+
+    print(f"{'mode':<12} {'copies/message':>14} {'us/message':>12} {'peak (KiB)':>12}")
+    run("deepcopy", context, handle_with_copies)
+    run("snapshot", context, handle_with_snapshots)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark of instantiating an order plugin for each message.
+
+Plugins are instantiated with the cached chat context, which is compared with how chat settings were looked up before,
+that is, settings of the plugin and of DiceRobot were looked up separately for every instance. Messages are spread over
+a number of group chats, so that both the lookup and the LRU cache of chat contexts are exercised. The best of several
+rounds is reported.
+
+Usage: python -m benchmarks.plugin_instantiation
+"""
+
+from copy import deepcopy
+import time
+
+from loguru import logger
+
+from app.context import AppContext
+from plugin.dicerobot.dice import Dice
+from tests import build_group_message
+
+MESSAGES = 100000
+CHATS = 100
+ROUNDS = 5
+
+
+class LookupDice(Dice):
+    def _load_chat(self) -> None:
+        self.chat_type, self.chat_id = self.message.chat
+        # Previous lookups of ChatSettings.get
+        groups = self.context.chat_settings._settings[self.chat_type].setdefault(self.chat_id, {})
+        self.chat_settings = groups.setdefault(self.name, {})
+        groups = self.context.chat_settings._settings[self.chat_type].setdefault(self.chat_id, {})
+        self.dicerobot_chat_settings = groups.setdefault("dicerobot", {})
+
+        if not self.chat_settings:
+            self.chat_settings.update(deepcopy(self.default_chat_settings))
+
+
+def run(name: str, context: AppContext, plugin_class: type[Dice]) -> None:
+    messages = []
+
+    for i in range(CHATS):
+        message = build_group_message(".r d100")
+        message.group_id += i
+        messages.append(message)
+
+    for message in messages:
+        plugin_class(context, message, "r", "d100", 1)
+
+    elapsed = float("inf")
+
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+
+        for i in range(MESSAGES):
+            plugin_class(context, messages[i % CHATS], "r", "d100", 1)
+
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    print(f"{name:<12} {elapsed / MESSAGES * 1e6:>12.2f}")
+
+
+def main() -> None:
+    logger.remove()
+    context = AppContext()
+    Dice.load(context)
+
+    print(f"{'mode':<12} {'us/message':>12}")
+    run("lookup", context, LookupDice)
+    run("context", context, Dice)
+
+
+if __name__ == "__main__":
+    main()
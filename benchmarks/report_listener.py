@@ -0,0 +1,130 @@
+"""Benchmark of report latency across listeners.
+
+Posts signed reports to the webhook router served over TLS on loopback (the default), plain HTTP on loopback and a Unix
+domain socket, and measures the latency of each report, both with a new connection per report and with a kept-alive
+connection. A heartbeat is posted, so that the latency is dominated by the transport rather than by handling. The TLS
+certificate is generated by the openssl command, and the TLS case is skipped if it is not available.
+
+Usage: python -m benchmarks.report_listener
+"""
+
+from collections.abc import Callable
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+
+from loguru import logger
+from httpx import AsyncClient, AsyncHTTPTransport
+import uvicorn
+
+from app import codec
+from app.auth import Auth
+from app.context import AppContext
+from app.enum import ListenerMode
+from app.managers.ingestion import IngestionManager
+from app.network.listener import ReportListener
+
+
+def generate_certificate(directory: str) -> tuple[str, str] | None:
+    if shutil.which("openssl") is None:
+        return None
+
+    key, certificate = os.path.join(directory, "server.key"), os.path.join(directory, "server.crt")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes",
+        "-keyout", key, "-out", certificate, "-days", "1", "-subj", "/CN=127.0.0.1"
+    ], check=True, capture_output=True)
+    return key, certificate
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def measure(client: AsyncClient, body: bytes, headers: dict, number: int) -> list[float]:
+    latencies = []
+
+    for _ in range(number):
+        start = time.perf_counter()
+        response = await client.post("/report", content=body, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1e3)
+        assert response.status_code == 204
+
+    return latencies
+
+
+async def run(name: str, create_client: Callable[[], AsyncClient], body: bytes, headers: dict) -> None:
+    async with create_client() as client:
+        # Warm up, then measure a kept-alive connection and a new connection per report
+        await measure(client, body, headers, 100)
+        results = {
+            "keep-alive": await measure(client, body, headers, 2000),
+            "new connection": await measure(client, body, headers | {"Connection": "close"}, 500)
+        }
+
+    for mode, latencies in results.items():
+        latencies.sort()
+        print(
+            f"{name:<16} {mode:<16} {statistics.median(latencies):>10.3f} "
+            f"{latencies[int(len(latencies) * 0.99)]:>10.3f}"
+        )
+
+
+async def main() -> None:
+    logger.remove()
+    context = AppContext()
+    context.ingestion_manager = IngestionManager(context)
+    listener = ReportListener(context)
+    body = codec.dumps({"time": int(time.time()), "self_id": 99999, "post_type": "meta_event", "meta_event_type": "heartbeat"})
+    headers = {"X-Signature": f"sha1={Auth(context).calculate_signature('sha1', body)}"}
+
+    print(f"{'listener':<16} {'connection':<16} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if certificate := generate_certificate(directory):
+            port = get_free_port()
+            server = uvicorn.Server(uvicorn.Config(
+                listener.create_app(), host="127.0.0.1", port=port, lifespan="off", log_config=None,
+                access_log=False, ssl_keyfile=certificate[0], ssl_certfile=certificate[1]
+            ))
+            serving = asyncio.create_task(server.serve())
+
+            while not server.started:
+                await asyncio.sleep(0.01)
+
+            await run("https (default)", lambda: AsyncClient(base_url=f"https://127.0.0.1:{port}", verify=False), body, headers)
+            server.should_exit = True
+            await serving
+        else:
+            print("https (default)  skipped, openssl not found")
+
+        port = get_free_port()
+        context.settings.update_napcat({"report": {"listener": ListenerMode.HTTP.value, "port": port}})
+        await listener.start()
+        await run("http", lambda: AsyncClient(base_url=f"http://127.0.0.1:{port}"), body, headers)
+        await listener.stop()
+
+        path = os.path.join(directory, "report.sock")
+        # The forwarder is not used, reports are posted to the socket directly
+        context.settings.update_napcat({"report": {
+            "listener": ListenerMode.UNIX.value, "socket": path, "forwarder": "http://127.0.0.1/report"
+        }})
+        await listener.start()
+        await run(
+            "unix",
+            lambda: AsyncClient(transport=AsyncHTTPTransport(uds=path), base_url="http://localhost"),
+            body,
+            headers
+        )
+        await listener.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
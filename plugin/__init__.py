@@ -1,25 +1,55 @@
 from typing import TYPE_CHECKING, Type, Any
+from collections.abc import Callable
 from abc import ABC, abstractmethod
 from copy import deepcopy
-import re
+
+from loguru import logger
 
 from app.exceptions import OrderInvalidError, OrderRepetitionExceededError
-from app.enum import ChatType
+from app.enum import ChatType, MessagePriority
 from app.utils import deep_update
-from app.models.report.message import Message
+from app.template import UNRESOLVED, ReplyVariableResolver, ReplyVariables, compile_template
+from app.network import HttpClient
+from app.models.report.message import Message, GroupMessage
 from app.models.report.notice import Notice
 from app.models.report.request import Request
 from app.models.report.segment import Segment, Text
 
 if TYPE_CHECKING:
     from app.context import AppContext
+    from app.managers.member import Member
 
 __all__ = [
     "DiceRobotPlugin",
     "OrderPlugin",
-    "EventPlugin"
+    "EventPlugin",
+    "REPLY_VARIABLE_RESOLVERS",
+    "register_reply_variable"
 ]
 
+REPLY_VARIABLE_RESOLVERS: dict[str, ReplyVariableResolver] = {}
+
+
+def register_reply_variable(*names: str) -> Callable[[Callable], Callable]:
+    """Register a function or coroutine function as the resolver of reply variables.
+
+    The resolver is called with the order plugin instance, only when a reply references the variable.
+
+    Args:
+        names: Names of reply variables.
+
+    Returns:
+        Decorator.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        for name in names:
+            REPLY_VARIABLE_RESOLVERS[name] = ReplyVariableResolver(func)
+
+        return func
+
+    return decorator
+
 
 class DiceRobotPlugin(ABC):
     """DiceRobot plugin.
@@ -46,11 +76,11 @@ class DiceRobotPlugin(ABC):
     def load(cls, context: "AppContext") -> None:
         """Load plugin settings and replies."""
 
-        loaded_settings = context.plugin_settings.get(plugin=cls.name)
+        loaded_settings = context.plugin_settings.copy(plugin=cls.name)
         loaded_settings.setdefault("enabled", True)  # Ensure the plugin is enabled by default
 
         for key in loaded_settings.copy().keys():
-            if key == "enabled":
+            if key in ("enabled", "rate_limit", "timeout"):
                 continue
             elif key not in cls.default_plugin_settings:
                 # Remove settings that are not in the default settings
@@ -60,7 +90,7 @@ class DiceRobotPlugin(ABC):
             deepcopy(cls.default_plugin_settings), loaded_settings
         ))
 
-        loaded_replies = context.replies.get_replies(group=cls.name)
+        loaded_replies = context.replies.copy_replies(group=cls.name)
 
         for key in loaded_replies.copy().keys():
             if key not in cls.default_replies:
@@ -70,6 +100,8 @@ class DiceRobotPlugin(ABC):
         context.replies.set_replies(group=cls.name, replies=deep_update(
             deepcopy(cls.default_replies), loaded_replies
         ))
+        # Compile replies in advance, so that they are not parsed when formatted
+        context.replies.get_templates(group=cls.name)
 
     @classmethod
     async def initialize(cls, context: "AppContext") -> None:
@@ -89,8 +121,10 @@ class DiceRobotPlugin(ABC):
         """
 
         self.context = context
+        # Read-only snapshots shared by all instances, which are not copied for each message
         self.plugin_settings = context.plugin_settings.get(plugin=self.name)
         self.replies = context.replies.get_replies(group=self.name)
+        self.reply_templates = context.replies.get_templates(group=self.name)
 
     @abstractmethod
     async def __call__(self) -> None:
@@ -102,13 +136,56 @@ class DiceRobotPlugin(ABC):
 
         ...
 
-    def save_plugin_settings(self) -> None:
+    def save_plugin_settings(self, settings: dict | None = None) -> None:
         """Save plugin settings.
 
-        Plugin settings must be saved explicitly to avoid inappropriate modification.
+        Plugin settings are read-only, so changed settings must be saved explicitly to avoid inappropriate
+        modification. Settings not given are kept unchanged.
+
+        Calling without settings is deprecated. In that case, `self.plugin_settings` is saved if the plugin has replaced
+        it with a mutable copy (see `PluginSettings.copy`) and edited the copy.
+
+        Args:
+            settings: Changed settings.
+        """
+
+        if settings is None:
+            logger.warning(
+                f"Plugin \"{self.name}\" saved plugin settings without settings, which is deprecated. "
+                "Pass changed settings to save_plugin_settings instead"
+            )
+
+            if not isinstance(self.plugin_settings, dict):
+                # Read-only snapshot cannot be changed
+                return
+
+            settings = self.plugin_settings
+
+        self.context.plugin_settings.set(plugin=self.name, settings=settings)
+        self.plugin_settings = self.context.plugin_settings.get(plugin=self.name)
+
+    @property
+    def http_timeout(self) -> float:
+        """Timeout (in seconds) of HTTP requests of the plugin.
+
+        It is set by the `timeout` item of plugin settings, or the default timeout of pooled HTTP clients.
+        """
+
+        return self.plugin_settings.get("timeout", self.context.settings.app.http_pool.timeout)
+
+    def get_http_client(self, url: str) -> HttpClient:
+        """Get the pooled HTTP client for the host of the URL.
+
+        The client is shared and must not be closed by the plugin. Requests should be sent with `http_timeout`.
+
+        Args:
+            url: URL to be requested.
+
+        Returns:
+            Long-lived HTTP client.
         """
 
-        self.context.plugin_settings.set(plugin=self.name, settings=self.plugin_settings)
+        return self.context.http_pool.get(url)
 
 
 class OrderPlugin(DiceRobotPlugin):
@@ -156,10 +233,10 @@ class OrderPlugin(DiceRobotPlugin):
         self.order = order
         self.order_content = order_content
         self.repetition = repetition
-        self.reply_variables = {}
+        # Common reply variables are resolved only when referenced by a reply
+        self.reply_variables = ReplyVariables(REPLY_VARIABLE_RESOLVERS, self)
 
         self._load_chat()
-        self._init_reply_variables()
 
     @abstractmethod
     async def __call__(self) -> None:
@@ -168,45 +245,48 @@ class OrderPlugin(DiceRobotPlugin):
     def _load_chat(self) -> None:
         """Load chat information and settings."""
 
-        if self.message.from_group:
-            self.chat_type = ChatType.GROUP
-            self.chat_id = self.message.group_id
-        elif self.message.from_friend:
-            self.chat_type = ChatType.FRIEND
-            self.chat_id = self.message.user_id
-        elif self.message.from_group_temp:
-            self.chat_type = ChatType.TEMP
-            self.chat_id = self.message.user_id
-        else:
-            raise ValueError
-
-        # Settings used by the plugin in this chat
-        self.chat_settings = \
-            self.context.chat_settings.get(chat_type=self.chat_type, chat_id=self.chat_id, settings_group=self.name)
-        # Settings used by DiceRobot in this chat (bot nickname etc.)
-        self.dicerobot_chat_settings = \
-            self.context.chat_settings.get(chat_type=self.chat_type, chat_id=self.chat_id, settings_group="dicerobot")
-
-        if not self.chat_settings:
-            # Use default chat settings in a new chat
-            self.chat_settings.update(deepcopy(self.default_chat_settings))
-
-    def _init_reply_variables(self) -> None:
-        """Initialize common used reply variables."""
-
-        bot_id = self.context.status.bot.id
-        bot_nickname = self.dicerobot_chat_settings.setdefault("nickname", "")
-
-        self.reply_variables = {
-            "机器人QQ": bot_id,
-            "机器人QQ号": bot_id,
-            "机器人": bot_nickname if bot_nickname else self.context.status.bot.nickname,
-            "机器人昵称": bot_nickname if bot_nickname else self.context.status.bot.nickname,
-            "发送者QQ": self.message.user_id,
-            "发送者QQ号": self.message.user_id,
-            "发送者": self.message.sender.nickname,
-            "发送者昵称": self.message.sender.nickname
-        }
+        self.chat_type, self.chat_id = self.message.chat
+        chat = self.context.chat_settings.get_context(chat_type=self.chat_type, chat_id=self.chat_id)
+
+        # Read-only settings used by the plugin in this chat, default chat settings are used for items not set
+        self.chat_settings = chat.get_settings(self.name, self.default_chat_settings)
+        # Read-only settings used by DiceRobot in this chat (bot nickname etc.)
+        self.dicerobot_chat_settings = chat.dicerobot
+
+    def get_member(self, user_id: int | None = None) -> "Member | None":
+        """Get a member of this group from the member directory, without calling any API.
+
+        Args:
+            user_id: User ID. Defaults to the sender.
+
+        Returns:
+            Member, or `None` if this is not a group chat, the member list of the group is not loaded yet, or the user
+            is not a member.
+        """
+
+        if self.chat_type != ChatType.GROUP:
+            return None
+
+        return self.context.member_manager.get(self.chat_id, user_id or self.message.user_id)
+
+    def save_chat_settings(self, settings: dict, settings_group: str | None = None) -> None:
+        """Save settings in this chat.
+
+        Chat settings are read-only like plugin settings, so changed settings must be saved explicitly. Settings not
+        given are kept unchanged.
+
+        Args:
+            settings: Changed settings.
+            settings_group: Settings group, such as "dicerobot". Defaults to the plugin name.
+        """
+
+        self.context.chat_settings.set(
+            chat_type=self.chat_type,
+            chat_id=self.chat_id,
+            settings_group=settings_group or self.name,
+            settings=settings
+        )
+        self._load_chat()
 
     def check_enabled(self) -> bool:
         """Check whether the plugin is enabled in this chat.
@@ -217,7 +297,7 @@ class OrderPlugin(DiceRobotPlugin):
             Whether the plugin is enabled.
         """
 
-        return self.dicerobot_chat_settings.setdefault("enabled", True)
+        return self.dicerobot_chat_settings.get("enabled", True)
 
     def check_order_content(self) -> None:
         """Check whether the order content is valid.
@@ -257,45 +337,83 @@ class OrderPlugin(DiceRobotPlugin):
             d: Dictionary of reply variables.
         """
 
-        self.reply_variables |= d
+        self.reply_variables.update(d)
 
     def format_reply(self, reply: str) -> str:
         """Replace the placeholders (reply variables) in the reply with actual values.
 
+        Replies of the plugin are compiled when the plugin is loaded, other replies are compiled on first use. Variables
+        resolved asynchronously (such as the group name) are not resolved here, use `render_reply` instead.
+
         Args:
             reply: Reply.
         """
 
-        def replacer(match: re.Match) -> str:
-            return str(self.reply_variables.get(match.group(1), match.group(0)))
+        if (template := self.reply_templates.get(reply)) is None:
+            template = compile_template(reply)
 
-        return re.sub(r"\{&(.+?)}", replacer, reply)
+        if unresolved := self.reply_variables.get_unresolved(template.variables):
+            logger.warning(
+                f"Reply variables {', '.join(unresolved)} are left unresolved by format_reply of plugin "
+                f"\"{self.name}\", use render_reply instead"
+            )
 
-    async def send_group_message(self, group_id: int, message: str | list[Message]) -> None:
+        return template.render(self.reply_variables)
+
+    async def render_reply(self, reply: str) -> str:
+        """Replace the placeholders in the reply with actual values, including the ones resolved asynchronously.
+
+        Args:
+            reply: Reply.
+        """
+
+        if (template := self.reply_templates.get(reply)) is None:
+            template = compile_template(reply)
+
+        await self.reply_variables.resolve(template.variables)
+        return template.render(self.reply_variables)
+
+    async def send_group_message(
+        self,
+        group_id: int,
+        message: str | list[Segment],
+        priority: MessagePriority = MessagePriority.NORMAL
+    ) -> None:
         """Send the message to the group.
 
+        Messages are paced by the outbound manager, so this method may wait before the message is sent.
+
         Args:
             group_id: Group ID.
             message: String or segments. String will be converted to a text message.
+            priority: Priority of the message. Replies to orders are sent with high priority.
         """
 
         if isinstance(message, str):
             message = [Text(data=Text.Data(text=message))]
 
-        await self.context.network_manager.napcat.send_group_message(group_id, message)
+        await self.context.outbound_manager.send_group_message(group_id, message, priority)
 
-    async def send_private_message(self, user_id: int, message: str | list[Segment]) -> None:
+    async def send_private_message(
+        self,
+        user_id: int,
+        message: str | list[Segment],
+        priority: MessagePriority = MessagePriority.NORMAL
+    ) -> None:
         """Send the message to the user.
 
+        Messages are paced by the outbound manager, so this method may wait before the message is sent.
+
         Args:
             user_id: User ID.
             message: String or segments. String will be converted to a text message.
+            priority: Priority of the message. Replies to orders are sent with high priority.
         """
 
         if isinstance(message, str):
             message = [Text(data=Text.Data(text=message))]
 
-        await self.context.network_manager.napcat.send_private_message(user_id, message)
+        await self.context.outbound_manager.send_private_message(user_id, message, priority)
 
     async def reply_to_message_sender(self, message: Message, reply: str | list[Segment]) -> None:
         """Send reply to the sender of the specific message.
@@ -306,21 +424,33 @@ class OrderPlugin(DiceRobotPlugin):
         """
 
         if message.from_group:
-            await self.send_group_message(message.group_id, reply)
+            await self.send_group_message(message.group_id, reply, MessagePriority.HIGH)
         elif message.from_friend or message.from_group_temp:
-            await self.send_private_message(message.user_id, reply)
+            await self.send_private_message(message.user_id, reply, MessagePriority.HIGH)
         else:
             raise RuntimeError("Invalid message type or sub type")
 
     async def reply_to_sender(self, reply: str | list[Segment]) -> None:
         """Send reply to the sender.
 
+        If quick reply is enabled, the first reply may be returned in the webhook response instead of being sent by an
+        API request.
+
         Args:
             reply: Reply string or message. Reply string will be formatted and converted to a text message.
         """
 
         if isinstance(reply, str):
-            reply = [Text(data=Text.Data(text=self.format_reply(reply)))]
+            reply = [Text(data=Text.Data(text=await self.render_reply(reply)))]
+
+        if quick_reply := self.context.ingestion_manager.get_quick_reply(self.message):
+            # The first reply can be returned in the webhook response
+            if quick_reply.hold(reply):
+                return
+
+            # Send the held reply first to keep the order of replies
+            if held_reply := quick_reply.close():
+                await self.reply_to_message_sender(self.message, held_reply)
 
         await self.reply_to_message_sender(self.message, reply)
 
@@ -350,3 +480,43 @@ class EventPlugin(DiceRobotPlugin):
     @abstractmethod
     async def __call__(self) -> None:
         ...
+
+
+@register_reply_variable("机器人QQ", "机器人QQ号")
+def _resolve_bot_id(plugin: OrderPlugin) -> int:
+    return plugin.context.status.bot.id
+
+
+@register_reply_variable("机器人", "机器人昵称")
+def _resolve_bot_nickname(plugin: OrderPlugin) -> str:
+    return plugin.dicerobot_chat_settings.get("nickname") or plugin.context.status.bot.nickname
+
+
+@register_reply_variable("发送者QQ", "发送者QQ号")
+def _resolve_sender_id(plugin: OrderPlugin) -> int:
+    return plugin.message.user_id
+
+
+@register_reply_variable("发送者", "发送者昵称")
+def _resolve_sender_nickname(plugin: OrderPlugin) -> str:
+    return plugin.message.sender.nickname
+
+
+@register_reply_variable("昵称")
+def _resolve_sender_name(plugin: OrderPlugin) -> str:
+    # Group card is carried by group messages, so no API call is needed
+    return plugin.message.sender.card or plugin.message.sender.nickname
+
+
+@register_reply_variable("群号")
+def _resolve_group_id(plugin: OrderPlugin) -> Any:
+    return plugin.message.group_id if isinstance(plugin.message, GroupMessage) else UNRESOLVED
+
+
+@register_reply_variable("群名")
+async def _resolve_group_name(plugin: OrderPlugin) -> Any:
+    if not isinstance(plugin.message, GroupMessage):
+        return UNRESOLVED
+
+    # Group information is cached and shared by all requests
+    return (await plugin.context.network_manager.napcat.get_group_info(plugin.message.group_id)).data.group_name
@@ -88,7 +88,7 @@ class Bot(OrderPlugin):
         if self.message.sender.role == Role.MEMBER:
             raise OrderError(self.replies["enable_denied"])
 
-        self.dicerobot_chat_settings["enabled"] = True
+        self.save_chat_settings({"enabled": True}, "dicerobot")
         await self.reply_to_sender(self.replies["enable"])
 
     async def disable(self) -> None:
@@ -102,7 +102,7 @@ class Bot(OrderPlugin):
         if self.message.sender.role == Role.MEMBER:
             raise OrderError(self.replies["disable_denied"])
 
-        self.dicerobot_chat_settings["enabled"] = False
+        self.save_chat_settings({"enabled": False}, "dicerobot")
         await self.reply_to_sender(self.replies["disable"])
 
     async def nickname(self) -> None:
@@ -115,7 +115,7 @@ class Bot(OrderPlugin):
 
         if self.suborder_content:
             # Set nickname
-            self.dicerobot_chat_settings["nickname"] = self.suborder_content
+            self.save_chat_settings({"nickname": self.suborder_content}, "dicerobot")
             await self.context.network_manager.napcat.set_group_card(
                 self.chat_id, self.context.status.bot.id, self.suborder_content
             )
@@ -126,7 +126,7 @@ class Bot(OrderPlugin):
             await self.reply_to_sender(self.replies["nickname_set"])
         else:
             # Unset nickname
-            self.dicerobot_chat_settings["nickname"] = ""
+            self.save_chat_settings({"nickname": ""}, "dicerobot")
             await self.context.network_manager.napcat.set_group_card(
                 self.chat_id, self.context.status.bot.id, ""
             )
@@ -8,7 +8,6 @@ import aiofiles
 from app.exceptions import OrderInvalidError, OrderError
 from app.models import BaseModel
 from app.models.report.segment import Segment, Text, Image, Reply
-from app.network import HttpClient
 from plugin import OrderPlugin
 
 
@@ -86,30 +85,32 @@ class Chat(OrderPlugin):
 
         completion_content = ""
 
-        async with HttpClient() as client:
-            async with client.stream(
-                "POST",
-                self.plugin_settings["base_url"].rstrip("/") + "/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}"
-                },
-                json=request.model_dump(exclude_none=True)
-            ) as response:
-                async for chunk in response.aiter_bytes():
-                    for line in chunk.decode().strip().split("\n\n"):
-                        if not line.startswith("data:"):
-                            continue
-
-                        if (data := line[5:].strip()) == "[DONE]":
-                            break
-
-                        try:
-                            completion_chunk = ChatCompletionChunk.model_validate_json(data)
-                        except ValueError:
-                            raise OrderError(self.replies["response_invalid"])
-
-                        if content := completion_chunk.choices[0].delta.content:
-                            completion_content += content
+        url = self.plugin_settings["base_url"].rstrip("/") + "/chat/completions"
+
+        async with self.get_http_client(url).stream(
+            "POST",
+            url,
+            headers={
+                "Authorization": f"Bearer {api_key}"
+            },
+            json=request.model_dump(exclude_none=True),
+            timeout=self.http_timeout
+        ) as response:
+            async for chunk in response.aiter_bytes():
+                for line in chunk.decode().strip().split("\n\n"):
+                    if not line.startswith("data:"):
+                        continue
+
+                    if (data := line[5:].strip()) == "[DONE]":
+                        break
+
+                    try:
+                        completion_chunk = ChatCompletionChunk.model_validate_json(data)
+                    except ValueError:
+                        raise OrderError(self.replies["response_invalid"])
+
+                    if content := completion_chunk.choices[0].delta.content:
+                        completion_content += content
 
         reply: list[Segment] = [Text(data=Text.Data(text=completion_content))]
 
@@ -3,9 +3,8 @@ import arrow
 
 from app.context import AppContext
 from app.exceptions import OrderInvalidError, OrderError
-from app.enum import ChatType
+from app.enum import ChatType, MessagePriority
 from app.models.report.segment import Image
-from app.network import HttpClient
 from plugin import OrderPlugin
 
 
@@ -39,8 +38,10 @@ class DailySixtySeconds(OrderPlugin):
     async def send_daily_60s(cls, context: AppContext) -> None:
         settings = context.plugin_settings.get(plugin=cls.name)
 
-        async with HttpClient() as client:
-            result = (await client.get(settings["api"])).json()
+        result = (await context.http_pool.get(settings["api"]).get(
+            settings["api"],
+            timeout=settings.get("timeout", context.settings.app.http_pool.timeout)
+        )).json()
 
         if result["datatime"] == arrow.now().format("YYYY-MM-DD"):
             message = [Image(data=Image.Data(file=result["imageUrl"]))]
@@ -48,7 +49,7 @@ class DailySixtySeconds(OrderPlugin):
             message = context.replies.get_reply(group=cls.name, key="api_error")
 
         for chat_id in settings["subscribers"]:
-            await context.network_manager.napcat.send_group_message(chat_id, message)
+            await context.outbound_manager.send_group_message(chat_id, message, MessagePriority.LOW)
 
     async def __call__(self) -> None:
         self.check_order_content()
@@ -57,13 +58,15 @@ class DailySixtySeconds(OrderPlugin):
         if self.chat_type != ChatType.GROUP:
             raise OrderError(self.replies["unsubscribable"])
 
-        if self.chat_id not in self.plugin_settings["subscribers"]:
-            self.plugin_settings["subscribers"].append(self.chat_id)
-            self.save_plugin_settings()
+        subscribers = list(self.plugin_settings["subscribers"])
+
+        if self.chat_id not in subscribers:
+            subscribers.append(self.chat_id)
+            self.save_plugin_settings({"subscribers": subscribers})
             await self.reply_to_sender(self.replies["subscribe"])
         else:
-            self.plugin_settings["subscribers"].remove(self.chat_id)
-            self.save_plugin_settings()
+            subscribers.remove(self.chat_id)
+            self.save_plugin_settings({"subscribers": subscribers})
             await self.reply_to_sender(self.replies["unsubscribe"])
 
     def check_order_content(self) -> None:
@@ -1,7 +1,6 @@
 from app.exceptions import OrderInvalidError, OrderError
 from app.models import BaseModel
 from app.models.report.segment import Image
-from app.network import HttpClient
 from plugin import OrderPlugin
 
 
@@ -45,15 +44,15 @@ class DallE(OrderPlugin):
         except ValueError:
             raise OrderInvalidError
 
-        async with HttpClient() as client:
-            result = (await client.post(
-                "https://" + self.plugin_settings["domain"] + "/v1/images/generations",
-                headers={
-                    "Authorization": f"Bearer {api_key}"
-                },
-                json=request.model_dump(exclude_none=True),
-                timeout=60
-            )).json()
+        url = "https://" + self.plugin_settings["domain"] + "/v1/images/generations"
+        result = (await self.get_http_client(url).post(
+            url,
+            headers={
+                "Authorization": f"Bearer {api_key}"
+            },
+            json=request.model_dump(exclude_none=True),
+            timeout=self.http_timeout
+        )).json()
 
         try:
             response = ImageGenerationResponse.model_validate(result)
@@ -37,17 +37,14 @@ class HiddenDice(OrderPlugin):
                 dice.roll()
                 result += f"\n{dice.full_result}"
 
-        assert isinstance(self.message, GroupMessage)
         self.update_reply_variables({
             "掷骰原因": dice.reason,
-            "掷骰结果": result,
-            "群号": self.message.group_id,
-            "群名": (await self.context.network_manager.napcat.get_group_info(self.message.group_id)).data.group_name
+            "掷骰结果": result
         })
         await self.reply_to_sender(self.replies["reply_with_reason" if dice.reason else "reply"])
         await self.send_private_message(
             self.message.user_id,
-            self.format_reply(self.replies["result_with_reason" if dice.reason else "result"])
+            await self.render_reply(self.replies["result_with_reason" if dice.reason else "result"])
         )
 
     def check_chat_type(self) -> None:
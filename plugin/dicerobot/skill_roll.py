@@ -106,8 +106,7 @@ class SkillRoll(OrderPlugin):
                 raise OrderError(self.replies["rule_not_found"])
 
             rule: RuleSet = self.context.data_manager.get_rule(self.order_content)
-            self.plugin_settings["rule"] = rule.id
-            self.save_plugin_settings()
+            self.save_plugin_settings({"rule": rule.id})
             self.update_reply_variables({
                 "检定规则名称": rule.name
             })
@@ -1,7 +1,6 @@
 from app.exceptions import OrderInvalidError, OrderError
 from app.models import BaseModel
 from app.models.report.segment import Image
-from app.network import HttpClient
 from plugin import OrderPlugin
 
 
@@ -41,13 +40,14 @@ class StableDiffusion(OrderPlugin):
         except ValueError:
             raise OrderInvalidError
 
-        result = (await HttpClient().post(
-            "https://" + self.plugin_settings["domain"] + "/v2beta/stable-image/generate/" + self.plugin_settings["service"],
+        url = "https://" + self.plugin_settings["domain"] + "/v2beta/stable-image/generate/" + self.plugin_settings["service"]
+        result = (await self.get_http_client(url).post(
+            url,
             headers={
                 "Authorization": f"Bearer {api_key}"
             },
             files={key: (None, value) for key, value in request.model_dump(exclude_none=True).items()},
-            timeout=60
+            timeout=self.http_timeout
         )).json()
 
         try:
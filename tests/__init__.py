@@ -1,14 +1,22 @@
+import itertools
+import time
+
 from app.models.report.message import PrivateMessage, GroupMessage
 
+# Messages must have unique IDs, otherwise they are rejected as duplicates
+message_ids = itertools.count(-1234567890)
+
 
 def build_private_message(text: str) -> PrivateMessage:
+    message_id = next(message_ids)
+
     return PrivateMessage.model_validate({
         "self_id": 99999,
         "user_id": 88888,
-        "time": 1700000000,
-        "message_id": -1234567890,
-        "message_seq": -1234567890,
-        "real_id": -1234567890,
+        "time": int(time.time()),
+        "message_id": message_id,
+        "message_seq": message_id,
+        "real_id": message_id,
         "message_type": "private",
         "sender": {
             "user_id": 88888,
@@ -32,13 +40,15 @@ def build_private_message(text: str) -> PrivateMessage:
 
 
 def build_group_message(text: str) -> GroupMessage:
+    message_id = next(message_ids)
+
     return GroupMessage.model_validate({
         "self_id": 99999,
         "user_id": 88888,
-        "time": 1700000000,
-        "message_id": -1234567890,
-        "message_seq": -1234567890,
-        "real_id": -1234567890,
+        "time": int(time.time()),
+        "message_id": message_id,
+        "message_seq": message_id,
+        "real_id": message_id,
         "message_type": "group",
         "sender": {
             "user_id": 88888,
@@ -1,5 +1,5 @@
 from typing import Generator
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 import pathlib
 import sys
 import os
@@ -20,7 +20,12 @@ from app.managers.database import DatabaseManager
 from app.managers.config import ConfigManager
 from app.managers.data import DataManager
 from app.managers.dispatch import DispatchManager
+from app.managers.ingestion import IngestionManager
+from app.managers.rate_limit import RateLimitManager
+from app.managers.member import MemberManager
 from app.managers.task import TaskManager
+from app.managers.outbound import OutboundManager
+from app.managers.outbox import OutboxManager
 from app.actuators.app import AppActuator
 from app.actuators.qq import QQActuator
 from app.actuators.napcat import NapCatActuator
@@ -51,6 +56,7 @@ def prepare_environments(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
     monkeypatch.setattr("app.exception_handlers.DEBUG", debug)
     monkeypatch.setattr("app.context.DEBUG", debug)
     monkeypatch.setattr("app.managers.dispatch.DEBUG", debug)
+    monkeypatch.setattr("app.managers.ingestion.DEBUG", debug)
 
 
 @pytest.fixture(autouse=True)
@@ -105,7 +111,12 @@ async def prepare_context(db_engine: AsyncEngine, tmp_path: pathlib.Path, monkey
     context.config_manager = ConfigManager(context)
     context.data_manager = DataManager(context)
     context.dispatch_manager = DispatchManager(context)
+    context.ingestion_manager = IngestionManager(context)
+    context.rate_limit_manager = RateLimitManager(context)
+    context.member_manager = MemberManager(context)
     context.task_manager = TaskManager(context)
+    context.outbound_manager = OutboundManager(context)
+    context.outbox_manager = OutboxManager(context)
     context.app_actuator = AppActuator(context)
     context.qq_actuator = QQActuator(context)
     context.napcat_actuator = NapCatActuator(context)
@@ -365,6 +376,7 @@ def mock_network_manager(context: AppContext, monkeypatch: pytest.MonkeyPatch) -
     mock_manager.napcat.set_group_leave = AsyncMock(side_effect=_set_group_leave)
     mock_manager.napcat.set_friend_add_request = AsyncMock(side_effect=_set_friend_add_request)
     mock_manager.napcat.set_group_add_request = AsyncMock(side_effect=_set_group_add_request)
+    mock_manager.napcat.invalidate_cache = MagicMock()
     context.network_manager = mock_manager
 
 
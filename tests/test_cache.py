@@ -0,0 +1,74 @@
+from app.cache import TTLCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_get_and_set() -> None:
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("b", 2) == 2
+    assert "a" in cache
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.hit_rate == 1 / 3
+
+
+def test_expiration() -> None:
+    clock = Clock()
+    cache = TTLCache(max_size=10, ttl=60, clock=clock)
+    cache.set("a", 1)
+
+    clock.now = 59.9
+    assert cache.get("a") == 1
+
+    clock.now = 60
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction() -> None:
+    cache = TTLCache(max_size=3, ttl=60)
+
+    for key in "abc":
+        cache.set(key, key)
+
+    # "a" becomes the most recently used, so "b" is evicted
+    cache.get("a")
+    cache.set("d", "d")
+
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert len(cache) == 3
+
+
+def test_expired_evicted_first() -> None:
+    clock = Clock()
+    cache = TTLCache(max_size=2, ttl=60, clock=clock)
+    cache.set("a", 1)
+    clock.now = 30
+    cache.set("b", 2)
+    clock.now = 61
+    cache.set("c", 3)
+
+    assert list(cache._items) == ["b", "c"]
+
+
+def test_add() -> None:
+    clock = Clock()
+    cache = TTLCache(max_size=10, ttl=60, clock=clock)
+
+    assert cache.add("a")
+    assert not cache.add("a")
+
+    clock.now = 60
+    assert cache.add("a")
+    assert cache.hits == 1
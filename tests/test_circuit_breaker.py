@@ -0,0 +1,189 @@
+from unittest.mock import AsyncMock, MagicMock
+import asyncio
+
+import pytest
+from httpx import MockTransport, Request, Response, ConnectError
+
+from app.context import AppContext
+from app.enum import ApplicationStatus, CircuitState
+from app.exceptions import NetworkClientError, NetworkError, NetworkServerError
+from app.network import HttpClient
+from app.tasks import check_bot_status, handle_napcat_circuit
+
+pytestmark = pytest.mark.asyncio
+
+
+async def fail() -> None:
+    raise NetworkServerError
+
+
+async def call(context: AppContext, name: str, func=None) -> None:
+    async with context.circuit_breakers.get(name).guard():
+        if func:
+            await func()
+
+
+async def test_open(context: AppContext) -> None:
+    context.settings.update_application({"circuit_breaker": {"min_calls": 4, "open_duration": 0.05}})
+    breaker = context.circuit_breakers.get("http://example.com:80")
+
+    # Failures below the threshold do not open the circuit
+    await call(context, breaker.name)
+    await call(context, breaker.name)
+
+    with pytest.raises(NetworkServerError):
+        await call(context, breaker.name, fail)
+
+    assert breaker.state == CircuitState.CLOSED
+
+    with pytest.raises(NetworkServerError):
+        await call(context, breaker.name, fail)
+
+    assert breaker.state == CircuitState.OPEN
+
+    # Calls fail fast while the circuit is open, and other upstreams are not affected
+    with pytest.raises(NetworkError) as e:
+        await call(context, breaker.name)
+
+    assert e.value.key == "network_error"
+    await call(context, "http://example.org:80")
+
+    status = context.status.model_dump()["circuit_breakers"][breaker.name]
+    assert status["state"] == CircuitState.OPEN
+    assert status["opened"] == 1
+    assert status["rejected"] == 1
+
+
+async def test_half_open(context: AppContext) -> None:
+    context.settings.update_application({"circuit_breaker": {"min_calls": 1, "open_duration": 0.05}})
+    breaker = context.circuit_breakers.get("napcat")
+
+    with pytest.raises(NetworkServerError):
+        await call(context, breaker.name, fail)
+
+    # Failed probe opens the circuit again
+    await asyncio.sleep(0.06)
+
+    with pytest.raises(NetworkServerError):
+        await call(context, breaker.name, fail)
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.status.opened == 2
+
+    # Only one probe is let through, and the circuit is closed if it succeeds
+    await asyncio.sleep(0.06)
+    probe = asyncio.create_task(call(context, breaker.name, lambda: asyncio.sleep(0.01)))
+    await asyncio.sleep(0)
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    with pytest.raises(NetworkError):
+        await call(context, breaker.name)
+
+    await probe
+    assert breaker.state == CircuitState.CLOSED
+
+    # Client errors do not count as failures
+    with pytest.raises(NetworkClientError):
+        async with breaker.guard():
+            raise NetworkClientError
+
+    assert breaker.state == CircuitState.CLOSED
+
+
+async def test_slow_calls(context: AppContext) -> None:
+    context.settings.update_application({"circuit_breaker": {"min_calls": 2, "slow_duration": 0.01}})
+    breaker = context.circuit_breakers.get("napcat")
+
+    await call(context, breaker.name, lambda: asyncio.sleep(0.02))
+    assert breaker.status.slow_rate == 1
+    await call(context, breaker.name, lambda: asyncio.sleep(0.02))
+    assert breaker.state == CircuitState.OPEN
+
+
+async def test_http_client(context: AppContext) -> None:
+    context.settings.update_application({"circuit_breaker": {"min_calls": 2}})
+    requests = []
+
+    def handle(request: Request) -> Response:
+        requests.append(request)
+        raise ConnectError("Connection refused", request=request)
+
+    client = HttpClient(transport=MockTransport(handle), breaker=context.circuit_breakers.get("http://example.com:80"))
+
+    for _ in range(3):
+        with pytest.raises(NetworkError):
+            await client.get("http://example.com/")
+
+    # Requests are not sent once the circuit is open
+    assert len(requests) == 2
+    await client.aclose()
+
+
+async def test_http_client_slow_calls(context: AppContext) -> None:
+    context.settings.update_application({
+        "circuit_breaker": {"min_calls": 2, "slow_threshold": 0.4, "slow_duration": 0.01}
+    })
+    breaker = context.circuit_breakers.get("http://example.com:80")
+
+    async def handle(_: Request) -> Response:
+        await asyncio.sleep(0.02)
+        return Response(200)
+
+    client = HttpClient(transport=MockTransport(handle), breaker=breaker)
+
+    # Requests to hosts of plugins are slow only when they get close to their own timeouts
+    for _ in range(3):
+        await client.get("http://example.com/", timeout=1)
+
+    assert breaker.state == CircuitState.CLOSED and breaker.status.slow_rate == 0
+
+    # Slow duration can be configured for each upstream
+    context.settings.update_application({"circuit_breaker": {"slow_durations": {breaker.name: 0.01}}})
+
+    for _ in range(2):
+        await client.get("http://example.com/", timeout=1)
+
+    assert breaker.state == CircuitState.OPEN
+    await client.aclose()
+
+
+async def test_application_status(context: AppContext) -> None:
+    context.status.app = ApplicationStatus.RUNNING
+    context.task_manager = MagicMock(
+        scheduler=AsyncMock(), run_task_later=AsyncMock(), bot_status_lock=asyncio.Lock()
+    )
+
+    await handle_napcat_circuit(context, CircuitState.OPEN)
+    assert context.status.app == ApplicationStatus.HOLDING
+    context.task_manager.run_task_later.assert_awaited_once_with("dicerobot.check_bot_status", 30)
+
+    context.task_manager.scheduler.get_schedule.return_value = MagicMock(paused=False)
+    await handle_napcat_circuit(context, CircuitState.CLOSED)
+    assert context.status.app == ApplicationStatus.RUNNING
+
+
+async def test_check_bot_status_once(context: AppContext) -> None:
+    context.status.app = ApplicationStatus.HOLDING
+    context.task_manager = MagicMock(scheduler=AsyncMock(), bot_status_lock=asyncio.Lock())
+    context.task_manager.scheduler.get_schedule.return_value = MagicMock(paused=True)
+    get_login_info = context.network_manager.napcat.get_login_info
+    response = await get_login_info()
+    get_login_info.reset_mock()
+    probing = asyncio.Event()
+
+    async def probe() -> object:
+        probing.set()
+        await asyncio.sleep(0.01)
+        return response
+
+    get_login_info.side_effect = probe
+
+    # The circuit closed by the probe of a running check does not start another check
+    check = asyncio.create_task(check_bot_status(context))
+    await probing.wait()
+    await handle_napcat_circuit(context, CircuitState.CLOSED)
+    await check
+
+    assert context.status.app == ApplicationStatus.RUNNING
+    get_login_info.assert_awaited_once()
+    assert context.task_manager.scheduler.unpause_schedule.await_count == 2
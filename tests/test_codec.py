@@ -0,0 +1,108 @@
+import importlib
+import json
+import sys
+
+import pytest
+from httpx import MockTransport, Request, Response
+
+from app import codec
+from app.context import AppContext
+from app.network import HttpClient
+from app.network.napcat import NapCatService
+from app.models.network.napcat import GetLoginInfoResponse
+from app.models.report.segment import Text, At
+from app.managers.ingestion import REPORT_ADAPTER
+from app.models.report.message import GroupMessage
+from app.models.report.notice import GroupRecallNotice
+from . import build_group_message
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch):
+    if request.param == "json":
+        # Simulate the environment without orjson
+        monkeypatch.setitem(sys.modules, "orjson", None)
+
+    yield importlib.reload(codec)
+
+    monkeypatch.undo()
+    importlib.reload(codec)
+
+
+def test_round_trip(backend) -> None:
+    obj = {"text": "骰子", "number": 1, "list": [1.5, None, True]}
+    data = backend.dumps(obj)
+
+    assert isinstance(data, bytes)
+    assert json.loads(data) == obj
+    assert backend.loads(data) == obj
+    assert backend.loads(data.decode()) == obj
+    assert backend.dumps_str(obj) == data.decode()
+
+
+def test_dumps_model(backend) -> None:
+    data = backend.loads(backend.dumps({"message": [Text(data=Text.Data(text="Hello")), At(data=At.Data(qq=99999))]}))
+    assert data == {
+        "message": [
+            {"type": "text", "data": {"text": "Hello"}},
+            {"type": "at", "data": {"qq": 99999}}
+        ]
+    }
+
+
+def test_loads_invalid(backend) -> None:
+    with pytest.raises(backend.DecodeError):
+        backend.loads(b"{invalid")
+
+
+def test_adapter_cached() -> None:
+    assert codec.get_adapter(GetLoginInfoResponse) is codec.get_adapter(GetLoginInfoResponse)
+
+
+def test_report_adapter() -> None:
+    message = build_group_message(".r")
+    report = REPORT_ADAPTER.validate_python(message.model_dump())
+    assert isinstance(report, GroupMessage)
+    assert report == message
+
+    report = REPORT_ADAPTER.validate_json(codec.dumps({
+        "time": 1700000000,
+        "self_id": 99999,
+        "post_type": "notice",
+        "notice_type": "group_recall",
+        "group_id": 12345,
+        "user_id": 88888,
+        "operator_id": 88888,
+        "message_id": 1
+    }))
+    assert isinstance(report, GroupRecallNotice)
+
+
+@pytest.mark.asyncio
+async def test_napcat_service(context: AppContext) -> None:
+    requests: list[Request] = []
+
+    def handler(request: Request) -> Response:
+        requests.append(request)
+
+        if request.url.path == "/send_group_msg":
+            data = {"message_id": 1}
+        else:
+            data = {"user_id": 99999, "nickname": "Shinji"}
+
+        return Response(200, json={"status": "ok", "retcode": 0, "data": data, "message": "", "wording": ""})
+
+    context.http_client = HttpClient(transport=MockTransport(handler))
+    service = NapCatService(context)
+
+    result = await service.get_login_info()
+    assert result.data.nickname == "Shinji"
+
+    result = await service.send_group_message(12345, [Text(data=Text.Data(text="Hello"))])
+    assert result.data.message_id == 1
+    assert requests[-1].headers["Content-Type"] == "application/json"
+    assert json.loads(requests[-1].content) == {
+        "group_id": 12345,
+        "message": [{"type": "text", "data": {"text": "Hello"}}],
+        "auto_escape": False
+    }
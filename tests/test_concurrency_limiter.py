@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from httpx import MockTransport, Request, Response
+
+from app.context import AppContext
+from app.enum import CircuitState
+from app.exceptions import NetworkServerError, CircuitOpenError
+from app.network import HttpClient
+from app.network.limiter import AdaptiveLimiter
+from app.network.napcat import NapCatService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_limit(context: AppContext) -> None:
+    context.settings.update_napcat({"concurrency": {"initial_limit": 2, "max_limit": 2}})
+    limiter = AdaptiveLimiter(context)
+    in_flight = []
+
+    async def call(i: int) -> int:
+        async with limiter.slot():
+            in_flight.append(limiter.in_flight)
+            await asyncio.sleep(0.01)
+            return i
+
+    # Waiting calls are let through in order
+    assert await asyncio.gather(*[call(i) for i in range(5)]) == list(range(5))
+    assert max(in_flight) == 2
+    assert limiter.in_flight == 0 and not limiter.waiters
+
+
+async def test_increase_and_decrease(context: AppContext) -> None:
+    context.settings.update_napcat({"concurrency": {"initial_limit": 2, "latency_threshold": 0.05}})
+    limiter = AdaptiveLimiter(context)
+
+    async def call(delay: float = 0, error: bool = False) -> None:
+        async with limiter.slot():
+            await asyncio.sleep(delay)
+
+            if error:
+                raise NetworkServerError
+
+    # Fast calls raise the limit only when it is reached
+    await call()
+    assert limiter.limit == 2
+
+    await asyncio.gather(*[call(0.01) for _ in range(8)])
+    assert limiter.limit > 4
+    assert context.status.concurrency.increased >= 2
+    limit = limiter.limit
+
+    # Slow calls and failures made at the same time cut the limit only once
+    await asyncio.gather(call(0.06), call(0.06))
+    assert limiter.limit == limit / 2
+
+    with pytest.raises(NetworkServerError):
+        await call(error=True)
+
+    assert limiter.limit == limit / 4
+    assert context.status.concurrency.decreased == 2
+    assert context.status.concurrency.limit == round(limiter.limit, 3)
+
+
+async def test_cancel(context: AppContext) -> None:
+    context.settings.update_napcat({"concurrency": {"initial_limit": 1, "max_limit": 1}})
+    limiter = AdaptiveLimiter(context)
+
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert context.status.concurrency.waiting == 1
+
+    # Cancelled waiters do not take slots
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    limiter.release(0, False)
+    assert limiter.in_flight == 0 and not limiter.waiters
+
+
+async def test_napcat_service(context: AppContext) -> None:
+    context.settings.update_napcat({"concurrency": {"initial_limit": 4, "latency_threshold": 0.05}})
+    concurrency = {"current": 0, "max": 0}
+
+    async def handler(_: Request) -> Response:
+        # Stub of NapCat, which slows down when more than 4 calls are in flight
+        concurrency["current"] += 1
+        concurrency["max"] = max(concurrency["max"], concurrency["current"])
+        await asyncio.sleep(0.01 * max(1, concurrency["current"] / 4) ** 2)
+        concurrency["current"] -= 1
+
+        return Response(200, json={
+            "status": "ok",
+            "retcode": 0,
+            "data": {"user_id": 99999, "nickname": "Shinji"},
+            "message": "",
+            "wording": ""
+        })
+
+    context.http_client = HttpClient(transport=MockTransport(handler))
+    service = NapCatService(context)
+
+    await asyncio.gather(*[service.get_login_info() for _ in range(200)])
+
+    # The limit settles around the capacity of the stub
+    assert concurrency["max"] < 16
+    assert 1 <= service.limiter.limit < 16
+    assert context.status.concurrency.in_flight == 0
+
+
+async def test_napcat_circuit(context: AppContext) -> None:
+    context.settings.update_napcat({"concurrency": {"initial_limit": 1, "max_limit": 1}})
+    context.settings.update_application({"circuit_breaker": {"min_calls": 2, "slow_duration": 0.05}})
+
+    async def handler(_: Request) -> Response:
+        await asyncio.sleep(0.02)
+
+        return Response(200, json={
+            "status": "ok",
+            "retcode": 0,
+            "data": {"user_id": 99999, "nickname": "Shinji"},
+            "message": "",
+            "wording": ""
+        })
+
+    context.http_client = HttpClient(transport=MockTransport(handler))
+    service = NapCatService(context)
+
+    # Time waiting for a slot does not make calls slow
+    await asyncio.gather(*[service.get_login_info() for _ in range(10)])
+    assert service.breaker.state == CircuitState.CLOSED
+
+    # Calls rejected by the open circuit release their slots without adjusting the limit
+    service.breaker._transition(CircuitState.OPEN)
+
+    with pytest.raises(CircuitOpenError):
+        await service.get_login_info()
+
+    assert service.limiter.in_flight == 0
+    assert context.status.concurrency.decreased == 0
+
+
+async def test_napcat_latency(context: AppContext) -> None:
+    context.settings.update_napcat({"concurrency": {"initial_limit": 1, "max_limit": 1}})
+
+    async def handler(_: Request) -> Response:
+        await asyncio.sleep(0.02)
+
+        return Response(200, json={
+            "status": "ok",
+            "retcode": 0,
+            "data": {"user_id": 99999, "nickname": "Shinji"},
+            "message": "",
+            "wording": ""
+        })
+
+    context.http_client = HttpClient(transport=MockTransport(handler))
+    service = NapCatService(context)
+
+    # Time waiting for a slot of the saturated limit is not counted as latency of the endpoint
+    await asyncio.gather(*[service.get_login_info() for _ in range(5)])
+    assert context.status.endpoints["get_login_info"].calls == 5
+    assert context.status.endpoints["get_login_info"].max_latency < 60
@@ -6,7 +6,8 @@ from sqlalchemy import select, update
 from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import Settings
+from app.database import Settings, ChatSettings, Replies
+from app.enum import ChatType
 from app.context import AppContext
 from app.managers.config import ConfigManager
 
@@ -46,25 +47,69 @@ async def test_save_settings(db_session: AsyncSession, context: AppContext) -> N
         }
     })
 
-    context.config_manager.dirty = True
-    await context.config_manager.save_config()
+    assert await context.config_manager.save_config() > 0
 
     result = (await db_session.execute(select(Settings).where(Settings.group == "security"))).scalar_one_or_none()
     assert result is not None
 
     settings = json.loads(result.json)
     assert settings["jwt"]["secret"] == new_secret
-    assert context.config_manager.dirty is False
+    assert context.config_manager.pending == {}
+
 
+async def test_save_config_no_changes(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    await context.config_manager.save_config()
 
-async def test_save_config_no_dirty(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
     mock = AsyncMock()
-    monkeypatch.setattr(ConfigManager, "_save_settings", mock)
-    monkeypatch.setattr(ConfigManager, "_save_plugin_settings", mock)
-    monkeypatch.setattr(ConfigManager, "_save_chat_settings", mock)
-    monkeypatch.setattr(ConfigManager, "_save_replies", mock)
+    monkeypatch.setattr(ConfigManager, "_upsert", mock)
 
-    context.config_manager.dirty = False
-    await context.config_manager.save_config()
-    mock.assert_not_called()
+    assert await context.config_manager.save_config() == 0
     mock.assert_not_awaited()
+
+    # Settings set to the same values are not written
+    context.settings.update_qq({})
+    context.plugin_settings.set(plugin="dicerobot.test", settings={})
+    assert await context.config_manager.save_config() == 1
+    mock.assert_awaited_once()
+
+
+async def test_save_changed_rows(db_session: AsyncSession, context: AppContext) -> None:
+    for chat_id in range(10):
+        context.chat_settings.set(chat_type=ChatType.GROUP, chat_id=chat_id, settings_group="dicerobot", settings={
+            "enabled": True
+        })
+
+    context.replies.set_replies(group="dicerobot.test", replies={"a": "A", "b": "B"})
+    await context.config_manager.save_config()
+
+    # Only changed rows are saved, and rows read or set to the same values are skipped
+    context.chat_settings.set(chat_type=ChatType.GROUP, chat_id=1, settings_group="dicerobot", settings={
+        "enabled": False
+    })
+    context.chat_settings.set(chat_type=ChatType.GROUP, chat_id=2, settings_group="dicerobot", settings={
+        "enabled": True
+    })
+    context.chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=3)
+    context.replies.set_replies(group="dicerobot.test", replies={"b": "C"})
+    assert await context.config_manager.save_config() == 2
+
+    result = (await db_session.execute(
+        select(ChatSettings).where(ChatSettings.chat_type == ChatType.GROUP, ChatSettings.chat_id.in_([1, 2]))
+    )).scalars().all()
+    assert {item.chat_id: json.loads(item.json) for item in result} == {1: {"enabled": False}, 2: {"enabled": True}}
+
+    result = (await db_session.execute(select(Replies).where(Replies.group == "dicerobot.test"))).scalars().all()
+    assert {item.key: item.value for item in result} == {"a": "A", "b": "C"}
+
+
+async def test_save_config_failed(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    await context.config_manager.save_config()
+    context.plugin_settings.set(plugin="dicerobot.test", settings={"enabled": False})
+    monkeypatch.setattr(ConfigManager, "_upsert", AsyncMock(side_effect=RuntimeError))
+
+    with pytest.raises(RuntimeError):
+        await context.config_manager.save_config()
+
+    # Rows failed to be saved are saved next time
+    monkeypatch.undo()
+    assert await context.config_manager.save_config() == 1
@@ -1,7 +1,11 @@
+import random
+import re
+
 import pytest
 
 from app.context import AppContext
 from plugin import OrderPlugin
+from . import build_group_message
 
 pytestmark = pytest.mark.asyncio
 
@@ -45,3 +49,124 @@ async def test_match_plugin(context: AppContext) -> None:
 
     plugin_name, _, _ = context.dispatch_manager.match_plugin("unknown")
     assert plugin_name is None
+
+
+async def test_match_plugin_pattern(context: AppContext) -> None:
+    class PluginC(FakePlugin):
+        name = "fake.c"
+        orders = [r"r\s*h", "暗骰"]
+        priority = 10
+
+    context.dispatch_manager.order_plugins["fake.c"] = PluginC
+    context.dispatch_manager.load_orders_and_events()
+
+    plugin_name, order, content = context.dispatch_manager.match_plugin("R  h d100")
+    assert plugin_name == "fake.c"
+    assert order == "R  h"
+    assert content == "d100"
+
+    plugin_name, order, _ = context.dispatch_manager.match_plugin("ra50")
+    assert plugin_name == "fake.b"
+    assert order == "ra"
+
+    plugin_name, order, content = context.dispatch_manager.match_plugin("暗骰")
+    assert plugin_name == "fake.c"
+    assert order == "暗骰"
+    assert content == ""
+
+
+async def test_match_plugin_same_as_patterns(context: AppContext) -> None:
+    class PluginC(FakePlugin):
+        name = "fake.c"
+        orders = [r"r\s*h", "rule", "ru"]
+        priority = 100
+
+    context.dispatch_manager.order_plugins["fake.c"] = PluginC
+    context.dispatch_manager.load_orders_and_events()
+
+    patterns = [
+        (re.compile(fr"^({order_and_name['order']})\s*([\S\s]*)$", re.I), order_and_name["name"])
+        for orders in context.dispatch_manager.orders.values()
+        for order_and_name in orders
+    ]
+    random.seed(0)
+
+    for _ in range(2000):
+        text = "".join(random.choices("rRaAhHuUlLe \n", k=random.randint(0, 8)))
+        expected = next(
+            ((name, match.group(1), match.group(2)) for pattern, name in patterns if (match := pattern.fullmatch(text))),
+            (None, None, None)
+        )
+        assert context.dispatch_manager.match_plugin(text) == expected
+
+
+@pytest.mark.parametrize("content, expected", [
+    pytest.param(".r", ("r", 1), id="Simple order"),
+    pytest.param(" 。 rd100 ", ("rd100", 1), id="Full stop and whitespaces"),
+    pytest.param(".r #3", ("r", 3), id="Repetition"),
+    pytest.param(".r#03", ("r#03", 1), id="Invalid repetition"),
+    pytest.param(".r#3#4", ("r#3", 4), id="Last repetition"),
+    pytest.param(".#3", ("#3", 1), id="Repetition only"),
+    pytest.param(".r#3 ", ("r#3", 1), id="Repetition followed by whitespace"),
+    pytest.param(".", None, id="Full stop only"),
+    pytest.param(". \n", None, id="Whitespaces only"),
+    pytest.param("r", None, id="Not an order")
+])
+async def test_tokenize_order(context: AppContext, content: str, expected: tuple[str, int] | None) -> None:
+    assert context.dispatch_manager.tokenize_order(content) == expected
+
+
+async def test_tokenize_order_fuzz(context: AppContext) -> None:
+    order_pattern = re.compile(r"^\s*[.。]\s*([\S\s]+?)\s*(?:#([1-9][0-9]*))?$")
+    random.seed(0)
+
+    for _ in range(20000):
+        content = "".join(random.choices(" \t\n　\x1c.。#019ra", k=random.randint(0, 12)))
+        expected = None
+
+        # Whitespace-only orders are never matched by any plugin, so they are treated as non-orders
+        if (match := order_pattern.fullmatch(content)) and match.group(1).strip():
+            expected = (match.group(1), int(match.group(2)) if match.group(2) else 1)
+
+        assert context.dispatch_manager.tokenize_order(content) == expected, repr(content)
+
+
+async def test_dispatch_order_too_long(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    context.settings.update_application({
+        "order": {
+            "max_length": 10
+        }
+    })
+
+    def tokenize_order(_: str) -> None:
+        raise AssertionError
+
+    monkeypatch.setattr(context.dispatch_manager, "tokenize_order", tokenize_order)
+
+    with pytest.raises(RuntimeError):
+        await context.dispatch_manager.dispatch_order(build_group_message(".r" + " " * 10), ".r" + " " * 10)
+
+
+async def test_dispatch_order_rate_limited(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    context.settings.update_application({
+        "rate_limit": {
+            "user": {
+                "rate": 1,
+                "burst": 2
+            }
+        }
+    })
+    executed = []
+
+    async def execute_plugin(plugin_instance: OrderPlugin) -> None:
+        executed.append(plugin_instance)
+
+    monkeypatch.setattr(context.dispatch_manager, "execute_plugin", execute_plugin)
+
+    await context.dispatch_manager.dispatch_order(build_group_message(".r"), ".r#2")
+
+    with pytest.raises(RuntimeError):
+        await context.dispatch_manager.dispatch_order(build_group_message(".r"), ".r")
+
+    assert len(executed) == 1
+    assert context.status.rate_limit.limited == 1
@@ -0,0 +1,50 @@
+import pytest
+
+from app.context import AppContext
+from app.network.pool import HttpClientPool
+from plugin.dicerobot.dall_e import DallE
+from . import build_group_message
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_clients_by_host(context: AppContext) -> None:
+    pool = HttpClientPool(context)
+
+    client = pool.get("https://api.example.com/v1/images/generations")
+    assert pool.get("https://api.example.com:443/v1/chat/completions") is client
+    assert pool.get("http://api.example.com/v1") is not client
+    assert pool.get("https://cdn.example.com/") is not client
+    assert len(pool.clients) == 3
+
+    await pool.aclose()
+    assert client.is_closed
+    assert pool.clients == {}
+
+    # A new client is created after the pool is closed
+    assert not pool.get("https://api.example.com/").is_closed
+    await pool.aclose()
+
+
+async def test_limits(context: AppContext) -> None:
+    context.settings.update_application({"http_pool": {"max_connections": 3, "timeout": 30, "http2": True}})
+    pool = HttpClientPool(context)
+    client = pool.get("https://api.example.com/")
+
+    assert client._transport._pool._max_connections == 3
+    assert client.timeout.read == 30
+    await pool.aclose()
+
+
+async def test_plugin_api(context: AppContext) -> None:
+    DallE.load(context)
+    plugin = DallE(context, build_group_message(".dalle test"), ".dalle", "test")
+    assert plugin.http_timeout == context.settings.app.http_pool.timeout
+    assert plugin.get_http_client("https://api.openai.com/v1") is context.http_pool.get("https://api.openai.com/v2")
+
+    # Timeout is kept by plugin settings
+    context.plugin_settings.set(plugin=DallE.name, settings={"timeout": 120})
+    DallE.load(context)
+    plugin = DallE(context, build_group_message(".dalle test"), ".dalle", "test")
+    assert plugin.http_timeout == 120
+    await context.http_pool.aclose()
@@ -0,0 +1,258 @@
+from collections.abc import AsyncGenerator
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.context import AppContext
+from app.enum import ApplicationStatus
+from app.models.report.notice import GroupRecallNotice
+from . import build_group_message, build_private_message
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def prepare_ingestion(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[None]:
+    monkeypatch.setattr("app.managers.ingestion.DEBUG", False)
+    context.status.app = ApplicationStatus.RUNNING
+    context.settings.update_application({
+        "ingestion": {
+            "queue_size": 2,
+            "workers": 2
+        }
+    })
+
+    await context.ingestion_manager.initialize()
+    yield
+    await context.ingestion_manager.cleanup()
+
+
+async def test_submit_returns_before_handling(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    release = asyncio.Event()
+    handled = []
+
+    async def dispatch_order(message, _) -> None:
+        await release.wait()
+        handled.append(message)
+
+    monkeypatch.setattr(context.dispatch_manager, "dispatch_order", dispatch_order)
+
+    assert await context.ingestion_manager.submit(build_group_message(".r"))
+    await asyncio.sleep(0)
+    assert handled == []
+
+    release.set()
+    await context.ingestion_manager.join()
+    assert len(handled) == 1
+    assert context.status.ingestion.enqueued == 1
+    assert context.status.ingestion.handled == 1
+    assert context.status.ingestion.depth == 0
+
+
+async def test_submit_drops_when_full(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    release = asyncio.Event()
+
+    async def dispatch_order(*_) -> None:
+        await release.wait()
+
+    monkeypatch.setattr(context.dispatch_manager, "dispatch_order", dispatch_order)
+
+    # A worker takes the first report, and the lane of the chat holds the next two
+    assert await context.ingestion_manager.submit(build_group_message(".r"))
+    await asyncio.sleep(0)
+    assert await context.ingestion_manager.submit(build_group_message(".r"))
+    assert await context.ingestion_manager.submit(build_group_message(".r"))
+    assert not await context.ingestion_manager.submit(build_group_message(".r"))
+    assert context.status.ingestion.dropped == 1
+    assert context.status.ingestion.depth == 2
+
+    release.set()
+    await context.ingestion_manager.join()
+    assert context.status.ingestion.handled == 3
+
+
+async def test_worker_survives_exception(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def dispatch_order(*_) -> None:
+        raise KeyError
+
+    monkeypatch.setattr(context.dispatch_manager, "dispatch_order", dispatch_order)
+
+    await context.ingestion_manager.submit(build_group_message(".r"))
+    await context.ingestion_manager.submit(build_group_message(".r"))
+    await context.ingestion_manager.join()
+    assert context.status.ingestion.handled == 2
+
+
+async def test_lanes(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    context.settings.update_application({
+        "ingestion": {
+            "queue_size": 100
+        }
+    })
+    release = asyncio.Event()
+    handled = []
+
+    async def dispatch_order(message, _) -> None:
+        # The slow chat blocks only its own lane
+        if message.group_id == 12345:
+            await release.wait()
+
+        handled.append((message.group_id, message.message_id))
+
+    monkeypatch.setattr(context.dispatch_manager, "dispatch_order", dispatch_order)
+
+    for group_id in [12345, 54321]:
+        for message_id in range(5):
+            message = build_group_message(".r")
+            message.group_id = group_id
+            message.message_id = message_id
+            await context.ingestion_manager.submit(message)
+
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    assert handled == [(54321, message_id) for message_id in range(5)]
+    assert list(context.ingestion_manager.lanes) == [("group", 12345)]
+
+    release.set()
+    await context.ingestion_manager.join()
+    assert handled[5:] == [(12345, message_id) for message_id in range(5)]
+    assert context.ingestion_manager.lanes == {}
+    assert context.status.ingestion.lanes == 0
+
+
+async def test_stale_report(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    handled = []
+
+    async def dispatch_order(message, _) -> None:
+        handled.append(message)
+
+    monkeypatch.setattr(context.dispatch_manager, "dispatch_order", dispatch_order)
+
+    message = build_group_message(".r")
+    message.time -= context.settings.app.ingestion.deadline + 1
+    assert not await context.ingestion_manager.submit(message)
+    assert context.status.ingestion.stale == 1
+    assert context.status.ingestion.enqueued == 0
+
+
+async def test_stale_in_queue(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    context.settings.update_application({
+        "ingestion": {
+            "deadline": 10
+        }
+    })
+    release = asyncio.Event()
+    handled = []
+
+    async def dispatch_order(message, _) -> None:
+        await release.wait()
+        handled.append(message)
+
+    monkeypatch.setattr(context.dispatch_manager, "dispatch_order", dispatch_order)
+
+    first, second = build_group_message(".r"), build_group_message(".r")
+    assert await context.ingestion_manager.submit(first)
+    assert await context.ingestion_manager.submit(second)
+    await asyncio.sleep(0)
+
+    # The second report becomes stale while waiting behind the first one
+    now = time.time()
+    monkeypatch.setattr("app.managers.ingestion.time.time", lambda: now + 11)
+    release.set()
+    await context.ingestion_manager.join()
+    assert handled == [first]
+    assert context.status.ingestion.stale == 1
+
+
+async def test_shed_low_priority(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    context.settings.update_application({
+        "ingestion": {
+            "queue_size": 4
+        }
+    })
+    release = asyncio.Event()
+
+    async def dispatch(*_) -> None:
+        await release.wait()
+
+    monkeypatch.setattr(context.dispatch_manager, "dispatch_order", dispatch)
+    monkeypatch.setattr(context.dispatch_manager, "dispatch_event", dispatch)
+
+    notice = GroupRecallNotice.model_validate({
+        "time": int(time.time()),
+        "self_id": 99999,
+        "group_id": 12345,
+        "user_id": 88888,
+        "operator_id": 88888,
+        "message_id": 1
+    })
+
+    # Two messages in the lanes make the queue half full
+    for _ in range(3):
+        assert await context.ingestion_manager.submit(build_group_message(".r"))
+
+    await asyncio.sleep(0)
+    assert not await context.ingestion_manager.submit(notice)
+    assert await context.ingestion_manager.submit(build_private_message(".r"))
+    assert context.status.ingestion.shed == 1
+
+    release.set()
+    await context.ingestion_manager.join()
+    assert await context.ingestion_manager.submit(notice)
+
+    # Event loop lag also sheds low-priority reports
+    context.ingestion_manager.loop_lag = context.settings.app.ingestion.max_loop_lag
+    assert not await context.ingestion_manager.submit(notice)
+    assert context.status.ingestion.shed == 2
+    await context.ingestion_manager.join()
+
+
+async def test_loop_lag(context: AppContext) -> None:
+    await asyncio.sleep(0.05)
+    # Block the event loop
+    time.sleep(0.3)
+    await asyncio.sleep(0.01)
+
+    assert context.status.ingestion.loop_lag >= 100
+
+
+async def test_sampled_log(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    context.settings.update_application({
+        "ingestion": {
+            "log_sample": 3
+        }
+    })
+    logged = []
+    monkeypatch.setattr("app.managers.ingestion.logger.warning", logged.append)
+
+    for _ in range(7):
+        message = build_group_message(".r")
+        message.time = 0
+        await context.ingestion_manager.submit(message)
+
+    assert len(logged) == 3
+    assert context.status.ingestion.stale == 7
+
+
+async def test_invalidate_cache_on_notice(context: AppContext) -> None:
+    content = {
+        "time": int(time.time()),
+        "self_id": 99999,
+        "post_type": "notice",
+        "notice_type": "group_card",
+        "group_id": 12345,
+        "user_id": 88888,
+        "card_new": "Asuka",
+        "card_old": ""
+    }
+
+    # Notice without plugins is filtered, but the cache is still invalidated
+    assert context.ingestion_manager.parse_report(content) is None
+    context.network_manager.napcat.invalidate_cache.assert_called_once_with(content)
+
+    context.network_manager.napcat.invalidate_cache.reset_mock()
+    context.ingestion_manager.parse_report(build_group_message(".r").model_dump())
+    context.network_manager.napcat.invalidate_cache.assert_not_called()
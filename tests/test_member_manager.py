@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import pytest
+
+from app.context import AppContext
+from app.enum import Role
+from app.exceptions import NetworkError
+from plugin.dicerobot.dice import Dice
+from . import build_group_message
+
+pytestmark = pytest.mark.asyncio
+
+
+async def load_group(context: AppContext, group_id: int = 12345) -> None:
+    message = build_group_message(".r")
+    message.group_id = group_id
+    context.member_manager.observe(message)
+    await asyncio.gather(*context.member_manager._loading.values())
+
+
+async def test_load(context: AppContext) -> None:
+    manager = context.member_manager
+    assert manager.get(12345, 88888) is None
+
+    await load_group(context)
+    member = manager.get(12345, 88888)
+    assert member.name == "Kaworu"
+    assert member.role == Role.OWNER
+    assert manager.get(12345, 77777) is None
+    assert len(manager.get_members(12345)) == 2
+    assert context.status.member_directory.groups == 1
+    assert context.status.member_directory.members == 2
+    assert context.status.member_directory.loads == 1
+
+    # Loaded only once until expired
+    await load_group(context)
+    assert context.network_manager.napcat.get_group_member_list.await_count == 1
+
+    manager.loaded_at[12345] = time.monotonic() - context.settings.app.member_directory.ttl - 1
+    await load_group(context)
+    assert context.network_manager.napcat.get_group_member_list.await_count == 2
+
+
+async def test_observe_sender(context: AppContext) -> None:
+    await load_group(context)
+
+    message = build_group_message(".r")
+    message.sender.card = "Fifth Child"
+    context.member_manager.observe(message)
+    assert context.member_manager.get(12345, message.user_id).name == "Fifth Child"
+
+
+async def test_apply_notice(context: AppContext) -> None:
+    manager = context.member_manager
+    await load_group(context)
+
+    manager.apply_notice({"notice_type": "group_card", "group_id": 12345, "user_id": 88888, "card_new": "Nagisa"})
+    assert manager.get(12345, 88888).name == "Nagisa"
+
+    manager.apply_notice({"notice_type": "group_admin", "sub_type": "unset", "group_id": 12345, "user_id": 99999})
+    assert manager.get(12345, 99999).role == Role.MEMBER
+
+    manager.apply_notice({"notice_type": "group_decrease", "group_id": 12345, "user_id": 88888})
+    assert manager.get(12345, 88888) is None
+    assert manager.size == 1
+
+    # Nickname of the new member is loaded
+    manager.apply_notice({"notice_type": "group_increase", "group_id": 12345, "user_id": 88888})
+    await asyncio.gather(*manager._tasks)
+    assert manager.get(12345, 88888).nickname == "Kaworu"
+    assert manager.size == 2
+
+    # The bot left the group
+    manager.apply_notice({"notice_type": "group_decrease", "group_id": 12345, "user_id": 99999})
+    assert manager.get_members(12345) is None
+    assert manager.size == 0
+
+    # Groups not loaded are ignored
+    manager.apply_notice({"notice_type": "group_card", "group_id": 54321, "user_id": 88888, "card_new": "Nagisa"})
+    assert manager.get_members(54321) is None
+
+
+async def test_evict(context: AppContext) -> None:
+    manager = context.member_manager
+    context.settings.update_application({"member_directory": {"max_members": 4}})
+
+    await load_group(context, 1)
+    await load_group(context, 2)
+    manager.get(1, 88888)
+
+    # The least recently active group is evicted as a whole
+    await load_group(context, 3)
+    assert list(manager.groups) == [1, 3]
+    assert manager.size == 4
+    assert context.status.member_directory.evicted == 1
+
+
+async def test_notice_applied_by_ingestion(context: AppContext) -> None:
+    await load_group(context)
+
+    context.ingestion_manager.parse_report({
+        "time": int(time.time()),
+        "self_id": 99999,
+        "post_type": "notice",
+        "notice_type": "group_card",
+        "group_id": 12345,
+        "user_id": 88888,
+        "card_new": "Nagisa",
+        "card_old": ""
+    })
+    assert context.member_manager.get(12345, 88888).name == "Nagisa"
+
+
+async def test_load_failed(context: AppContext) -> None:
+    manager = context.member_manager
+    get_group_member_list = context.network_manager.napcat.get_group_member_list
+    get_group_member_list.side_effect = NetworkError()
+
+    # Failed loads are not retried for every message
+    await load_group(context)
+    await load_group(context)
+    assert get_group_member_list.await_count == 1
+    assert manager.get_members(12345) is None
+
+    # Unexpected exceptions are logged, and the load is backed off as well
+    get_group_member_list.side_effect = ValueError()
+    manager.attempted_at[12345] -= context.settings.app.member_directory.retry_interval
+    context.member_manager.observe(build_group_message(".r"))
+    task = manager._loading[12345]
+    await asyncio.gather(task, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert manager._loading == {}
+
+    context.member_manager.observe(build_group_message(".r"))
+    assert get_group_member_list.await_count == 2
+
+
+async def test_plugin_get_member(context: AppContext) -> None:
+    Dice.load(context)
+    plugin = Dice(context, build_group_message(".r"), "r", "", 1)
+    assert plugin.get_member() is None
+
+    await load_group(context)
+    assert plugin.get_member().name == "Kaworu"
+    assert plugin.get_member(99999) is not None
+    assert plugin.get_member(77777) is None
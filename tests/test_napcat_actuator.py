@@ -2,6 +2,7 @@ from unittest.mock import MagicMock, AsyncMock, call
 import os
 
 import pytest
+from pydantic import ValidationError
 
 from app.context import AppContext
 from app.actuators.napcat import NapCatActuator
@@ -70,3 +71,16 @@ async def test_stop(monkeypatch: pytest.MonkeyPatch) -> None:
 
     await NapCatActuator.stop()
     command_mock.assert_called_once_with("systemctl stop napcat")
+
+
+async def test_get_report_url(context: AppContext) -> None:
+    assert context.napcat_actuator.get_report_url() == "https://127.0.0.1:9500/report"
+
+    context.settings.update_napcat({"report": {"listener": "http", "port": 9600}})
+    assert context.napcat_actuator.get_report_url() == "http://127.0.0.1:9600/report"
+
+    # NapCat cannot post to a Unix domain socket, reports are posted to the forwarder instead
+    with pytest.raises(ValidationError):
+        context.settings.update_napcat({"report": {"listener": "unix"}})
+    context.settings.update_napcat({"report": {"listener": "unix", "forwarder": "http://127.0.0.1:9502/report"}})
+    assert context.napcat_actuator.get_report_url() == "http://127.0.0.1:9502/report"
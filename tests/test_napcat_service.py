@@ -0,0 +1,204 @@
+import asyncio
+
+import pytest
+from httpx import MockTransport, Request, Response
+
+from app import codec
+from app.context import AppContext
+from app.exceptions import NetworkServerError
+from app.network import HttpClient
+from app.network.napcat import NapCatService, ENDPOINTS, register_endpoint
+from app.models.network.napcat import SetGroupCardResponse
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def requests(context: AppContext) -> list[Request]:
+    requests = []
+
+    def handler(request: Request) -> Response:
+        requests.append(request)
+
+        if request.url.path == "/get_login_info":
+            return Response(200, json={
+                "status": "ok",
+                "retcode": 0,
+                "data": {"user_id": 99999, "nickname": "Shinji"},
+                "message": "",
+                "wording": ""
+            })
+
+        return Response(200, json={
+            "status": "failed",
+            "retcode": 1200,
+            "data": None,
+            "message": "Group not found",
+            "wording": ""
+        })
+
+    context.http_client = HttpClient(transport=MockTransport(handler))
+    return requests
+
+
+async def test_urls(context: AppContext, requests: list[Request]) -> None:
+    service = NapCatService(context)
+
+    await service.get_login_info()
+    assert str(requests[-1].url) == "http://127.0.0.1:13579/get_login_info"
+    assert set(service.urls) == set(ENDPOINTS)
+    urls = service.urls
+
+    # URLs are reused until NapCat settings change
+    await service.get_login_info()
+    assert service.urls is urls
+
+    context.settings.update_napcat({"api": {"port": 13600}})
+    await service.get_login_info()
+    assert str(requests[-1].url) == "http://127.0.0.1:13600/get_login_info"
+
+
+async def test_single_decode(context: AppContext, requests: list[Request], monkeypatch: pytest.MonkeyPatch) -> None:
+    decoded = []
+    loads = codec.loads
+
+    def _loads(data):
+        decoded.append(data)
+        return loads(data)
+
+    monkeypatch.setattr("app.codec.loads", _loads)
+
+    result = await NapCatService(context).get_login_info()
+    assert result.data.nickname == "Shinji"
+    assert len(decoded) == 1
+
+
+async def test_retcode(context: AppContext, requests: list[Request]) -> None:
+    service = NapCatService(context)
+
+    with pytest.raises(NetworkServerError):
+        await service.set_group_card(12345, 88888, "Asuka")
+
+    assert context.status.endpoints["set_group_card"].calls == 1
+    assert context.status.endpoints["set_group_card"].errors == 1
+
+
+async def test_latency(context: AppContext, requests: list[Request]) -> None:
+    service = NapCatService(context)
+
+    for _ in range(3):
+        await service.get_login_info()
+
+    status = context.status.endpoints["get_login_info"]
+    assert status.calls == 3
+    assert status.errors == 0
+    assert 0 < status.average_latency <= status.max_latency
+    assert "get_login_info" in context.status.model_dump()["endpoints"]
+
+
+async def test_register_endpoint(context: AppContext, requests: list[Request]) -> None:
+    endpoint = register_endpoint("set_group_name", SetGroupCardResponse, post=True)
+
+    try:
+        with pytest.raises(NetworkServerError):
+            await NapCatService(context).request(endpoint, {"group_id": 12345, "group_name": "Nerv"})
+
+        assert requests[-1].method == "POST"
+        assert str(requests[-1].url) == "http://127.0.0.1:13579/set_group_name"
+        assert context.status.endpoints["set_group_name"].calls == 1
+    finally:
+        del ENDPOINTS["set_group_name"]
+
+
+@pytest.fixture
+def info_requests(context: AppContext) -> list[Request]:
+    requests = []
+
+    async def handler(request: Request) -> Response:
+        requests.append(request)
+        await asyncio.sleep(0.01)
+
+        if request.url.path == "/get_group_info":
+            data = {"group_id": 12345, "group_name": "Nerv", "member_count": len(requests), "max_member_count": 200}
+        else:
+            data = {
+                "group_id": 12345, "user_id": int(request.url.params["user_id"]), "nickname": "Kaworu",
+                "card": f"Card {len(requests)}", "sex": "male", "age": 0, "area": "", "level": "0", "qq_level": 0,
+                "join_time": 0, "last_sent_time": 0, "title_expire_time": 0, "unfriendly": False,
+                "card_changeable": True, "is_robot": False, "shut_up_timestamp": 0, "role": "member", "title": ""
+            }
+
+        return Response(200, json={"status": "ok", "retcode": 0, "data": data, "message": "", "wording": ""})
+
+    context.http_client = HttpClient(transport=MockTransport(handler))
+    return requests
+
+
+async def test_info_cache(context: AppContext, info_requests: list[Request]) -> None:
+    service = NapCatService(context)
+
+    result = await service.get_group_info(12345)
+    assert (await service.get_group_info(12345)) is result
+    assert len(info_requests) == 1
+
+    # Cache is bypassed and refreshed
+    result = await service.get_group_info(12345, no_cache=True)
+    assert result.data.member_count == 2
+    assert info_requests[-1].url.params["no_cache"] == "true"
+    assert (await service.get_group_info(12345)) is result
+    assert context.status.info_cache.hits == 2
+    assert context.status.info_cache.size == 1
+
+    # Cache is disabled
+    context.settings.update_napcat({"cache": {"group_ttl": 0}})
+    await service.get_group_info(12345)
+    await service.get_group_info(12345)
+    assert len(info_requests) == 4
+
+
+async def test_single_flight(context: AppContext, info_requests: list[Request]) -> None:
+    service = NapCatService(context)
+
+    results = await asyncio.gather(*[service.get_group_member_info(12345, 88888) for _ in range(5)])
+    assert len(info_requests) == 1
+    assert all(result is results[0] for result in results)
+    assert context.status.info_cache.coalesced == 4
+
+    # Cancelling one caller does not cancel the shared call
+    task = asyncio.create_task(service.get_group_member_info(12345, 66666))
+    waiter = asyncio.create_task(service.get_group_member_info(12345, 66666))
+    await asyncio.sleep(0)
+    task.cancel()
+    assert (await waiter).data.user_id == 66666
+    assert len(info_requests) == 2
+
+
+async def test_invalidate_cache(context: AppContext, info_requests: list[Request]) -> None:
+    service = NapCatService(context)
+    await service.get_group_info(12345)
+    await service.get_group_member_info(12345, 88888)
+
+    service.invalidate_cache({"notice_type": "group_card", "group_id": 12345, "user_id": 88888})
+    assert (await service.get_group_member_info(12345, 88888)).data.card == "Card 3"
+    assert (await service.get_group_info(12345)).data.member_count == 1
+
+    service.invalidate_cache({"notice_type": "group_decrease", "group_id": 12345, "user_id": 88888})
+    assert (await service.get_group_info(12345)).data.member_count == 4
+    assert (await service.get_group_member_info(12345, 88888)).data.card == "Card 5"
+
+    # Other notices do not invalidate anything
+    service.invalidate_cache({"notice_type": "group_recall", "group_id": 12345, "user_id": 88888})
+    await service.get_group_info(12345)
+    assert len(info_requests) == 5
+
+
+async def test_invalidate_in_flight(context: AppContext, info_requests: list[Request]) -> None:
+    service = NapCatService(context)
+
+    # Result of the call started before invalidation is not cached
+    task = asyncio.create_task(service.get_group_info(12345))
+    await asyncio.sleep(0)
+    service.invalidate_cache({"notice_type": "group_increase", "group_id": 12345, "user_id": 77777})
+    await task
+    await service.get_group_info(12345)
+    assert len(info_requests) == 2
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+
+from app.context import AppContext
+from app.enum import ChatType, MessagePriority
+from app.exceptions import NetworkServerError
+from app.models.report.segment import Text
+
+pytestmark = pytest.mark.asyncio
+
+
+def build_message(text: str) -> list[Text]:
+    return [Text(data=Text.Data(text=text))]
+
+
+def get_sent_texts(context: AppContext) -> list[str]:
+    return [call.args[1][0].data.text for call in context.network_manager.napcat.send_group_message.await_args_list]
+
+
+async def test_pacing(context: AppContext) -> None:
+    context.settings.update_application({"outbound": {"interval": 0.05, "burst": 2}})
+    manager = context.outbound_manager
+
+    start = time.monotonic()
+    await asyncio.gather(*[manager.send_group_message(12345, build_message(str(i))) for i in range(4)])
+
+    # Two messages are sent at once, and then one in each interval
+    assert time.monotonic() - start >= 0.09
+    assert get_sent_texts(context) == ["0", "1", "2", "3"]
+    assert context.status.outbound.sent == 4
+    assert context.status.outbound.max_delay >= 90
+    assert context.status.outbound.depth == 0
+    assert manager.queues == {} and manager.senders == {}
+
+    # Chats are paced separately
+    start = time.monotonic()
+    await manager.send_group_message(54321, build_message("other"))
+    await manager.send_private_message(88888, build_message("private"))
+    assert time.monotonic() - start < 0.04
+
+
+async def test_priority(context: AppContext) -> None:
+    context.settings.update_application({"outbound": {"interval": 0.02, "burst": 1}})
+    manager = context.outbound_manager
+
+    tasks = [asyncio.create_task(manager.send_group_message(12345, build_message("first"), MessagePriority.LOW))]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(manager.send_group_message(12345, build_message("broadcast"), MessagePriority.LOW)))
+    tasks.append(asyncio.create_task(manager.send_group_message(12345, build_message("normal"))))
+    tasks.append(asyncio.create_task(manager.send_group_message(12345, build_message("reply"), MessagePriority.HIGH)))
+    await asyncio.sleep(0)
+    assert context.status.outbound.depth == 3
+
+    await asyncio.gather(*tasks)
+    assert get_sent_texts(context) == ["first", "reply", "normal", "broadcast"]
+
+
+async def test_back_off(context: AppContext) -> None:
+    context.settings.update_application({"outbound": {"backoff": 0.05}, "outbox": {"enabled": False}})
+    manager = context.outbound_manager
+    send_group_message = context.network_manager.napcat.send_group_message
+    send_group_message.side_effect = [NetworkServerError(), NetworkServerError(), None]
+
+    with pytest.raises(NetworkServerError):
+        await manager.send_group_message(12345, build_message("0"))
+
+    assert manager.backoffs[(ChatType.GROUP, 12345)][0] == 0.05
+    start = time.monotonic()
+
+    with pytest.raises(NetworkServerError):
+        await manager.send_group_message(12345, build_message("1"))
+
+    # Delay is doubled after consecutive failures
+    assert time.monotonic() - start >= 0.04
+    assert manager.backoffs[(ChatType.GROUP, 12345)][0] == 0.1
+
+    start = time.monotonic()
+    await manager.send_group_message(12345, build_message("2"))
+    assert time.monotonic() - start >= 0.09
+    assert manager.backoffs == {}
+    assert context.status.outbound.failed == 2
+
+
+async def test_cancel(context: AppContext) -> None:
+    context.settings.update_application({"outbound": {"interval": 0.2, "burst": 1}})
+    manager = context.outbound_manager
+
+    await manager.send_group_message(12345, build_message("0"))
+    task = asyncio.create_task(manager.send_group_message(12345, build_message("1")))
+    await asyncio.sleep(0.01)
+
+    # Messages given up by callers are not sent
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    task = asyncio.create_task(manager.send_group_message(12345, build_message("2")))
+    await asyncio.sleep(0.01)
+
+    # Waiting messages are cancelled when the manager is cleaned
+    await manager.cleanup()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert get_sent_texts(context) == ["0"]
+    assert context.status.outbound.depth == 0
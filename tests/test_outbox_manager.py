@@ -0,0 +1,185 @@
+from collections.abc import AsyncGenerator
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update, delete
+
+from app.context import AppContext
+from app.database import Outbox
+from app.enum import ApplicationStatus, ChatType
+from app.exceptions import NetworkError, NetworkServerError
+from app.models.report.segment import Text
+
+pytestmark = pytest.mark.asyncio
+
+
+def build_message(text: str) -> list[Text]:
+    return [Text(data=Text.Data(text=text))]
+
+
+def get_sent_texts(context: AppContext) -> list[str]:
+    return [
+        call.args[1][0].model_dump()["data"]["text"]
+        for call in context.network_manager.napcat.send_group_message.await_args_list
+    ]
+
+
+async def get_rows(context: AppContext) -> list[Outbox]:
+    async with context.database_manager.get_session() as session:
+        return list((await session.execute(select(Outbox).order_by(Outbox.id))).scalars().all())
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def clean_outbox(context: AppContext) -> AsyncGenerator[None]:
+    context.status.app = ApplicationStatus.RUNNING
+    context.settings.update_application({"outbox": {"backoff": 60, "jitter": 0}})
+    yield
+
+    async with context.database_manager.get_session() as session:
+        await session.execute(delete(Outbox))
+
+
+async def test_save(context: AppContext) -> None:
+    send_group_message = context.network_manager.napcat.send_group_message
+    send_group_message.side_effect = NetworkError()
+
+    # Message is saved instead of raising an error
+    assert await context.outbound_manager.send_group_message(12345, build_message("0")) is None
+    await context.outbound_manager.send_group_message(12345, build_message("1"))
+    assert len(context.outbox_manager.pending) == 2
+
+    # Messages are written in one batch
+    await context.outbox_manager.flush()
+    rows = await get_rows(context)
+    assert context.outbox_manager.pending == []
+    assert [(row.chat_type, row.chat_id, row.attempts) for row in rows] == [(ChatType.GROUP, 12345, 0)] * 2
+    assert rows[0].next_attempt_at == pytest.approx(time.time() + 60, abs=1)
+    assert context.status.outbox.saved == 2
+    assert context.status.outbox.size == 2
+
+    # Messages disabled from saving are not saved
+    context.settings.update_application({"outbox": {"enabled": False}})
+
+    with pytest.raises(NetworkError):
+        await context.outbound_manager.send_group_message(12345, build_message("2"))
+
+    assert context.outbox_manager.pending == []
+
+    # Messages rejected by NapCat are not saved
+    context.settings.update_application({"outbox": {"enabled": True}})
+    send_group_message.side_effect = NetworkServerError()
+
+    with pytest.raises(NetworkServerError):
+        await context.outbound_manager.send_group_message(12345, build_message("3"))
+
+    assert context.outbox_manager.pending == []
+
+
+async def test_replay(context: AppContext) -> None:
+    manager = context.outbox_manager
+    manager.add((ChatType.GROUP, 12345), build_message("0"))
+    manager.add((ChatType.GROUP, 12345), build_message("1"))
+
+    # Messages are not sent before they are due
+    await manager.retry()
+    assert get_sent_texts(context) == []
+    assert len(await get_rows(context)) == 2
+
+    # Messages are sent in order once NapCat is available again
+    manager.replay()
+    await manager.retry()
+    assert get_sent_texts(context) == ["0", "1"]
+    assert await get_rows(context) == []
+    assert context.status.outbox.delivered == 2
+    assert context.status.outbox.size == 0
+
+
+async def test_retry(context: AppContext) -> None:
+    manager = context.outbox_manager
+    send_group_message = context.network_manager.napcat.send_group_message
+    send_group_message.side_effect = [NetworkError(), None, None]
+    manager.add((ChatType.GROUP, 12345), build_message("0"))
+    manager.add((ChatType.GROUP, 12345), build_message("1"))
+
+    # The failed message is rescheduled with a longer delay
+    manager.replay()
+    await manager.retry()
+    rows = await get_rows(context)
+    assert [row.attempts for row in rows] == [1, 0]
+    assert rows[0].next_attempt_at == pytest.approx(time.time() + 120, abs=1)
+    assert context.status.outbox.retried == 1
+
+    # Later messages of the same chat wait for the failed one
+    async with context.database_manager.get_session() as session:
+        await session.execute(update(Outbox).where(Outbox.id == rows[1].id).values(next_attempt_at=0))
+
+    await manager.retry()
+    assert get_sent_texts(context) == ["0"]
+
+    async with context.database_manager.get_session() as session:
+        await session.execute(update(Outbox).values(next_attempt_at=0))
+
+    await manager.retry()
+    assert get_sent_texts(context) == ["0", "0", "1"]
+    assert await get_rows(context) == []
+
+
+async def test_expire(context: AppContext) -> None:
+    context.settings.update_application({"outbox": {"ttl": 1}})
+    manager = context.outbox_manager
+    manager.add((ChatType.GROUP, 12345), build_message("0"))
+    manager.pending[0]["created_at"] -= 10
+
+    manager.replay()
+    await manager.retry()
+    assert get_sent_texts(context) == []
+    assert await get_rows(context) == []
+    assert context.status.outbox.expired == 1
+    assert context.status.outbox.size == 0
+
+
+async def test_retry_other_chats(context: AppContext) -> None:
+    manager = context.outbox_manager
+    send_group_message = context.network_manager.napcat.send_group_message
+    send_group_message.side_effect = [NetworkError(), NetworkServerError(), None]
+    manager.add((ChatType.GROUP, 12345), build_message("0"))
+    manager.add((ChatType.GROUP, 54321), build_message("1"))
+    manager.add((ChatType.GROUP, 12345), build_message("2"))
+    manager.add((ChatType.GROUP, 67890), build_message("3"))
+
+    # A failed chat does not block other chats, and messages rejected by NapCat are discarded
+    manager.replay()
+    await manager.retry()
+    assert [call.args[0] for call in send_group_message.await_args_list] == [12345, 54321, 67890]
+    assert [(row.chat_id, row.attempts) for row in await get_rows(context)] == [(12345, 1), (12345, 0)]
+    assert context.status.outbox.delivered == 1
+
+
+async def test_idle_while_holding(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    context.status.app = ApplicationStatus.HOLDING
+    manager = context.outbox_manager
+    manager.size = 1
+    manager.next_attempt_at = 0
+    retries = 0
+
+    async def retry() -> None:
+        nonlocal retries
+        retries += 1
+
+    monkeypatch.setattr(manager, "retry", retry)
+    task = asyncio.create_task(manager._retry_when_due())
+
+    try:
+        # Overdue messages do not make the loop spin while NapCat is unavailable
+        await asyncio.sleep(0.05)
+        assert retries == 0
+
+        context.status.app = ApplicationStatus.RUNNING
+        manager.replay()
+        await asyncio.sleep(0.01)
+        assert retries >= 1
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
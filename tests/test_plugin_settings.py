@@ -0,0 +1,70 @@
+import pytest
+
+from app.context import AppContext
+from plugin.dicerobot.skill_roll import SkillRoll
+from tests import build_group_message
+
+
+def test_snapshot(context: AppContext) -> None:
+    context.plugin_settings.set(plugin="test", settings={"enabled": True, "subscribers": [1], "limit": {"rate": 1}})
+    snapshot = context.plugin_settings.get(plugin="test")
+
+    # Snapshots are shared and read-only
+    assert context.plugin_settings.get(plugin="test") is snapshot
+    assert snapshot["subscribers"] == (1,)
+
+    with pytest.raises(TypeError):
+        snapshot["enabled"] = False  # type: ignore
+
+    with pytest.raises(TypeError):
+        snapshot["limit"]["rate"] = 2  # type: ignore
+
+    # Copies are mutable and do not change the settings until set
+    settings = context.plugin_settings.copy(plugin="test")
+    settings["subscribers"].append(2)
+    assert context.plugin_settings.get(plugin="test")["subscribers"] == (1,)
+
+    context.plugin_settings.set(plugin="test", settings=settings)
+    assert context.plugin_settings.get(plugin="test") is not snapshot
+    assert context.plugin_settings.get(plugin="test")["subscribers"] == (1, 2)
+    assert context.plugin_settings.model_dump()["test"]["subscribers"] == [1, 2]
+
+
+def test_replies_snapshot(context: AppContext) -> None:
+    snapshot = context.replies.get_replies(group="dicerobot")
+    assert context.replies.get_replies(group="dicerobot") is snapshot
+
+    replies = context.replies.copy_replies(group="dicerobot")
+    replies["network_error"] = "Network error"
+    assert snapshot["network_error"] != "Network error"
+
+    context.replies.set_replies(group="dicerobot", replies=replies)
+    assert context.replies.get_replies(group="dicerobot")["network_error"] == "Network error"
+
+
+def test_save_plugin_settings(context: AppContext) -> None:
+    SkillRoll.load(context)
+    plugin = SkillRoll(context, build_group_message(".rule"), "rule", "", 1)
+    snapshot = plugin.plugin_settings
+
+    plugin.save_plugin_settings({"rule": "dnd5e"})
+    assert plugin.plugin_settings["rule"] == "dnd5e"
+    assert context.plugin_settings.get(plugin=SkillRoll.name) is plugin.plugin_settings
+    assert snapshot.get("rule") != "dnd5e"
+
+
+def test_save_plugin_settings_deprecated(context: AppContext) -> None:
+    SkillRoll.load(context)
+    plugin = SkillRoll(context, build_group_message(".rule"), "rule", "", 1)
+    snapshot = plugin.plugin_settings
+
+    # Read-only snapshot is kept unchanged
+    plugin.save_plugin_settings()
+    assert context.plugin_settings.get(plugin=SkillRoll.name) is snapshot
+
+    # Edited mutable copy is saved
+    plugin.plugin_settings = context.plugin_settings.copy(plugin=SkillRoll.name)
+    plugin.plugin_settings["rule"] = "dnd5e"
+    plugin.save_plugin_settings()
+    assert context.plugin_settings.get(plugin=SkillRoll.name)["rule"] == "dnd5e"
+    assert plugin.plugin_settings is context.plugin_settings.get(plugin=SkillRoll.name)
@@ -0,0 +1,121 @@
+import pytest
+
+from app.context import AppContext
+from app.enum import ChatType
+from . import build_group_message, build_private_message
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr("app.managers.rate_limit.time.monotonic", clock)
+
+    for buckets in [
+        context.rate_limit_manager.user_buckets,
+        context.rate_limit_manager.group_buckets,
+        context.rate_limit_manager.plugin_buckets
+    ]:
+        monkeypatch.setattr(buckets, "_clock", clock)
+
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def prepare_settings(context: AppContext) -> None:
+    context.settings.update_application({
+        "rate_limit": {
+            "user": {
+                "rate": 60,
+                "burst": 3
+            },
+            "group": {
+                "rate": 60,
+                "burst": 5
+            }
+        }
+    })
+
+
+def test_user_limit(context: AppContext, clock: Clock) -> None:
+    message = build_private_message(".r")
+
+    assert all(context.rate_limit_manager.acquire(message, "dicerobot.dice") for _ in range(3))
+    assert not context.rate_limit_manager.acquire(message, "dicerobot.dice")
+
+    # One token per second
+    clock.now += 1
+    assert context.rate_limit_manager.acquire(message, "dicerobot.dice")
+    assert not context.rate_limit_manager.acquire(message, "dicerobot.dice")
+    assert context.status.rate_limit.allowed == 4
+    assert context.status.rate_limit.limited == 2
+
+
+def test_cost(context: AppContext, clock: Clock) -> None:
+    message = build_private_message(".r")
+
+    # Cost is capped at the burst, so that large repetitions are still allowed when the bucket is full
+    assert context.rate_limit_manager.acquire(message, "dicerobot.dice", 30)
+    assert not context.rate_limit_manager.acquire(message, "dicerobot.dice")
+
+    clock.now += 2
+    assert not context.rate_limit_manager.acquire(message, "dicerobot.dice", 3)
+    assert context.rate_limit_manager.acquire(message, "dicerobot.dice", 2)
+
+
+def test_group_limit(context: AppContext, clock: Clock) -> None:
+    messages = [build_group_message(".r") for _ in range(3)]
+
+    for user_id, message in enumerate(messages):
+        message.user_id = user_id
+
+    assert context.rate_limit_manager.acquire(messages[0], "dicerobot.dice", 3)
+    assert context.rate_limit_manager.acquire(messages[1], "dicerobot.dice", 2)
+    assert not context.rate_limit_manager.acquire(messages[2], "dicerobot.dice")
+
+    # Chat settings override the group limit
+    context.chat_settings.set(chat_type=ChatType.GROUP, chat_id=12345, settings_group="dicerobot", settings={
+        "rate_limit": {
+            "rate": 0
+        }
+    })
+    assert context.rate_limit_manager.acquire(messages[2], "dicerobot.dice")
+
+
+def test_plugin_limit(context: AppContext, clock: Clock) -> None:
+    context.plugin_settings.set(plugin="dicerobot.chat", settings={
+        "rate_limit": {
+            "rate": 6,
+            "burst": 1
+        }
+    })
+    message = build_private_message(".chat")
+    other_message = build_private_message(".chat")
+    other_message.user_id = 77777
+
+    assert context.rate_limit_manager.acquire(message, "dicerobot.chat")
+    assert not context.rate_limit_manager.acquire(other_message, "dicerobot.chat")
+    assert context.rate_limit_manager.acquire(other_message, "dicerobot.dice")
+
+    # Tokens of the user are not consumed when the plugin bucket rejects the order
+    assert context.rate_limit_manager.acquire(other_message, "dicerobot.dice", 2)
+
+    clock.now += 10
+    assert context.rate_limit_manager.acquire(other_message, "dicerobot.chat")
+
+
+def test_buckets_expire(context: AppContext, clock: Clock) -> None:
+    context.rate_limit_manager.acquire(build_private_message(".r"), "dicerobot.dice")
+    assert len(context.rate_limit_manager.user_buckets) == 1
+
+    # The bucket is full again after 1 second, then it is dropped
+    clock.now += 1
+    assert 88888 not in context.rate_limit_manager.user_buckets
+    assert len(context.rate_limit_manager.user_buckets) == 0
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from app.context import AppContext
+from app.template import ReplyTemplate, ReplyVariableResolver
+from plugin import OrderPlugin, REPLY_VARIABLE_RESOLVERS
+from plugin.dicerobot.dice import Dice
+from tests import build_group_message, build_private_message
+
+
+def test_render() -> None:
+    template = ReplyTemplate("{&发送者}骰出了：{&掷骰结果}{&未知变量}")
+    assert template.variables == {"发送者", "掷骰结果", "未知变量"}
+
+    # Placeholders of missing variables are kept
+    assert template.render({"发送者": "Kaworu", "掷骰结果": 42}) == "Kaworu骰出了：42{&未知变量}"
+    assert ReplyTemplate("没有变量").render({}) == "没有变量"
+    assert ReplyTemplate("{&A}{&B}").render({"A": 1, "B": ""}) == "1"
+
+
+def test_templates(context: AppContext) -> None:
+    Dice.load(context)
+    templates = context.replies.get_templates(group=Dice.name)
+    reply = context.replies.get_reply(group=Dice.name, key="result")
+
+    # Templates are compiled once and shared
+    assert reply in templates
+    assert context.replies.get_templates(group=Dice.name) is templates
+
+    plugin = Dice(context, build_group_message(".r"), "r", "", 1)
+    plugin.update_reply_variables({"掷骰结果": "D100=42"})
+    assert plugin.reply_templates is templates
+    assert plugin.format_reply(reply) == ReplyTemplate(reply).render(plugin.reply_variables)
+    assert plugin.format_reply("{&掷骰结果}!") == "D100=42!"
+
+    # Templates are compiled again when replies are changed
+    context.replies.set_replies(group=Dice.name, replies={"result": "{&掷骰结果}"})
+    new_templates = context.replies.get_templates(group=Dice.name)
+    assert new_templates is not templates
+    assert "{&掷骰结果}" in new_templates and reply not in new_templates
+
+
+@pytest.mark.asyncio
+async def test_reply_variables(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = []
+
+    def resolve(plugin: OrderPlugin) -> str:
+        calls.append(plugin)
+        return "value"
+
+    monkeypatch.setitem(REPLY_VARIABLE_RESOLVERS, "测试变量", ReplyVariableResolver(resolve))
+    Dice.load(context)
+    plugin = Dice(context, build_group_message(".r"), "r", "", 1)
+
+    # Variables are resolved only when referenced, and only once for each request
+    assert plugin.format_reply("{&发送者}") == "Kaworu"
+    assert calls == []
+    assert plugin.format_reply("{&测试变量}{&测试变量}") == "valuevalue"
+    assert plugin.format_reply("{&测试变量}") == "value"
+    assert calls == [plugin]
+
+    # Async variables are resolved only when rendered asynchronously
+    get_group_info = context.network_manager.napcat.get_group_info
+    assert plugin.format_reply("{&群名}") == "{&群名}"
+    get_group_info.assert_not_awaited()
+    assert await plugin.render_reply("{&群名}（{&群号}）") == "Nerv（12345）"
+    assert await plugin.render_reply("{&群名}") == plugin.reply_variables["群名"]
+    get_group_info.assert_awaited_once_with(12345)
+
+    # Explicit values take precedence over resolvers
+    plugin.update_reply_variables({"发送者": "Shinji"})
+    assert plugin.format_reply("{&发送者}") == "Shinji"
+    plugin.reply_variables["发送者"] = "Rei"
+    assert plugin.format_reply("{&发送者}") == "Rei"
+
+
+def test_reply_variables_failed(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    def resolve(_: OrderPlugin) -> str:
+        raise ValueError
+
+    monkeypatch.setitem(REPLY_VARIABLE_RESOLVERS, "测试变量", ReplyVariableResolver(resolve))
+    Dice.load(context)
+    plugin = Dice(context, build_group_message(".r"), "r", "", 1)
+
+    # Placeholders of variables failed to be resolved are kept
+    assert plugin.format_reply("{&发送者}{&测试变量}") == "Kaworu{&测试变量}"
+    assert "测试变量" not in plugin.reply_variables
+    assert plugin.reply_variables.get_unresolved(["群名", "测试变量", "发送者"]) == ["群名"]
+
+
+@pytest.mark.asyncio
+async def test_reply_variables_private(context: AppContext) -> None:
+    Dice.load(context)
+    plugin = Dice(context, build_private_message(".r"), "r", "", 1)
+
+    # Placeholders of group variables are kept in private chats
+    assert await plugin.render_reply("{&群名}（{&群号}）") == "{&群名}（{&群号}）"
+    assert "群号" not in plugin.reply_variables and "群名" not in plugin.reply_variables
+    assert plugin.reply_variables.get_unresolved(["群名"]) == []
+    context.network_manager.napcat.get_group_info.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_reply_variables_cancelled(context: AppContext, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def resolve(_: OrderPlugin) -> str:
+        raise asyncio.CancelledError
+
+    monkeypatch.setitem(REPLY_VARIABLE_RESOLVERS, "测试变量", ReplyVariableResolver(resolve))
+    Dice.load(context)
+    plugin = Dice(context, build_group_message(".r"), "r", "", 1)
+
+    # Cancellation is propagated rather than taken as a value
+    with pytest.raises(asyncio.CancelledError):
+        await plugin.render_reply("{&测试变量}")
+    assert "测试变量" not in plugin.reply_variables
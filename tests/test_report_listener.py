@@ -0,0 +1,88 @@
+from collections.abc import AsyncGenerator
+import pathlib
+import socket
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, AsyncHTTPTransport
+
+from app import codec
+from app.auth import Auth
+from app.context import AppContext
+from app.enum import ApplicationStatus, ListenerMode
+from app.network.listener import ReportListener
+from . import build_group_message
+
+pytestmark = pytest.mark.asyncio
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest_asyncio.fixture
+async def listener(context: AppContext) -> AsyncGenerator[ReportListener]:
+    context.status.app = ApplicationStatus.RUNNING
+    listener = ReportListener(context)
+    yield listener
+    await listener.stop()
+
+
+async def post_report(context: AppContext, client: AsyncClient) -> int:
+    body = codec.dumps(build_group_message(".r").model_dump())
+    signature = Auth(context).calculate_signature("sha1", body)
+    response = await client.post("/report", content=body, headers={"X-Signature": f"sha1={signature}"})
+    return response.status_code
+
+
+async def test_https(context: AppContext, listener: ReportListener) -> None:
+    # Reports are received by the main server
+    await listener.start()
+    assert not listener.running
+
+
+async def test_http(context: AppContext, listener: ReportListener) -> None:
+    port = get_free_port()
+    context.settings.update_napcat({"report": {"listener": ListenerMode.HTTP.value, "port": port}})
+    await listener.start()
+    assert listener.running
+
+    async with AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        assert await post_report(context, client) == 204
+        assert context.status.ingestion.validated == 1
+
+        # Signature is still verified
+        response = await client.post("/report", content=b"{}", headers={"X-Signature": "sha1=" + "0" * 40})
+        assert response.status_code == 401
+
+    await listener.stop()
+    assert not listener.running
+
+
+async def test_unix(context: AppContext, listener: ReportListener, tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "run" / "report.sock"
+    context.settings.update_napcat({"report": {
+        "listener": ListenerMode.UNIX.value, "socket": str(path), "forwarder": "http://127.0.0.1:9502/report"
+    }})
+    await listener.start()
+    assert path.exists()
+
+    async with AsyncClient(transport=AsyncHTTPTransport(uds=str(path)), base_url="http://localhost") as client:
+        assert await post_report(context, client) == 204
+        assert context.status.ingestion.validated == 1
+
+    await listener.stop()
+    assert not path.exists()
+
+
+async def test_bind_failed(context: AppContext, listener: ReportListener) -> None:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        context.settings.update_napcat({"report": {"listener": ListenerMode.HTTP.value, "port": sock.getsockname()[1]}})
+
+        # Failure is reported instead of exiting
+        await listener.start()
+        assert not listener.running
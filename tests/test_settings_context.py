@@ -0,0 +1,87 @@
+import pytest
+
+from app.context import AppContext
+from app.enum import ChatType, Role
+from app.models.config import ChatSettings
+from plugin.dicerobot.bot import Bot
+from plugin.dicerobot.dice import Dice
+from tests import build_group_message
+
+
+def test_context_cache() -> None:
+    chat_settings = ChatSettings(max_contexts=2)
+    chat_settings.set(chat_type=ChatType.GROUP, chat_id=1, settings_group="dicerobot", settings={"nickname": "Shinji"})
+    context = chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=1)
+    assert chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=1) is context
+    assert context.dicerobot == {"nickname": "Shinji"}
+
+    # Settings are read-only snapshots
+    with pytest.raises(TypeError):
+        context.dicerobot["nickname"] = "Kaworu"  # type: ignore
+
+    # Least recently used contexts are evicted
+    chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=2)
+    chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=1)
+    chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=3)
+    assert chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=1) is context
+    assert chat_settings.get_context(chat_type=ChatType.FRIEND, chat_id=1) is not context
+
+    # Setting settings of the chat invalidates its context, while the old snapshots are kept unchanged
+    chat_settings.set(chat_type=ChatType.GROUP, chat_id=1, settings_group="dicerobot", settings={"enabled": False})
+    assert chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=1) is not context
+    assert chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=1).dicerobot == {
+        "nickname": "Shinji", "enabled": False
+    }
+    assert context.dicerobot == {"nickname": "Shinji"}
+
+
+def test_default_settings() -> None:
+    chat_settings = ChatSettings()
+    context = chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=1)
+    default = {"rules": ["coc"]}
+
+    # Default settings are used without being saved to the chat
+    settings = context.get_settings("test", default)
+    assert settings == {"rules": ("coc",)}
+    assert context.get_settings("test", default) is settings
+    assert chat_settings.copy(chat_type=ChatType.GROUP, chat_id=1, settings_group="test") == {}
+    assert chat_settings.pop_changes() == {}
+
+    # Items not set in the chat still fall back to default settings after a partial save
+    default = {"rules": ["coc"], "surface": 100}
+    chat_settings.set(chat_type=ChatType.GROUP, chat_id=1, settings_group="test", settings={"surface": 20})
+    context = chat_settings.get_context(chat_type=ChatType.GROUP, chat_id=1)
+    assert context.get_settings("test", default) == {"rules": ("coc",), "surface": 20}
+
+
+@pytest.mark.asyncio
+async def test_plugin_reuses_context(context: AppContext) -> None:
+    Bot.load(context)
+    Dice.load(context)
+    message = build_group_message(".bot off")
+    message.sender.role = Role.ADMIN
+    bot = Bot(context, message, "bot", "off", 1)
+    dice = Dice(context, message, "r", "d100", 1)
+
+    assert bot.dicerobot_chat_settings is dice.dicerobot_chat_settings
+    assert dice.chat_settings is context.chat_settings.get(
+        chat_type=ChatType.GROUP, chat_id=12345, settings_group=Dice.name
+    )
+
+    # Settings saved by a plugin are seen by later plugins
+    await bot()
+    assert Dice(context, message, "r", "d100", 1).check_enabled() is False
+    assert context.chat_settings.pop_changes()[(ChatType.GROUP, 12345, "dicerobot")] == {"enabled": False}
+
+    bot.save_chat_settings({"enabled": True}, "dicerobot")
+    assert bot.check_enabled() is True
+
+
+def test_plugin_partial_chat_settings(context: AppContext) -> None:
+    Dice.load(context)
+    context.chat_settings.set(chat_type=ChatType.GROUP, chat_id=12345, settings_group=Dice.name, settings={
+        "unknown": True
+    })
+    dice = Dice(context, build_group_message(".r"), "r", "", 1)
+
+    assert dice.chat_settings["default_surface"] == Dice.default_chat_settings["default_surface"]
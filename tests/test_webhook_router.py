@@ -1,4 +1,5 @@
 from unittest.mock import AsyncMock
+import asyncio
 import os
 import shutil
 from collections.abc import AsyncGenerator
@@ -10,6 +11,7 @@ from httpx import AsyncClient, Request
 from app.context import AppContext
 from app.auth import Auth
 from app.enum import ApplicationStatus, Role
+from app.managers.ingestion import QuickReply
 from app.exceptions import OrderSuspiciousError, OrderRepetitionExceededError, OrderError
 from . import build_group_message, build_private_message
 
@@ -315,3 +317,167 @@ async def test_repetition_exceeded(context: AppContext, webhook_client: AsyncCli
         await webhook_client.post("/report", json=build_group_message(order).model_dump())
 
     context.network_manager.napcat.send_group_message.assert_called_once()
+
+
+@pytest.mark.parametrize("segments", [
+    pytest.param([{"type": "text", "data": {"text": "Just chatting"}}], id="Chatter"),
+    pytest.param([{"type": "image", "data": {"file": "a.png"}}], id="Image only"),
+    pytest.param([{"type": "at", "data": {"qq": "77777"}}, {"type": "text", "data": {"text": ".r"}}], id="At others"),
+    pytest.param([{"type": "face", "data": {"id": "1"}}], id="Unsupported segment")
+])
+async def test_filtered(context: AppContext, webhook_client: AsyncClient, segments: list[dict]) -> None:
+    content = build_group_message(".r").model_dump()
+    content["message"] = segments
+
+    response = await webhook_client.post("/report", json=content)
+    assert response.status_code == 204
+    assert context.status.ingestion.filtered == 1
+    assert context.status.ingestion.validated == 0
+    context.network_manager.napcat.send_group_message.assert_not_called()
+
+
+async def test_not_filtered(context: AppContext, webhook_client: AsyncClient) -> None:
+    content = build_group_message(".r").model_dump()
+    content["message"] = [
+        {"type": "at", "data": {"qq": "99999"}},
+        {"type": "text", "data": {"text": " "}},
+        {"type": "text", "data": {"text": " .r"}}
+    ]
+
+    response = await webhook_client.post("/report", json=content)
+    assert response.status_code == 204
+    assert context.status.ingestion.filtered == 0
+    assert context.status.ingestion.validated == 1
+    context.network_manager.napcat.send_group_message.assert_called_once()
+
+
+async def test_duplicated_message(context: AppContext, webhook_client: AsyncClient) -> None:
+    content = build_group_message(".r").model_dump()
+
+    for _ in range(3):
+        response = await webhook_client.post("/report", json=content)
+        assert response.status_code == 204
+
+    context.network_manager.napcat.send_group_message.assert_called_once()
+    assert context.status.deduplication.checked == 3
+    assert context.status.deduplication.duplicated == 2
+
+    # The same message ID from another bot is not a duplicate
+    content["self_id"] = 77777
+    await webhook_client.post("/report", json=content)
+    assert context.network_manager.napcat.send_group_message.call_count == 2
+
+
+async def test_duplicated_request(context: AppContext, webhook_client: AsyncClient) -> None:
+    content = {
+        "time": 1700000000,
+        "self_id": 99999,
+        "post_type": "request",
+        "request_type": "friend",
+        "user_id": 88888,
+        "comment": "",
+        "flag": "flag_1"
+    }
+
+    await webhook_client.post("/report", json=content)
+    await webhook_client.post("/report", json=content)
+    context.network_manager.napcat.set_friend_add_request.assert_called_once()
+
+    await webhook_client.post("/report", json=content | {"flag": "flag_2"})
+    assert context.network_manager.napcat.set_friend_add_request.call_count == 2
+    assert context.status.deduplication.duplicated == 1
+
+
+async def test_deduplication_disabled(context: AppContext, webhook_client: AsyncClient) -> None:
+    context.settings.update_application({
+        "deduplication": {
+            "window": 0
+        }
+    })
+    context.ingestion_manager.dedup_cache = context.ingestion_manager._create_dedup_cache()
+    content = build_group_message(".r").model_dump()
+
+    await webhook_client.post("/report", json=content)
+    await webhook_client.post("/report", json=content)
+    assert context.network_manager.napcat.send_group_message.call_count == 2
+    assert context.status.deduplication.checked == 0
+
+
+@pytest.fixture
+def enable_quick_reply(context: AppContext) -> None:
+    context.settings.update_application({
+        "quick_reply": {
+            "enabled": True
+        }
+    })
+
+
+@pytest.mark.usefixtures("enable_quick_reply")
+@pytest.mark.parametrize("builder", [
+    pytest.param(build_group_message, id="Group message"),
+    pytest.param(build_private_message, id="Private message")
+])
+async def test_quick_reply(context: AppContext, webhook_client: AsyncClient, builder) -> None:
+    response = await webhook_client.post("/report", json=builder(".r").model_dump())
+    assert response.status_code == 200
+
+    content = response.json()
+    assert content["at_sender"] is False
+    assert content["reply"][0]["type"] == "text"
+    assert content["reply"][0]["data"]["text"]
+    assert context.status.ingestion.quick_replied == 1
+    context.network_manager.napcat.send_group_message.assert_not_called()
+    context.network_manager.napcat.send_private_message.assert_not_called()
+    assert context.ingestion_manager.quick_replies == {}
+
+
+@pytest.mark.usefixtures("enable_quick_reply")
+async def test_quick_reply_with_other_messages(context: AppContext, webhook_client: AsyncClient) -> None:
+    # The hidden dice replies in the group and sends the result privately
+    response = await webhook_client.post("/report", json=build_group_message(".rh").model_dump())
+    assert response.status_code == 200
+    context.network_manager.napcat.send_group_message.assert_not_called()
+    context.network_manager.napcat.send_private_message.assert_called_once()
+
+
+@pytest.mark.usefixtures("enable_quick_reply")
+async def test_quick_reply_fallback(context: AppContext) -> None:
+    message = build_group_message(".r")
+    slot = context.ingestion_manager.quick_replies[id(message)] = QuickReply()
+    plugin = context.dispatch_manager.order_plugins["dicerobot.dice"](context, message, "r", "")
+
+    # The held reply is sent before the second reply
+    await plugin.reply_to_sender("First")
+    context.network_manager.napcat.send_group_message.assert_not_called()
+    await plugin.reply_to_sender("Second")
+    await plugin.reply_to_sender("Third")
+
+    texts = [call.args[1][0].data.text for call in context.network_manager.napcat.send_group_message.call_args_list]
+    assert texts == ["First", "Second", "Third"]
+    assert slot.close() is None
+
+
+@pytest.mark.usefixtures("enable_quick_reply")
+async def test_quick_reply_timeout(context: AppContext, webhook_client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    context.settings.update_application({
+        "quick_reply": {
+            "timeout": 0.01
+        }
+    })
+    handle_message = context.ingestion_manager.handle_message
+
+    async def slow_handle_message(message) -> None:
+        await asyncio.sleep(0.05)
+        await handle_message(message)
+
+    monkeypatch.setattr("app.managers.ingestion.DEBUG", False)
+    monkeypatch.setattr(context.ingestion_manager, "handle_message", slow_handle_message)
+    await context.ingestion_manager.initialize()
+
+    response = await webhook_client.post("/report", json=build_group_message(".r").model_dump())
+    assert response.status_code == 204
+
+    await context.ingestion_manager.join()
+    await context.ingestion_manager.cleanup()
+    context.network_manager.napcat.send_group_message.assert_called_once()
+    assert context.status.ingestion.quick_replied == 0
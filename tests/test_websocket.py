@@ -0,0 +1,152 @@
+from collections.abc import AsyncGenerator
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from websockets.asyncio.server import serve, ServerConnection
+
+from app.context import AppContext
+from app.enum import ApplicationStatus, TransportMode
+from app.exceptions import NetworkError
+from app.network.napcat import NapCatService
+from app.models.report.segment import Text
+from . import build_group_message
+
+pytestmark = pytest.mark.asyncio
+
+
+class StubServer:
+    """Local OneBot WebSocket server answering API calls."""
+
+    def __init__(self) -> None:
+        self.connections: list[ServerConnection] = []
+        self.requests: list[dict] = []
+        self.authorizations: list[str | None] = []
+        self.silent = False
+        self.port = 0
+
+    async def handle(self, connection: ServerConnection) -> None:
+        self.connections.append(connection)
+        self.authorizations.append(connection.request.headers.get("Authorization"))
+
+        async for data in connection:
+            request = json.loads(data)
+            self.requests.append(request)
+
+            if self.silent:
+                continue
+
+            if request["action"] == "get_login_info":
+                data = {"user_id": 99999, "nickname": "Shinji"}
+            else:
+                data = {"message_id": len(self.requests)}
+
+            await connection.send(json.dumps({
+                "status": "ok",
+                "retcode": 0,
+                "data": data,
+                "message": "",
+                "wording": "",
+                "echo": request["echo"]
+            }))
+
+    async def push(self, report: dict) -> None:
+        await self.connections[-1].send(json.dumps(report))
+
+
+@pytest_asyncio.fixture
+async def server() -> AsyncGenerator[StubServer]:
+    stub = StubServer()
+
+    async with serve(stub.handle, "127.0.0.1", 0) as ws_server:
+        stub.port = ws_server.sockets[0].getsockname()[1]
+        yield stub
+
+
+@pytest_asyncio.fixture
+async def service(context: AppContext, server: StubServer) -> AsyncGenerator[NapCatService]:
+    context.settings.update_napcat({
+        "transport": TransportMode.WEBSOCKET.value,
+        "websocket": {
+            "port": server.port,
+            "timeout": 1,
+            "reconnect_interval": 0.01
+        }
+    })
+    service = NapCatService(context)
+    await service.websocket.start()
+    await service.websocket.wait_connected(1)
+    yield service
+    await service.websocket.stop()
+
+
+async def test_call(context: AppContext, server: StubServer, service: NapCatService) -> None:
+    assert server.authorizations[0] == f"Bearer {context.settings.security.webhook.secret}"
+
+    result = await service.get_login_info()
+    assert result.data.nickname == "Shinji"
+
+    # Calls are multiplexed over the same connection
+    results = await asyncio.gather(*[
+        service.send_group_message(12345, [Text(data=Text.Data(text=str(i)))]) for i in range(5)
+    ])
+    assert sorted(result.data.message_id for result in results) == [2, 3, 4, 5, 6]
+    assert len(server.connections) == 1
+    assert server.requests[1]["action"] == "send_group_msg"
+    assert server.requests[1]["params"]["message"] == [{"type": "text", "data": {"text": "0"}}]
+    assert len({request["echo"] for request in server.requests}) == 6
+    assert service.websocket.pending == {}
+
+
+async def test_timeout(context: AppContext, server: StubServer, service: NapCatService) -> None:
+    context.settings.update_napcat({"websocket": {"timeout": 0.05}})
+    server.silent = True
+
+    with pytest.raises(NetworkError):
+        await service.get_login_info()
+
+    assert context.status.websocket.pending == 0
+
+
+async def test_reconnect(context: AppContext, server: StubServer, service: NapCatService) -> None:
+    server.silent = True
+    call = asyncio.create_task(service.get_login_info())
+    await asyncio.sleep(0.05)
+    await server.connections[0].close()
+
+    # Pending calls fail when the connection is lost
+    with pytest.raises(NetworkError):
+        await call
+
+    server.silent = False
+    await asyncio.sleep(0.05)
+    await service.websocket.wait_connected(1)
+    assert (await service.get_login_info()).data.user_id == 99999
+    assert len(server.connections) == 2
+    assert context.status.websocket.connections == 2
+
+
+async def test_http_fallback(context: AppContext, service: NapCatService) -> None:
+    await service.websocket.stop()
+    assert not service.websocket.connected
+
+    # Not connected, so the HTTP API is used
+    with pytest.raises(NetworkError):
+        await service.get_login_info()
+
+
+async def test_receive_report(context: AppContext, server: StubServer, service: NapCatService) -> None:
+    context.status.app = ApplicationStatus.RUNNING
+    dispatched = asyncio.Event()
+
+    async def dispatch_order(message, message_content: str) -> None:
+        assert message_content == ".r"
+        dispatched.set()
+
+    context.dispatch_manager.dispatch_order = dispatch_order
+
+    await server.push({"time": 1700000000, "self_id": 99999, "post_type": "meta_event", "meta_event_type": "heartbeat"})
+    await server.push(build_group_message(".r").model_dump())
+    await asyncio.wait_for(dispatched.wait(), 1)
+    assert context.status.ingestion.validated == 1